@@ -3,11 +3,13 @@ Lingda UI Backend - Browser Automation Workflow Engine
 FastAPI服务器，用于执行前端定义的浏览器自动化工作流
 """
 
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException, Depends, Header
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import List, Dict, Any, Optional
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from typing import Dict, Any, Optional, Set
+from contextlib import asynccontextmanager
 import asyncio
+import json
 import logging
 from datetime import datetime
 import uuid
@@ -17,19 +19,66 @@ import os
 # 添加backend目录到Python路径
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from workflow.engine import WorkflowEngine
-from models.workflow import WorkflowDefinition, ExecutionResult
+from config import settings
+from workflow.workers import create_executor
+from workflow.admission import AdmissionController, AdmissionTicket, QueueFullError
+from workflow.events import EventBus, FINISHED_EVENT
+from workflow.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, render_metrics
+from models.workflow import BatchInput, WorkflowDefinition, ExecutionResult, ExecutionOptions, StepResult
 from nodes import node_registry
+from storage.result_store import create_result_store
+from storage.checkpoints import CheckpointStore
 
 # 配置日志
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# 执行器：进程内执行，或分发到多个工作进程（每个进程有自己的浏览器池）
+executor = create_executor(settings.worker_processes, settings.browser_warmup)
+
+# 准入控制：限制同时运行的执行数量和排队深度
+admission = AdmissionController(
+    max_concurrency=settings.max_concurrent_executions,
+    max_queue=settings.max_queued_executions
+)
+
+# 已结束的执行结果存储（内存LRU/TTL 或 SQLite）
+result_store = create_result_store(
+    settings.result_store,
+    path=settings.result_store_path,
+    max_entries=settings.result_store_max_entries,
+    ttl=settings.result_ttl,
+    eviction_interval=settings.result_eviction_interval,
+    batch_size=settings.result_store_batch_size,
+    flush_interval=settings.result_store_flush_interval
+)
+
+# 执行事件通道（SSE推送）
+event_bus = EventBus(buffer_size=settings.event_buffer_size, retention=settings.event_retention)
+
+# 执行检查点（与工作进程共用目录）
+checkpoint_store = CheckpointStore(settings.checkpoint_dir)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """应用生命周期 - 启动和关闭执行器与结果存储"""
+    pruned = await checkpoint_store.prune(settings.checkpoint_ttl)
+    if pruned:
+        logger.info(f"已删除 {pruned} 个过期的检查点")
+    await result_store.start()
+    await executor.start()
+    yield
+    await executor.close()
+    await result_store.close()
+
+
 # 创建FastAPI应用
 app = FastAPI(
     title="Lingda UI Backend",
     description="浏览器自动化工作流执行引擎",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS配置
@@ -41,11 +90,17 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# 工作流执行引擎实例
-workflow_engine = WorkflowEngine()
+# 排队和运行中的执行结果；结束后转存到 result_store
+active_results: Dict[str, ExecutionResult] = {}
+
+# 进行中（含排队）的执行任务
+execution_tasks: Dict[str, asyncio.Task] = {}
+
+# 已请求停止的执行，避免重复取消打断资源释放
+stopping_executions: Set[str] = set()
 
-# 存储执行结果的内存缓存（生产环境应使用数据库）
-execution_results: Dict[str, ExecutionResult] = {}
+# 已结束的执行数量（按状态）
+execution_counts: Dict[str, int] = {}
 
 
 @app.get("/")
@@ -55,10 +110,24 @@ async def root():
         "message": "Lingda UI Backend is running",
         "version": "1.0.0",
         "available_nodes": list(node_registry.keys()),
+        "executor": executor.stats(),
+        "admission": admission.stats(),
+        "result_store": result_store.stats(),
+        "events": event_bus.stats(),
         "timestamp": datetime.now().isoformat()
     }
 
 
+@app.get("/metrics")
+async def get_metrics():
+    """
+    Prometheus文本格式的运行指标
+    节点耗时直方图、重试次数和截图写入量来自各执行进程，执行计数和排队状态来自API进程
+    """
+    body = render_metrics(await executor.metrics(), execution_counts, admission.stats())
+    return PlainTextResponse(body, media_type=METRICS_CONTENT_TYPE)
+
+
 @app.get("/nodes")
 async def get_available_nodes():
     """获取所有可用的节点类型"""
@@ -74,73 +143,257 @@ async def get_available_nodes():
 
 
 @app.post("/workflow/execute")
-async def execute_workflow(workflow: WorkflowDefinition, background_tasks: BackgroundTasks):
+async def execute_workflow(workflow: WorkflowDefinition,
+                           options: ExecutionOptions = Depends()):
     """
     执行工作流
-    返回执行ID，可以通过ID查询执行状态
+    返回执行ID，可以通过ID查询执行状态；并发名额已满时进入队列，队列也满时返回429
     """
+    return _start_execution(workflow, options)
+
+
+@app.post("/workflow/resume/{execution_id}")
+async def resume_workflow(execution_id: str, workflow: Optional[WorkflowDefinition] = None):
+    """
+    从检查点恢复失败或被停止的执行
+    恢复浏览器存储状态、变量和页面URL后，只执行尚未完成的节点；
+    可以在请求体中提交修正后的工作流（节点ID需保持不变），否则使用原工作流
+    """
+    if execution_id in active_results:
+        raise HTTPException(status_code=409, detail="执行仍在进行中")
+    
+    checkpoint = await checkpoint_store.load(execution_id)
+    if checkpoint is None:
+        raise HTTPException(status_code=404, detail="没有可恢复的检查点")
+    
+    options = checkpoint.options.model_copy(update={"resume_from": execution_id})
+    return _start_execution(workflow or checkpoint.workflow, options)
+
+
+@app.post("/workflow/batch")
+async def execute_batch(workflow: WorkflowDefinition,
+                        batch: BatchInput,
+                        options: ExecutionOptions = Depends()):
+    """
+    批量执行工作流
+    输入表的每一行绑定为变量（替换 ${变量名}）执行一次工作流，页面在行之间复用，
+    所有行的数据写入同一个文件，执行结果的 rows 中是每一行的状态摘要
+    """
+    if not batch.rows:
+        raise HTTPException(status_code=400, detail="输入表为空")
+    if len(batch.rows) > settings.batch_max_rows:
+        raise HTTPException(status_code=400, detail=f"输入行数超过上限 {settings.batch_max_rows}")
+    
+    batch = batch.model_copy(update={
+        "concurrency": max(1, min(batch.concurrency, settings.batch_max_concurrency)),
+        "browsers": max(1, min(batch.browsers, settings.batch_max_browsers))
+    })
+    return _start_execution(workflow, options, batch)
+
+
+def _start_execution(workflow: WorkflowDefinition,
+                     options: ExecutionOptions,
+                     batch: Optional[BatchInput] = None) -> Dict[str, Any]:
+    """登记执行并在后台运行"""
     execution_id = str(uuid.uuid4())
     
+    try:
+        ticket = admission.admit(execution_id)
+    except QueueFullError as e:
+        raise HTTPException(
+            status_code=429,
+            detail="执行队列已满，请稍后重试",
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    
     # 创建执行结果记录
-    execution_results[execution_id] = ExecutionResult(
+    queue_position = admission.position(execution_id)
+    active_results[execution_id] = ExecutionResult(
         execution_id=execution_id,
         workflow_id=workflow.workflow_id,
-        status="running",
+        status="queued" if queue_position else "running",
         start_time=datetime.now(),
-        steps=[]
+        steps=[],
+        queue_position=queue_position,
+        resumed_from=options.resume_from
     )
     
+    event_bus.publish(execution_id, "queued" if queue_position else "started", {
+        "workflow_id": workflow.workflow_id,
+        "queue_position": queue_position
+    })
+    
     # 在后台执行工作流
-    background_tasks.add_task(run_workflow, execution_id, workflow)
+    task = asyncio.create_task(run_workflow(execution_id, workflow, options, ticket, batch))
+    execution_tasks[execution_id] = task
+    task.add_done_callback(lambda _: execution_tasks.pop(execution_id, None))
     
     return {
         "execution_id": execution_id,
-        "status": "started",
-        "message": "工作流已开始执行"
+        "status": "queued" if queue_position else "started",
+        "queue_position": queue_position,
+        "resumed_from": options.resume_from,
+        "message": f"工作流已进入队列，前面还有 {queue_position - 1} 个执行" if queue_position else "工作流已开始执行"
+    }
+
+
+@app.get("/workflow/stream/{execution_id}")
+async def stream_workflow(execution_id: str,
+                          last_event_id: Optional[int] = None,
+                          last_event_id_header: Optional[str] = Header(None, alias="Last-Event-ID")):
+    """
+    以SSE推送执行事件（started / step_started / step_finished / finished）
+    断线重连时浏览器会自动带上 Last-Event-ID 头，从断点之后继续推送
+    """
+    channel = event_bus.get(execution_id)
+    if channel is None:
+        # 通道已过保留期：已结束的执行只推送一个结束事件
+        result = await result_store.get(execution_id, include_steps=False)
+        if result is None:
+            raise HTTPException(status_code=404, detail="执行记录不存在")
+        
+        async def finished_only():
+            yield _format_sse(0, FINISHED_EVENT, _finished_event_data(result))
+        
+        return StreamingResponse(finished_only(), media_type="text/event-stream")
+    
+    if last_event_id is None:
+        last_event_id = int(last_event_id_header) if last_event_id_header and last_event_id_header.isdigit() else 0
+    
+    async def event_stream():
+        async for event in channel.subscribe(last_event_id, heartbeat=settings.event_heartbeat):
+            if event is None:
+                yield ": keepalive\n\n"
+            else:
+                yield _format_sse(event.id, event.type, event.data)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+def _format_sse(event_id: int, event_type: str, data: Dict[str, Any]) -> str:
+    return f"id: {event_id}\nevent: {event_type}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+
+def _finished_event_data(result: ExecutionResult) -> Dict[str, Any]:
+    return {
+        "status": result.status,
+        "error": result.error,
+        "total_duration": result.total_duration,
+        "extracted_count": result.extracted_count
     }
 
 
 @app.get("/workflow/status/{execution_id}")
-async def get_execution_status(execution_id: str):
-    """获取工作流执行状态"""
-    if execution_id not in execution_results:
-        raise HTTPException(status_code=404, detail="执行记录不存在")
+async def get_execution_status(execution_id: str, include_steps: bool = True):
+    """获取工作流执行状态（步骤较多时可用 include_steps=false 只取摘要，再分页读取步骤）"""
+    result = active_results.get(execution_id)
+    if result is None:
+        result = await result_store.get(execution_id, include_steps)
+        if result is None:
+            raise HTTPException(status_code=404, detail="执行记录不存在")
+        return result
+    
+    if result.status == "queued":
+        result.queue_position = admission.position(execution_id)
+    if not include_steps:
+        return result.model_copy(update={"steps": []})
+    return result
+
+
+@app.get("/workflow/steps/{execution_id}")
+async def get_execution_steps(execution_id: str, offset: int = 0, limit: int = 100):
+    """分页获取执行的步骤结果"""
+    limit = max(1, min(limit, 1000))
+    result = active_results.get(execution_id)
+    if result is not None:
+        steps, total = result.steps[offset:offset + limit], len(result.steps)
+    else:
+        steps, total = await result_store.get_steps(execution_id, offset, limit)
+        if total == 0 and await result_store.get(execution_id, include_steps=False) is None:
+            raise HTTPException(status_code=404, detail="执行记录不存在")
     
-    return execution_results[execution_id]
+    return {"execution_id": execution_id, "offset": offset, "limit": limit, "total": total, "steps": steps}
 
 
 @app.post("/workflow/stop/{execution_id}")
 async def stop_workflow(execution_id: str):
     """停止工作流执行"""
-    if execution_id not in execution_results:
-        raise HTTPException(status_code=404, detail="执行记录不存在")
+    result = active_results.get(execution_id)
+    if result is None:
+        result = await result_store.get(execution_id, include_steps=False)
+        if result is None:
+            raise HTTPException(status_code=404, detail="执行记录不存在")
+        return {"message": f"工作流当前状态：{result.status}，无法停止"}
     
-    result = execution_results[execution_id]
-    if result.status == "running":
-        result.status = "stopped"
-        result.end_time = datetime.now()
-        return {"message": "工作流已停止"}
-    else:
+    task = execution_tasks.get(execution_id)
+    if task is None or result.status not in ("queued", "running"):
         return {"message": f"工作流当前状态：{result.status}，无法停止"}
+    
+    # 取消执行任务：取消传递到正在运行的节点，浏览器上下文限时归还
+    if execution_id not in stopping_executions:
+        stopping_executions.add(execution_id)
+        task.cancel()
+    done, _ = await asyncio.wait({task}, timeout=settings.stop_timeout)
+    if done:
+        return {"message": "工作流已停止"}
+    return {"message": "已请求停止，正在释放浏览器资源"}
 
 
-async def run_workflow(execution_id: str, workflow: WorkflowDefinition):
-    """在后台运行工作流"""
+async def run_workflow(execution_id: str,
+                       workflow: WorkflowDefinition,
+                       options: ExecutionOptions,
+                       ticket: AdmissionTicket,
+                       batch: Optional[BatchInput] = None):
+    """在后台运行工作流（先在队列中等待运行名额）"""
     try:
+        await admission.wait(ticket)
+        queued = active_results[execution_id]
+        if queued.status == "queued":
+            event_bus.publish(execution_id, "started", {"queue_wait_time": ticket.queue_wait})
+        queued.status = "running"
+        queued.queue_position = None
+        queued.queue_wait_time = ticket.queue_wait
+        
+        def on_event(event_type: str, data: Dict[str, Any]):
+            event_bus.publish(execution_id, event_type, data)
+            # 运行中查询状态时也能看到已完成的步骤（与执行结果一致，循环体只保留失败的步骤）
+            if event_type == "step_finished" and (data.get("loop_id") is None or data.get("status") == "failed"):
+                active_results[execution_id].steps.append(StepResult.model_validate(data))
+        
         logger.info(f"开始执行工作流: {execution_id}")
-        result = await workflow_engine.execute(workflow)
+        result = await executor.submit(execution_id, workflow, options, on_event, batch)
+        result.queue_wait_time = ticket.queue_wait
         
         # 更新执行结果
-        execution_results[execution_id] = result
-        execution_results[execution_id].execution_id = execution_id
+        active_results[execution_id] = result
         
         logger.info(f"工作流执行完成: {execution_id}, 状态: {result.status}")
         
+    except asyncio.CancelledError:
+        # 排队中被停止，或多进程执行时由工作进程负责释放浏览器
+        logger.info(f"工作流已停止: {execution_id}")
+        active_results[execution_id].status = "stopped"
+        active_results[execution_id].error = "执行已被停止"
+        active_results[execution_id].end_time = datetime.now()
+    
     except Exception as e:
         logger.error(f"工作流执行失败: {execution_id}, 错误: {str(e)}")
-        execution_results[execution_id].status = "failed"
-        execution_results[execution_id].error = str(e)
-        execution_results[execution_id].end_time = datetime.now()
+        active_results[execution_id].status = "failed"
+        active_results[execution_id].error = str(e)
+        active_results[execution_id].end_time = datetime.now()
+    
+    finally:
+        admission.release(ticket)
+        stopping_executions.discard(execution_id)
+        # 结束的执行转存到结果存储
+        result = active_results.pop(execution_id)
+        execution_counts[result.status] = execution_counts.get(result.status, 0) + 1
+        event_bus.publish(execution_id, FINISHED_EVENT, _finished_event_data(result))
+        await result_store.save(result)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,87 @@
+"""
+服务配置
+所有可调参数集中在这里，可通过 LINGDA_ 前缀的环境变量覆盖
+"""
+
+from typing import Any, Dict, List
+
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+
+class Settings(BaseSettings):
+    """后端运行配置"""
+
+    model_config = SettingsConfigDict(env_prefix="LINGDA_", env_file=".env")
+
+    # 浏览器池
+    browser_pool_min_size: int = 1  # 常驻预热的浏览器数量
+    browser_pool_max_size: int = 4  # 浏览器进程上限
+    browser_pool_max_contexts: int = 8  # 单个浏览器同时承载的上下文数量
+    browser_pool_idle_timeout: float = 300.0  # 空闲浏览器回收时间（秒）
+    browser_pool_health_interval: float = 30.0  # 健康检查间隔（秒）
+    browser_pool_max_leases: int = 200  # 单个浏览器服务多少次执行后重启，防止内存泄漏
+    browser_profile: str = "headless"  # 浏览器启动配置：headless, headed-debug, low-memory
+    browser_warmup: bool = True  # 服务启动时预先启动浏览器
+
+    # 工作进程
+    worker_processes: int = 0  # 执行工作流的工作进程数量，0 表示在API进程内执行
+
+    # 准入控制
+    max_concurrent_executions: int = 8  # 同时运行的执行数量上限
+    max_queued_executions: int = 32  # 排队等待的执行数量上限，超出时返回429
+
+    # 执行结果存储
+    result_store: str = "memory"  # memory, sqlite
+    result_store_path: str = "data/results.db"  # SQLite数据库文件
+    result_store_max_entries: int = 1000  # 内存后端保留的执行数量上限
+    result_ttl: float = 86400.0  # 已结束的执行保留多久（秒），0 表示不过期
+    result_eviction_interval: float = 300.0  # 定期淘汰的间隔（秒）
+    result_store_batch_size: int = 50  # SQLite后端批量写入的执行数量
+    result_store_flush_interval: float = 1.0  # SQLite后端后台写出的间隔（秒）
+
+    # 执行事件推送
+    event_buffer_size: int = 1000  # 每次执行保留的事件数量（断线重连可回放的范围）
+    event_retention: float = 300.0  # 执行结束后事件保留多久（秒）
+    event_heartbeat: float = 15.0  # SSE心跳间隔（秒）
+
+    # 停止执行
+    stop_timeout: float = 15.0  # 停止接口等待执行结束的时间（秒）
+    session_close_timeout: float = 10.0  # 写出数据和关闭浏览器上下文的超时时间（秒）
+
+    # 执行引擎
+    plan_cache_size: int = 128  # 执行计划LRU缓存容量
+    max_node_concurrency: int = 8  # 单次执行内同时运行的节点数量上限
+
+    # 提取数据输出
+    data_sink: str = "memory"  # memory, jsonl, csv, parquet
+    data_dir: str = "data"  # 文件型输出的目录
+    data_sink_buffer_size: int = 500  # 缓冲多少条记录后写出
+
+    # 截图
+    screenshot_mode: str = "on_error"  # off, on_error, every_n, node_types, always
+    screenshot_every_n: int = 10  # every_n 模式下的间隔
+    screenshot_node_types: List[str] = []  # node_types 模式下需要截图的节点类型
+    screenshot_full_page: bool = False  # 截取整个页面还是只截取视口
+    screenshot_format: str = "jpeg"  # jpeg, png
+    screenshot_quality: int = 70  # JPEG质量
+    screenshots_dir: str = "screenshots"
+
+    # 网络
+    network_profile: str = "none"  # 默认请求拦截配置：none, block_media, block_third_party, block_trackers, text_only
+    har_dir: str = "har"  # HAR录制和回放的存档目录
+
+    # 批量执行
+    batch_max_rows: int = 100000  # 单次批量执行的输入行数上限
+    batch_max_concurrency: int = 16  # 单次批量执行同时使用的页面数量上限
+    batch_max_browsers: int = 4  # 单次批量执行使用的浏览器上下文数量上限
+
+    # 检查点
+    checkpoints_enabled: bool = True  # 每个节点成功后记录检查点，失败或停止后可以恢复执行
+    checkpoint_dir: str = "checkpoints"  # 检查点目录（多个工作进程共用）
+    checkpoint_ttl: float = 604800.0  # 失败和停止的执行的检查点保留多久（秒），0 表示不过期
+
+    # 重试
+    retry_policies: Dict[str, Dict[str, Any]] = {}  # 按节点类型覆盖默认的重试策略，如 {"visit_page": {"max_attempts": 5}}
+
+
+settings = Settings()
@@ -81,28 +81,69 @@ class WorkflowDefinition(BaseModel):
         super().__init__(**data)
 
 
+class ExecutionOptions(BaseModel):
+    """执行选项"""
+    parallel_branches: bool = False  # 每个并行分支使用独立的页面（同一浏览器上下文，共享Cookie）
+    data_sink: Optional[str] = None  # 提取数据输出格式（memory/jsonl/csv/parquet），为空时使用服务配置
+    screenshot_mode: Optional[str] = None  # 截图模式（off/on_error/every_n/node_types/always），为空时使用服务配置
+    network_profile: Optional[str] = None  # 默认的请求拦截配置（none/block_media/block_third_party/block_trackers/text_only）
+    har_mode: str = "off"  # HAR模式：off / record（录制网络响应）/ replay（只从存档回放，不访问网络）
+    har_name: Optional[str] = None  # HAR存档名称，默认录制为 工作流ID_执行ID，回放取该工作流最近的录制
+    checkpoint: Optional[bool] = None  # 每个节点成功后记录检查点，为空时使用服务配置
+    resume_from: Optional[str] = None  # 从该执行的检查点恢复，只执行尚未完成的节点
+
+
+class BatchInput(BaseModel):
+    """批量执行的输入表 - 每一行的字段作为变量，替换节点参数中的 ${变量名}"""
+    rows: List[Dict[str, Any]]
+    concurrency: int = 4  # 同时处理的行数（页面数量），页面在行之间复用
+    browsers: int = 1  # 页面分布在多少个浏览器上下文上
+
+
 class StepResult(BaseModel):
     """单个步骤执行结果"""
     node_id: str
     node_type: NodeType
     status: str  # success, failed, skipped
-    start_time: datetime
+    ready_time: Optional[datetime] = None  # 所有前驱执行成功、进入就绪队列的时间
+    start_time: datetime  # 调度器实际启动节点的时间
     end_time: Optional[datetime] = None
     result_data: Optional[Dict[str, Any]] = None
     error: Optional[str] = None
     screenshot_path: Optional[str] = None
+    page_id: Optional[int] = None  # 分支模式下节点所用页面的编号
+    attempts: int = 1  # 执行次数（含重试）
+    retry_time: Optional[float] = None  # 第一次失败到最终结果之间用于重试的时间（秒）
+
+
+class BatchRowResult(BaseModel):
+    """批量执行中一行的结果（只保留摘要，不保留步骤）"""
+    row: int  # 行号（从0开始）
+    status: str  # completed, failed
+    duration: float  # 执行时间（秒）
+    records: int = 0  # 该行提取的记录数
+    failed_node: Optional[str] = None
+    error: Optional[str] = None
 
 
 class ExecutionResult(BaseModel):
     """工作流执行结果"""
     execution_id: str
     workflow_id: str
-    status: str  # running, completed, failed, stopped
+    status: str  # queued, running, completed, failed, stopped
     start_time: datetime
     end_time: Optional[datetime] = None
     steps: List[StepResult] = Field(default_factory=list)
     error: Optional[str] = None
     total_duration: Optional[float] = None  # 总执行时间（秒）
+    extracted_count: int = 0  # 提取的记录总数
+    data_file: Optional[str] = None  # 提取数据文件路径（文件型输出时）
+    network_stats: Optional[Dict[str, Any]] = None  # 拦截的请求数量和放行的响应字节数
+    har_file: Optional[str] = None  # 录制或回放的HAR存档路径
+    queue_position: Optional[int] = None  # 排队位置（从1开始），仅 queued 状态时有值
+    queue_wait_time: Optional[float] = None  # 排队等待时间（秒）
+    resumed_from: Optional[str] = None  # 从哪次执行的检查点恢复
+    rows: Optional[List[BatchRowResult]] = None  # 批量执行每一行的结果（按行号排列，未执行的行不包含）
 
 
 # 各节点类型的参数定义
@@ -111,6 +152,9 @@ class VisitPageParams(BaseModel):
     url: str
     wait_for_load: bool = True
     timeout: int = 30000  # 毫秒
+    block_profile: Optional[str] = None  # 请求拦截配置
+    block_patterns: List[str] = Field(default_factory=list)  # 额外拦截的URL通配符
+    quiet_ms: int = 500  # 加载后DOM静默多久视为稳定（毫秒）
 
 
 class ClickElementParams(BaseModel):
@@ -119,6 +163,7 @@ class ClickElementParams(BaseModel):
     selector_type: str = "css"  # css, xpath
     wait_timeout: int = 10000
     click_type: str = "single"  # single, double, right
+    collect_metadata: bool = True  # 是否在结果中记录元素的标签和文本
 
 
 class InputTextParams(BaseModel):
@@ -128,6 +173,8 @@ class InputTextParams(BaseModel):
     text: str
     clear_first: bool = True
     press_enter: bool = False
+    wait_timeout: int = 10000  # 等待输入框出现的超时时间（毫秒）
+    input_mode: str = "type"  # type（逐个按键输入）, fill（一次设置值，更快）
 
 
 class ScrollPageParams(BaseModel):
@@ -136,6 +183,8 @@ class ScrollPageParams(BaseModel):
     distance: Optional[int] = None  # 像素距离
     target_selector: Optional[str] = None  # 滚动到特定元素
     smooth: bool = True
+    quiet_ms: int = 200  # 滚动结束的静默窗口（毫秒）
+    settle_selector: Optional[str] = None  # 懒加载内容的选择器，匹配数量变化即结束等待
 
 
 class PaginationParams(BaseModel):
@@ -143,21 +192,28 @@ class PaginationParams(BaseModel):
     next_button_selector: str
     max_pages: Optional[int] = None
     stop_condition: Optional[str] = None  # 停止条件选择器
+    extract: Optional[Dict[str, Any]] = None  # 每页执行的提取规则，格式同ExtractDataParams
+    quiet_ms: int = 500  # 翻页后DOM静默多久视为稳定（毫秒）
+    settle_timeout: int = 10000  # 翻页后等待稳定的上限（毫秒）
+    settle_selector: Optional[str] = None  # 列表项选择器，匹配数量变化即结束等待
 
 
 class WaitParams(BaseModel):
     """等待节点参数"""
-    wait_type: str  # time, element, condition
-    duration: Optional[int] = None  # 毫秒
+    wait_type: str  # time, element, condition, settle
+    duration: Optional[int] = None  # 毫秒（settle 时为超时上限）
     element_selector: Optional[str] = None
     condition: Optional[str] = None
+    quiet_ms: Optional[int] = None  # settle 的静默窗口（毫秒）
 
 
 class LoopParams(BaseModel):
     """循环节点参数"""
-    loop_type: str  # count, condition, infinite
+    loop_type: str  # count, condition, items, infinite
     count: Optional[int] = None
-    condition: Optional[str] = None
+    condition: Optional[str] = None  # JavaScript表达式，结果为真时结束循环
+    items_variable: Optional[str] = None  # items循环：要遍历的列表变量名
+    item_variable: str = "item"  # items循环：当前元素写入的变量名
     max_iterations: int = 100  # 防止无限循环
 
 
@@ -167,6 +223,7 @@ class ExtractDataParams(BaseModel):
     extract_type: str = "text"  # text, attribute, html
     attribute_name: Optional[str] = None
     multiple: bool = False  # 是否提取多个元素
+    row_selector: Optional[str] = None  # 行元素选择器：按行提取结构化记录，字段选择器相对于行元素
 
 
 # 参数类型映射
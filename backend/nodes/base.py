@@ -4,26 +4,46 @@
 """
 
 from abc import ABC, abstractmethod
-from typing import Dict, Any, Optional, List
-from playwright.async_api import Page, Browser
+from typing import Callable, Dict, Any, Optional, List
+from playwright.async_api import Page, Browser, BrowserContext
 from datetime import datetime
+import asyncio
+import copy
 import logging
+import time
 
 from models.workflow import StepResult, NodeType
+from storage.sinks import DataSink, MemorySink
+from .screenshots import ScreenshotPolicy, ScreenshotRecorder
+from .network import NetworkController
+from .retry import NodeTimeoutError, RetryPolicies, RetryPolicy
+from .templating import CompiledParams
 
 logger = logging.getLogger(__name__)
 
+EventCallback = Callable[[str, Dict[str, Any]], None]
+
 
 class ExecutionContext:
     """执行上下文 - 在节点间传递数据和状态"""
     
-    def __init__(self, browser: Browser, page: Page):
+    def __init__(self,
+                 browser: Browser,
+                 page: Page,
+                 browser_context: Optional[BrowserContext] = None,
+                 sink: Optional[DataSink] = None,
+                 screenshots: Optional[ScreenshotRecorder] = None,
+                 network: Optional[NetworkController] = None):
         self.browser = browser
+        self.browser_context = browser_context or page.context
         self.page = page
         self.variables: Dict[str, Any] = {}  # 存储变量
-        self.extracted_data: List[Dict[str, Any]] = []  # 存储提取的数据
+        self.sink: DataSink = sink or MemorySink()  # 提取数据的输出
         self.loop_counters: Dict[str, int] = {}  # 循环计数器
-        self.screenshots_dir = "screenshots"
+        self.screenshots = screenshots or ScreenshotRecorder(ScreenshotPolicy())  # 截图策略和后台写入
+        self.network = network or NetworkController()  # 请求拦截和网络统计
+        self.on_event: Optional[EventCallback] = None  # 执行事件的接收方（SSE推送）
+        self.retry_policies = RetryPolicies()  # 按节点类型的重试与超时策略
         
     def set_variable(self, name: str, value: Any):
         """设置变量"""
@@ -33,9 +53,42 @@ class ExecutionContext:
         """获取变量"""
         return self.variables.get(name, default)
         
+    @property
+    def extracted_data(self) -> List[Dict[str, Any]]:
+        """内存中保存的提取数据（文件型输出时为空，数据在文件中）"""
+        return getattr(self.sink, "records", [])
+    
+    @property
+    def extracted_count(self) -> int:
+        """已提取的记录总数"""
+        return self.sink.count
+        
     def add_extracted_data(self, data: Dict[str, Any]):
         """添加提取的数据"""
-        self.extracted_data.append(data)
+        self.sink.write(data)
+    
+    def emit(self, event_type: str, data: Dict[str, Any]):
+        """发布执行事件（没有接收方时忽略）"""
+        if self.on_event is None:
+            return
+        try:
+            self.on_event(event_type, data)
+        except Exception as e:
+            logger.warning(f"发布执行事件失败: {event_type}, 错误: {e}")
+    
+    def fork(self, page: Page) -> "ExecutionContext":
+        """
+        为并行分支创建上下文 - 与原上下文共享变量、提取数据等状态，只替换页面
+        
+        Args:
+            page: 分支使用的页面
+            
+        Returns:
+            ExecutionContext: 分支上下文
+        """
+        branch = copy.copy(self)
+        branch.page = page
+        return branch
 
 
 class BaseNode(ABC):
@@ -47,11 +100,25 @@ class BaseNode(ABC):
     description: str = ""
     required_params: List[str] = []
     optional_params: List[str] = []
+    # 非字符串参数：整个是一个 ${变量名} 时保留变量的原始类型，其余参数求值为字符串
+    typed_params: List[str] = []
+    # JavaScript表达式参数：其中未定义的 ${...} 是JavaScript的模板字符串，保留原样
+    script_params: List[str] = []
     
     def __init__(self, node_id: str, params: Dict[str, Any]):
         self.node_id = node_id
         self.params = params
         self._validate_params()
+        # 参数中的 ${变量名} 在实例化（编译执行计划）时解析一次
+        self.templates = CompiledParams(params, self.typed_params, self.script_params)
+    
+    def resolve_params(self, context: ExecutionContext) -> Dict[str, Any]:
+        """
+        本次执行的参数 - 占位符按上下文变量求值
+        
+        节点实例被并发执行共享，执行时从这里取参数，不能修改 self.params
+        """
+        return self.templates.resolve(context.variables)
     
     def _validate_params(self):
         """验证参数"""
@@ -62,6 +129,14 @@ class BaseNode(ABC):
         
         if missing_params:
             raise ValueError(f"节点 {self.node_id} 缺少必需参数: {missing_params}")
+        
+        # 节点级的重试策略覆盖，在编译时校验
+        retry = self.params.get("retry")
+        if retry is not None:
+            try:
+                RetryPolicy().merged(retry)
+            except (TypeError, ValueError) as e:
+                raise ValueError(f"节点 {self.node_id} 的 retry 参数无效: {e}")
     
     @abstractmethod
     async def execute(self, context: ExecutionContext) -> StepResult:
@@ -77,20 +152,8 @@ class BaseNode(ABC):
         pass
     
     async def take_screenshot(self, context: ExecutionContext, suffix: str = "") -> Optional[str]:
-        """截图"""
-        try:
-            import os
-            os.makedirs(context.screenshots_dir, exist_ok=True)
-            
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"{self.node_id}_{timestamp}{suffix}.png"
-            path = os.path.join(context.screenshots_dir, filename)
-            
-            await context.page.screenshot(path=path, full_page=True)
-            return path
-        except Exception as e:
-            logger.warning(f"截图失败: {e}")
-            return None
+        """截图（文件在后台写入）"""
+        return await context.screenshots.capture(context.page, self.node_id, suffix)
     
     def create_step_result(self, 
                           status: str,
@@ -112,36 +175,92 @@ class BaseNode(ABC):
         )
     
     async def safe_execute(self, context: ExecutionContext) -> StepResult:
-        """安全执行节点 - 包含错误处理"""
+        """安全执行节点 - 包含错误处理，按重试策略重试，按截图策略截图"""
         start_time = datetime.now()
         screenshot_path = None
+        policy = context.screenshots.policy
+        capture = policy.captures_node(self.node_type.value, context.screenshots.next_node_index())
+        retry_policy = context.retry_policies.for_node(self.node_type.value, self.params.get("retry"))
+        
+        started = time.monotonic()
+        deadline = started + retry_policy.deadline_ms / 1000 if retry_policy.deadline_ms else None
+        attempts = 0
+        first_failure: Optional[float] = None
         
         try:
             logger.info(f"开始执行节点: {self.node_id} ({self.node_type})")
             
             # 执行前截图
-            screenshot_path = await self.take_screenshot(context, "_before")
+            if capture:
+                screenshot_path = await self.take_screenshot(context, "_before")
             
-            # 执行节点逻辑
-            result = await self.execute(context)
+            # 执行节点逻辑，可恢复的错误按策略退避重试
+            while True:
+                attempts += 1
+                try:
+                    result = await self._execute_attempt(context, retry_policy, deadline)
+                    break
+                except Exception as e:
+                    if first_failure is None:
+                        first_failure = time.monotonic()
+                    delay = retry_policy.delay(attempts)
+                    if (attempts >= retry_policy.max_attempts or not retry_policy.retries(e)
+                            or (deadline is not None and time.monotonic() + delay >= deadline)):
+                        raise
+                    logger.warning(
+                        f"节点执行失败，{delay:.2f}秒后重试（第{attempts}次）: {self.node_id}, 错误: {e}"
+                    )
+                    await asyncio.sleep(delay)
             
             # 执行后截图
-            if result.status == "success":
-                await self.take_screenshot(context, "_after")
+            if capture and result.status == "success":
+                result.screenshot_path = await self.take_screenshot(context, "_after") or screenshot_path
             
             logger.info(f"节点执行成功: {self.node_id}")
-            return result
+            return self._record_attempts(result, attempts, first_failure)
             
         except Exception as e:
             error_msg = str(e)
             logger.error(f"节点执行失败: {self.node_id}, 错误: {error_msg}")
             
             # 错误时截图
-            await self.take_screenshot(context, "_error")
+            if policy.captures_errors:
+                screenshot_path = await self.take_screenshot(context, "_error") or screenshot_path
             
-            return self.create_step_result(
-                status="failed",
-                start_time=start_time,
-                error=error_msg,
-                screenshot_path=screenshot_path
+            return self._record_attempts(
+                self.create_step_result(
+                    status="failed",
+                    start_time=start_time,
+                    error=error_msg,
+                    screenshot_path=screenshot_path
+                ),
+                attempts,
+                first_failure
             )
+    
+    async def _execute_attempt(self,
+                               context: ExecutionContext,
+                               retry_policy: RetryPolicy,
+                               deadline: Optional[float]) -> StepResult:
+        """执行一次，受单次超时和整体截止时间限制"""
+        timeout = retry_policy.attempt_timeout_ms / 1000 if retry_policy.attempt_timeout_ms else None
+        if deadline is not None:
+            remaining = max(deadline - time.monotonic(), 0)
+            timeout = remaining if timeout is None else min(timeout, remaining)
+        if timeout is None:
+            return await self.execute(context)
+        
+        try:
+            return await asyncio.wait_for(self.execute(context), timeout)
+        except asyncio.TimeoutError as e:
+            if isinstance(e, NodeTimeoutError) or str(e):
+                # 节点内部的超时（如Playwright等待元素超时），保留原始错误
+                raise
+            raise NodeTimeoutError(f"节点执行超时（{int(timeout * 1000)}ms）")
+    
+    @staticmethod
+    def _record_attempts(result: StepResult, attempts: int, first_failure: Optional[float]) -> StepResult:
+        result.attempts = attempts
+        if first_failure is not None:
+            result.retry_time = round(time.monotonic() - first_failure, 3)
+        return result
@@ -4,14 +4,21 @@
 """
 
 import asyncio
+import logging
 from datetime import datetime
 from typing import Dict, Any, Optional, List
 from urllib.parse import urlparse
 import re
 
 from .base import BaseNode, ExecutionContext
+from .extraction import extract_records, is_failed_value
+from .waits import (
+    DEFAULT_QUIET_MS, DEFAULT_SETTLE_TIMEOUT, read_marker, settle, wait_for_marker_change
+)
 from models.workflow import NodeType, StepResult
 
+logger = logging.getLogger(__name__)
+
 
 class VisitPageNode(BaseNode):
     """访问页面节点"""
@@ -20,24 +27,41 @@ class VisitPageNode(BaseNode):
     display_name = "访问页面"
     description = "导航到指定的网页地址"
     required_params = ["url"]
-    optional_params = ["wait_for_load", "timeout"]
+    optional_params = ["wait_for_load", "timeout", "block_profile", "block_patterns", "quiet_ms"]
+    typed_params = ["wait_for_load", "timeout", "block_patterns", "quiet_ms"]
     
     async def execute(self, context: ExecutionContext) -> StepResult:
         start_time = datetime.now()
-        url = self.params["url"]
-        timeout = self.params.get("timeout", 30000)
-        wait_for_load = self.params.get("wait_for_load", True)
+        params = self.resolve_params(context)
+        url = params["url"]
+        timeout = params.get("timeout", 30000)
+        wait_for_load = params.get("wait_for_load", True)
+        block_profile = params.get("block_profile")
+        block_patterns = params.get("block_patterns", [])
         
         # 验证URL格式
         parsed_url = urlparse(url)
         if not parsed_url.scheme:
             url = "https://" + url
         
-        await context.page.goto(url, timeout=timeout)
+        if block_profile or block_patterns:
+            # 为当前页面设置请求拦截，以目标站点作为第一方
+            await context.network.apply_to_page(
+                context.page,
+                block_profile or "none",
+                block_patterns,
+                first_party=urlparse(url).hostname
+            )
+        
+        await context.page.goto(url, timeout=timeout, wait_until="domcontentloaded")
         
         if wait_for_load:
-            # 等待页面加载完成
-            await context.page.wait_for_load_state("networkidle")
+            # 等待页面DOM稳定（长轮询的页面永远达不到networkidle）
+            await settle(
+                context.page,
+                quiet_ms=params.get("quiet_ms", DEFAULT_QUIET_MS),
+                timeout=timeout
+            )
         
         # 获取最终URL（可能有重定向）
         final_url = context.page.url
@@ -60,45 +84,46 @@ class ClickElementNode(BaseNode):
     display_name = "点击元素"
     description = "点击页面上的指定元素"
     required_params = ["selector"]
-    optional_params = ["selector_type", "wait_timeout", "click_type"]
+    optional_params = ["selector_type", "wait_timeout", "click_type", "collect_metadata"]
+    typed_params = ["wait_timeout", "collect_metadata"]
+    
+    # 一次页面内求值取得元素的标签和文本
+    _METADATA_SCRIPT = "el => ({tag: el.tagName, text: el.textContent})"
     
     async def execute(self, context: ExecutionContext) -> StepResult:
         start_time = datetime.now()
-        selector = self.params["selector"]
-        selector_type = self.params.get("selector_type", "css")
-        timeout = self.params.get("wait_timeout", 10000)
-        click_type = self.params.get("click_type", "single")
+        params = self.resolve_params(context)
+        selector = params["selector"]
+        selector_type = params.get("selector_type", "css")
+        timeout = params.get("wait_timeout", 10000)
+        click_type = params.get("click_type", "single")
+        collect_metadata = params.get("collect_metadata", True)
         
-        # 等待元素出现
         if selector_type == "xpath":
             locator = context.page.locator(f"xpath={selector}")
         else:
             locator = context.page.locator(selector)
         
-        await locator.wait_for(state="visible", timeout=timeout)
+        # 点击前取元素信息（点击可能导致跳转或元素被移除），同时等待元素出现
+        metadata = {"tag": None, "text": None}
+        if collect_metadata:
+            metadata = await locator.evaluate(self._METADATA_SCRIPT, timeout=timeout)
         
-        # 滚动到元素可见区域
-        await locator.scroll_into_view_if_needed()
-        
-        # 执行点击
+        # 点击自带可操作性检查（可见、稳定、可用）并滚动到元素，不再单独等待和滚动
         if click_type == "double":
-            await locator.dblclick()
+            await locator.dblclick(timeout=timeout)
         elif click_type == "right":
-            await locator.click(button="right")
+            await locator.click(button="right", timeout=timeout)
         else:
-            await locator.click()
-        
-        # 获取元素信息
-        element_text = await locator.text_content()
-        element_tag = await locator.evaluate("el => el.tagName")
+            await locator.click(timeout=timeout)
         
         return self.create_step_result(
             status="success",
             start_time=start_time,
             result_data={
                 "selector": selector,
-                "element_text": element_text,
-                "element_tag": element_tag,
+                "element_text": metadata["text"],
+                "element_tag": metadata["tag"],
                 "click_type": click_type
             }
         )
@@ -111,33 +136,47 @@ class InputTextNode(BaseNode):
     display_name = "输入文本"
     description = "在指定的输入框中输入文本"
     required_params = ["selector", "text"]
-    optional_params = ["selector_type", "clear_first", "press_enter"]
+    optional_params = ["selector_type", "clear_first", "press_enter", "wait_timeout", "input_mode"]
+    typed_params = ["clear_first", "press_enter", "wait_timeout"]
+    
+    def _validate_params(self):
+        super()._validate_params()
+        input_mode = self.params.get("input_mode", "type")
+        if input_mode not in ("type", "fill"):
+            raise ValueError(f"节点 {self.node_id} 不支持的输入方式: {input_mode}")
     
     async def execute(self, context: ExecutionContext) -> StepResult:
         start_time = datetime.now()
-        selector = self.params["selector"]
-        text = self.params["text"]
-        selector_type = self.params.get("selector_type", "css")
-        clear_first = self.params.get("clear_first", True)
-        press_enter = self.params.get("press_enter", False)
-        
-        # 支持变量替换
-        if "${" in text:
-            for var_name, var_value in context.variables.items():
-                text = text.replace(f"${{{var_name}}}", str(var_value))
+        params = self.resolve_params(context)
+        selector = params["selector"]
+        text = params["text"]
+        selector_type = params.get("selector_type", "css")
+        clear_first = params.get("clear_first", True)
+        press_enter = params.get("press_enter", False)
+        timeout = params.get("wait_timeout", 10000)
+        input_mode = params.get("input_mode", "type")
         
         if selector_type == "xpath":
             locator = context.page.locator(f"xpath={selector}")
         else:
             locator = context.page.locator(selector)
         
-        await locator.wait_for(state="visible", timeout=10000)
-        await locator.scroll_into_view_if_needed()
-        
-        if clear_first:
-            await locator.clear()
-        
-        await locator.type(text)
+        # 第一个操作自带可操作性检查（可见、可用、可编辑）并滚动到元素，不再单独等待和滚动
+        if input_mode == "fill":
+            # 一次设置输入框的值，只触发input事件，没有逐个按键的事件
+            if clear_first:
+                await locator.fill(text, timeout=timeout)
+            else:
+                await locator.focus(timeout=timeout)
+                await context.page.keyboard.press("End")
+                await context.page.keyboard.insert_text(text)
+        else:
+            # 逐个字符输入，触发每个按键的keydown/keypress/keyup事件
+            if clear_first:
+                await locator.clear(timeout=timeout)
+                await locator.type(text)
+            else:
+                await locator.type(text, timeout=timeout)
         
         if press_enter:
             await locator.press("Enter")
@@ -148,6 +187,7 @@ class InputTextNode(BaseNode):
             result_data={
                 "selector": selector,
                 "text": text,
+                "input_mode": input_mode,
                 "cleared_first": clear_first,
                 "pressed_enter": press_enter
             }
@@ -161,28 +201,44 @@ class ScrollPageNode(BaseNode):
     display_name = "滚动页面"
     description = "滚动页面到指定位置或方向"
     required_params = ["direction"]
-    optional_params = ["distance", "target_selector", "smooth"]
+    optional_params = [
+        "distance", "target_selector", "smooth", "quiet_ms", "settle_timeout", "settle_selector"
+    ]
+    typed_params = ["distance", "smooth", "quiet_ms", "settle_timeout"]
+    
+    # 滚动本身会持续触发scroll事件，静默窗口可以比页面加载短
+    default_quiet_ms = 200
+    # 一直有DOM变化的页面（轮播、计时器）每次滚动都要等到上限，上限也比页面加载短
+    default_settle_timeout = 3000
     
     async def execute(self, context: ExecutionContext) -> StepResult:
         start_time = datetime.now()
-        direction = self.params["direction"]
-        distance = self.params.get("distance", 500)
-        target_selector = self.params.get("target_selector")
-        smooth = self.params.get("smooth", True)
+        params = self.resolve_params(context)
+        direction = params["direction"]
+        distance = params.get("distance", 500)
+        target_selector = params.get("target_selector")
+        smooth = params.get("smooth", True)
         
         if direction == "to_element" and target_selector:
             # 滚动到指定元素
-            locator = context.page.locator(target_selector)
-            await locator.scroll_into_view_if_needed()
+            action = context.page.locator(target_selector).scroll_into_view_if_needed()
             scroll_info = "滚动到元素"
         else:
             # 按方向滚动
             scroll_script = self._generate_scroll_script(direction, distance, smooth)
-            await context.page.evaluate(scroll_script)
+            action = context.page.evaluate(scroll_script)
             scroll_info = f"滚动{direction} {distance}px"
         
-        # 等待滚动完成
-        await asyncio.sleep(0.5)
+        # 等待滚动结束；配置 settle_selector 时等待懒加载的元素数量变化。
+        # 滚动本身就是页面变化，不要求额外的反应，懒加载发出的请求照常等待返回
+        settled = await settle(
+            context.page,
+            action,
+            quiet_ms=params.get("quiet_ms", self.default_quiet_ms),
+            timeout=params.get("settle_timeout", self.default_settle_timeout),
+            selector=params.get("settle_selector"),
+            require_activity=False
+        )
         
         # 获取当前滚动位置
         scroll_position = await context.page.evaluate(
@@ -196,7 +252,8 @@ class ScrollPageNode(BaseNode):
                 "direction": direction,
                 "distance": distance,
                 "scroll_position": scroll_position,
-                "action": scroll_info
+                "action": scroll_info,
+                "settled": settled["reason"]
             }
         )
     
@@ -217,58 +274,142 @@ class ScrollPageNode(BaseNode):
 
 
 class PaginationNode(BaseNode):
-    """分页节点"""
+    """
+    分页节点
+    
+    配置 extract 参数后，每一页都会按提取规则提取数据并逐页写入上下文，
+    无需为每一页复制提取节点。翻页后等页面标记（page_marker、settle_selector 或
+    extract.row_selector 匹配的内容）变化再继续，标记一直不变时停止，不重复提取同一页
+    """
     
     node_type = NodeType.PAGINATION
     display_name = "分页处理"
     description = "自动处理页面分页，点击下一页按钮"
     required_params = ["next_button_selector"]
-    optional_params = ["max_pages", "stop_condition"]
+    optional_params = [
+        "max_pages", "stop_condition", "extract", "quiet_ms", "settle_timeout", "settle_selector",
+        "page_marker"
+    ]
+    typed_params = ["max_pages", "quiet_ms", "settle_timeout"]
+    
+    def _validate_params(self):
+        super()._validate_params()
+        extract = self.params.get("extract")
+        if extract is not None and not extract.get("selectors"):
+            raise ValueError(f"节点 {self.node_id} 的 extract 参数缺少 selectors")
     
     async def execute(self, context: ExecutionContext) -> StepResult:
         start_time = datetime.now()
-        next_button_selector = self.params["next_button_selector"]
-        max_pages = self.params.get("max_pages", 10)
-        stop_condition = self.params.get("stop_condition")
+        params = self.resolve_params(context)
+        next_button_selector = params["next_button_selector"]
+        max_pages = params.get("max_pages", 10)
+        stop_condition = params.get("stop_condition")
+        extract = params.get("extract")
+        quiet_ms = params.get("quiet_ms", DEFAULT_QUIET_MS)
+        settle_timeout = params.get("settle_timeout", DEFAULT_SETTLE_TIMEOUT)
+        settle_selector = params.get("settle_selector")
+        marker_selector = (
+            params.get("page_marker") or settle_selector or (extract or {}).get("row_selector")
+        )
         
         pages_processed = 0
-        
-        while pages_processed < max_pages:
-            # 检查停止条件
-            if stop_condition:
-                stop_elements = await context.page.locator(stop_condition).count()
-                if stop_elements == 0:
-                    break
+        records_emitted = 0
+        settle_timeouts = 0
+        # 内存输出时记录保留在步骤结果中（与提取数据节点一致），写入文件时只保留数量
+        kept_records: Optional[List[Dict[str, Any]]] = [] if extract and not context.sink.path else None
+        stopped_reason = "reached_max"
+        
+        while True:
+            can_continue = pages_processed < max_pages
             
-            # 查找下一页按钮
-            next_button = context.page.locator(next_button_selector)
+            if extract:
+                # 提取当前页与检查下一页按钮都是只读操作，同时进行
+                records, has_next = await asyncio.gather(
+                    extract_records(context.page, extract),
+                    self._has_next_page(context, next_button_selector, stop_condition, can_continue)
+                )
+                for record in records:
+                    record["_page"] = pages_processed + 1
+                    context.add_extracted_data(record)
+                records_emitted += len(records)
+                if kept_records is not None:
+                    kept_records.extend(records)
+            else:
+                has_next = await self._has_next_page(
+                    context, next_button_selector, stop_condition, can_continue
+                )
             
-            # 检查按钮是否存在且可点击
-            if await next_button.count() == 0:
+            if not can_continue:
                 break
-            
-            if not await next_button.is_enabled():
+            if not has_next:
+                stopped_reason = "no_more_pages"
                 break
             
-            # 点击下一页
+            # 点击下一页并等待新内容稳定（整页跳转和局部刷新都适用）
+            next_button = context.page.locator(next_button_selector)
             await next_button.scroll_into_view_if_needed()
-            await next_button.click()
+            marker = await read_marker(context.page, marker_selector) if marker_selector else None
+            settled = await settle(
+                context.page,
+                next_button.click(),
+                quiet_ms=quiet_ms,
+                timeout=settle_timeout,
+                selector=settle_selector
+            )
+            if settled["reason"] == "timeout":
+                settle_timeouts += 1
             
-            # 等待页面加载
-            await context.page.wait_for_load_state("networkidle")
-            await asyncio.sleep(1)  # 额外等待
+            # 每页条数固定时数量检查不会触发，页面稳定后再确认内容确实换了
+            if marker_selector and not await wait_for_marker_change(
+                context.page, marker_selector, marker,
+                max(settle_timeout - settled["elapsed_ms"], 0)
+            ):
+                logger.warning(f"翻页后 {marker_selector} 的内容没有变化，停止分页")
+                stopped_reason = "page_unchanged"
+                break
             
             pages_processed += 1
         
+        result_data = {
+            "pages_processed": pages_processed,
+            "max_pages": max_pages,
+            "stopped_reason": stopped_reason,
+            "settle_timeouts": settle_timeouts
+        }
+        if extract:
+            result_data["records_emitted"] = records_emitted
+            if kept_records is not None:
+                result_data["extracted_data"] = kept_records
+            else:
+                result_data["data_file"] = context.sink.path
+        
         return self.create_step_result(
             status="success",
             start_time=start_time,
-            result_data={
-                "pages_processed": pages_processed,
-                "max_pages": max_pages,
-                "stopped_reason": "reached_max" if pages_processed >= max_pages else "no_more_pages"
-            }
+            result_data=result_data
         )
+    
+    async def _has_next_page(self,
+                             context: ExecutionContext,
+                             next_button_selector: str,
+                             stop_condition: Optional[str],
+                             enabled: bool = True) -> bool:
+        """检查是否还有下一页"""
+        if not enabled:
+            return False
+        
+        # 检查停止条件
+        if stop_condition:
+            stop_elements = await context.page.locator(stop_condition).count()
+            if stop_elements == 0:
+                return False
+        
+        # 检查按钮是否存在且可点击
+        next_button = context.page.locator(next_button_selector)
+        if await next_button.count() == 0:
+            return False
+        
+        return await next_button.is_enabled()
 
 
 class WaitNode(BaseNode):
@@ -278,20 +419,23 @@ class WaitNode(BaseNode):
     display_name = "等待"
     description = "等待指定时间或条件满足"
     required_params = ["wait_type"]
-    optional_params = ["duration", "element_selector", "condition"]
+    optional_params = ["duration", "element_selector", "condition", "quiet_ms"]
+    typed_params = ["duration", "quiet_ms"]
+    script_params = ["condition"]
     
     async def execute(self, context: ExecutionContext) -> StepResult:
         start_time = datetime.now()
-        wait_type = self.params["wait_type"]
+        params = self.resolve_params(context)
+        wait_type = params["wait_type"]
         
         if wait_type == "time":
-            duration = self.params.get("duration", 1000)  # 毫秒
+            duration = params.get("duration", 1000)  # 毫秒
             await asyncio.sleep(duration / 1000)
             wait_info = f"等待了 {duration}ms"
         
         elif wait_type == "element":
-            element_selector = self.params["element_selector"]
-            timeout = self.params.get("duration", 30000)
+            element_selector = params["element_selector"]
+            timeout = params.get("duration", 30000)
             await context.page.locator(element_selector).wait_for(
                 state="visible", 
                 timeout=timeout
@@ -299,12 +443,13 @@ class WaitNode(BaseNode):
             wait_info = f"等待元素出现: {element_selector}"
         
         elif wait_type == "condition":
-            condition = self.params["condition"]
-            timeout = self.params.get("duration", 30000)
+            condition = params["condition"]
+            timeout = params.get("duration", 30000)
             
             # 支持常见的等待条件
             if condition == "page_load":
-                await context.page.wait_for_load_state("networkidle", timeout=timeout)
+                await context.page.wait_for_load_state("load", timeout=timeout)
+                await settle(context.page, timeout=timeout)
             elif condition == "dom_ready":
                 await context.page.wait_for_load_state("domcontentloaded", timeout=timeout)
             else:
@@ -313,6 +458,19 @@ class WaitNode(BaseNode):
             
             wait_info = f"等待条件满足: {condition}"
         
+        elif wait_type == "settle":
+            # 等待DOM静默；指定 element_selector 时其匹配数量变化即结束
+            settled = await settle(
+                context.page,
+                quiet_ms=params.get("quiet_ms", DEFAULT_QUIET_MS),
+                timeout=params.get("duration", DEFAULT_SETTLE_TIMEOUT),
+                selector=params.get("element_selector")
+            )
+            wait_info = f"页面稳定: {settled['reason']}，用时 {settled['elapsed_ms']}ms"
+        
+        else:
+            raise ValueError(f"不支持的等待类型: {wait_type}")
+        
         return self.create_step_result(
             status="success",
             start_time=start_time,
@@ -330,29 +488,37 @@ class LoopNode(BaseNode):
     display_name = "循环"
     description = "循环执行指定次数或直到满足条件"
     required_params = ["loop_type"]
-    optional_params = ["count", "condition", "max_iterations"]
+    optional_params = ["count", "condition", "items_variable", "item_variable", "max_iterations"]
+    typed_params = ["count", "max_iterations"]
+    script_params = ["condition"]
     
     async def execute(self, context: ExecutionContext) -> StepResult:
         start_time = datetime.now()
-        loop_type = self.params["loop_type"]
+        params = self.resolve_params(context)
+        loop_type = params["loop_type"]
         
-        # 注意：循环的具体执行逻辑需要在WorkflowEngine中实现
-        # 这里只是记录循环开始
+        # 注意：这里只初始化循环，循环体由WorkflowEngine按迭代调度执行
         
         if loop_type == "count":
-            count = self.params.get("count", 1)
-            context.loop_counters[self.node_id] = 0
+            count = params.get("count", 1)
             loop_info = f"开始计数循环，总次数: {count}"
         
         elif loop_type == "condition":
-            condition = self.params["condition"]
-            context.loop_counters[self.node_id] = 0
+            condition = params["condition"]
             loop_info = f"开始条件循环，条件: {condition}"
         
+        elif loop_type == "items":
+            items_variable = params["items_variable"]
+            loop_info = f"开始遍历列表，变量: {items_variable}"
+        
         elif loop_type == "infinite":
-            context.loop_counters[self.node_id] = 0
             loop_info = "开始无限循环"
         
+        else:
+            raise ValueError(f"不支持的循环类型: {loop_type}")
+        
+        context.loop_counters[self.node_id] = 0
+        
         return self.create_step_result(
             status="success",
             start_time=start_time,
@@ -362,72 +528,97 @@ class LoopNode(BaseNode):
                 "current_iteration": 0
             }
         )
+    
+    async def should_continue(self, context: ExecutionContext, iteration: int) -> bool:
+        """
+        判断是否执行下一轮迭代
+        
+        Args:
+            context: 执行上下文
+            iteration: 已完成的迭代次数
+            
+        Returns:
+            bool: 是否继续
+        """
+        params = self.resolve_params(context)
+        # 次数可能来自变量（如批量执行的行字段），按整数比较
+        if iteration >= int(params.get("max_iterations", 100)):
+            return False
+        
+        loop_type = params["loop_type"]
+        if loop_type == "count":
+            return iteration < int(params.get("count", 1))
+        if loop_type == "condition":
+            # 条件满足时结束循环
+            return not await context.page.evaluate(params["condition"])
+        if loop_type == "items":
+            items = context.get_variable(params["items_variable"]) or []
+            return iteration < len(items)
+        return True
+    
+    def begin_iteration(self, context: ExecutionContext, iteration: int):
+        """开始一轮迭代 - 更新计数器和循环变量"""
+        params = self.resolve_params(context)
+        context.loop_counters[self.node_id] = iteration
+        context.set_variable("loop_index", iteration)
+        
+        if params["loop_type"] == "items":
+            items = context.get_variable(params["items_variable"])
+            context.set_variable(params.get("item_variable", "item"), items[iteration])
 
 
 class ExtractDataNode(BaseNode):
-    """提取数据节点"""
+    """
+    提取数据节点
+    
+    所有字段在一次页面内求值中提取；配置 row_selector 时按行返回结构化记录，
+    每行作为一条数据写入上下文。记录与分页节点的一样带 _page 页码（单页为1），
+    同一输出中的记录字段一致
+    """
     
     node_type = NodeType.EXTRACT_DATA
     display_name = "提取数据"
     description = "从页面中提取指定数据"
     required_params = ["selectors"]
-    optional_params = ["extract_type", "attribute_name", "multiple"]
+    optional_params = ["extract_type", "attribute_name", "multiple", "row_selector"]
+    typed_params = ["multiple"]
     
     async def execute(self, context: ExecutionContext) -> StepResult:
         start_time = datetime.now()
-        selectors = self.params["selectors"]  # Dict[str, str]
-        extract_type = self.params.get("extract_type", "text")
-        attribute_name = self.params.get("attribute_name")
-        multiple = self.params.get("multiple", False)
-        
-        extracted_data = {}
-        
-        for field_name, selector in selectors.items():
-            try:
-                locator = context.page.locator(selector)
-                
-                if multiple:
-                    # 提取多个元素
-                    elements = await locator.all()
-                    values = []
-                    
-                    for element in elements:
-                        value = await self._extract_value(element, extract_type, attribute_name)
-                        if value:
-                            values.append(value)
-                    
-                    extracted_data[field_name] = values
-                else:
-                    # 提取单个元素
-                    if await locator.count() > 0:
-                        value = await self._extract_value(locator.first, extract_type, attribute_name)
-                        extracted_data[field_name] = value
-                    else:
-                        extracted_data[field_name] = None
-                        
-            except Exception as e:
-                extracted_data[field_name] = f"提取失败: {str(e)}"
+        params = self.resolve_params(context)
+        selectors = params["selectors"]  # Dict[str, str]
+        
+        records = await extract_records(context.page, params)
         
         # 将提取的数据添加到上下文
-        context.add_extracted_data(extracted_data)
+        for record in records:
+            record["_page"] = 1
+            context.add_extracted_data(record)
         
-        return self.create_step_result(
-            status="success",
-            start_time=start_time,
-            result_data={
+        if params.get("row_selector"):
+            result_data = {
+                "extracted_data": records,
+                "total_fields": len(selectors),
+                "total_rows": len(records)
+            }
+        else:
+            extracted_data = records[0]
+            result_data = {
                 "extracted_data": extracted_data,
                 "total_fields": len(selectors),
-                "successful_fields": len([v for v in extracted_data.values() if v is not None and not str(v).startswith("提取失败")])
+                "successful_fields": len([
+                    name for name in selectors if not is_failed_value(extracted_data.get(name))
+                ])
             }
+        
+        if context.sink.path:
+            # 数据已写入文件，步骤结果只保留数量和文件引用
+            del result_data["extracted_data"]
+            result_data["records"] = len(records)
+            result_data["data_file"] = context.sink.path
+        
+        return self.create_step_result(
+            status="success",
+            start_time=start_time,
+            result_data=result_data
         )
-    
-    async def _extract_value(self, locator, extract_type: str, attribute_name: str = None):
-        """提取元素值"""
-        if extract_type == "text":
-            return await locator.text_content()
-        elif extract_type == "html":
-            return await locator.inner_html()
-        elif extract_type == "attribute" and attribute_name:
-            return await locator.get_attribute(attribute_name)
-        else:
-            return await locator.text_content()  # 默认提取文本
@@ -60,7 +60,7 @@ class EndNode(BaseNode):
             result_data={
                 "message": "工作流已完成",
                 "total_duration": total_duration,
-                "total_extracted_data": len(context.extracted_data),
+                "total_extracted_data": context.extracted_count,
                 "final_url": context.page.url,
                 "variables_count": len(context.variables)
             }
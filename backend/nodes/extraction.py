@@ -0,0 +1,188 @@
+"""
+数据提取
+ExtractDataNode 和 PaginationNode 共用的页面数据提取逻辑
+
+所有字段的所有匹配元素在一次页面内求值中读取完毕；只有浏览器原生
+querySelectorAll 不支持的选择器（xpath、text= 等Playwright扩展语法）
+才退回到逐字段的定位器路径
+"""
+
+from typing import Any, Dict, List, Optional
+
+from playwright.async_api import Page
+
+# 页面内批量读取：单次求值返回所有字段的值，按字段捕获选择器错误
+_BULK_EXTRACT_SCRIPT = """
+({ selectors, extractType, attributeName, multiple }) => {
+    const read = (el) => {
+        if (!el) return null;
+        if (extractType === 'html') return el.innerHTML;
+        if (extractType === 'attribute' && attributeName) return el.getAttribute(attributeName);
+        return el.textContent;
+    };
+    const result = {};
+    for (const [name, selector] of Object.entries(selectors)) {
+        try {
+            result[name] = multiple
+                ? Array.from(document.querySelectorAll(selector), read).filter(v => v)
+                : read(document.querySelector(selector));
+        } catch (e) {
+            result[name] = { __unsupported__: String(e) };
+        }
+    }
+    return result;
+}
+"""
+
+# 按行读取：每个行元素内按字段选择器读取，直接返回结构化的记录
+_ROWS_EXTRACT_SCRIPT = """
+({ rowSelector, selectors, extractType, attributeName }) => {
+    const read = (el) => {
+        if (!el) return null;
+        if (extractType === 'html') return el.innerHTML;
+        if (extractType === 'attribute' && attributeName) return el.getAttribute(attributeName);
+        return el.textContent;
+    };
+    const fields = Object.entries(selectors);
+    return Array.from(document.querySelectorAll(rowSelector), row => {
+        const record = {};
+        for (const [name, selector] of fields) {
+            record[name] = selector ? read(row.querySelector(selector)) : read(row);
+        }
+        return record;
+    });
+}
+"""
+
+# 定位器路径下一次读取所有匹配元素
+_READ_ALL_SCRIPT = """
+(elements, { extractType, attributeName }) => elements.map(el => {
+    if (extractType === 'html') return el.innerHTML;
+    if (extractType === 'attribute' && attributeName) return el.getAttribute(attributeName);
+    return el.textContent;
+}).filter(v => v)
+"""
+
+
+def is_failed_value(value: Any) -> bool:
+    """字段值是否为提取失败的标记"""
+    return value is None or str(value).startswith("提取失败")
+
+
+async def extract_fields(page: Page,
+                         selectors: Dict[str, str],
+                         extract_type: str = "text",
+                         attribute_name: Optional[str] = None,
+                         multiple: bool = False) -> Dict[str, Any]:
+    """
+    按字段选择器从页面提取数据
+
+    Args:
+        page: 页面
+        selectors: 字段名 -> 选择器
+        extract_type: 提取类型（text/html/attribute）
+        attribute_name: 属性名（extract_type为attribute时）
+        multiple: 是否提取多个元素
+
+    Returns:
+        Dict[str, Any]: 字段名 -> 值（multiple时为值列表），单个字段失败时值为失败描述
+    """
+    options = {"extractType": extract_type, "attributeName": attribute_name}
+
+    try:
+        extracted_data = await page.evaluate(
+            _BULK_EXTRACT_SCRIPT,
+            {"selectors": selectors, "multiple": multiple, **options}
+        )
+    except Exception as e:
+        return {field_name: f"提取失败: {str(e)}" for field_name in selectors}
+
+    for field_name, selector in selectors.items():
+        value = extracted_data.get(field_name)
+        if not (isinstance(value, dict) and "__unsupported__" in value):
+            continue
+
+        # 原生选择器不支持的语法，改用Playwright定位器
+        try:
+            locator = page.locator(selector)
+
+            if multiple:
+                extracted_data[field_name] = await locator.evaluate_all(_READ_ALL_SCRIPT, options)
+            else:
+                # 提取单个元素
+                if await locator.count() > 0:
+                    extracted_data[field_name] = await extract_value(
+                        locator.first, extract_type, attribute_name
+                    )
+                else:
+                    extracted_data[field_name] = None
+
+        except Exception as e:
+            extracted_data[field_name] = f"提取失败: {str(e)}"
+
+    return extracted_data
+
+
+async def extract_rows(page: Page,
+                       row_selector: str,
+                       selectors: Dict[str, str],
+                       extract_type: str = "text",
+                       attribute_name: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    按行提取结构化记录 - 每个匹配 row_selector 的元素生成一条记录
+
+    Args:
+        page: 页面
+        row_selector: 行元素的CSS选择器
+        selectors: 字段名 -> 行内的CSS选择器（为空表示行元素本身）
+        extract_type: 提取类型（text/html/attribute）
+        attribute_name: 属性名（extract_type为attribute时）
+
+    Returns:
+        List[Dict[str, Any]]: 记录列表
+    """
+    return await page.evaluate(
+        _ROWS_EXTRACT_SCRIPT,
+        {
+            "rowSelector": row_selector,
+            "selectors": selectors,
+            "extractType": extract_type,
+            "attributeName": attribute_name
+        }
+    )
+
+
+async def extract_records(page: Page, spec: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    按提取参数（格式同ExtractDataParams）提取记录
+
+    配置 row_selector 时每行一条记录，否则整个页面一条记录
+    """
+    extract_type = spec.get("extract_type", "text")
+    attribute_name = spec.get("attribute_name")
+
+    if spec.get("row_selector"):
+        return await extract_rows(
+            page, spec["row_selector"], spec["selectors"], extract_type, attribute_name
+        )
+
+    record = await extract_fields(
+        page,
+        spec["selectors"],
+        extract_type=extract_type,
+        attribute_name=attribute_name,
+        multiple=spec.get("multiple", False)
+    )
+    return [record]
+
+
+async def extract_value(locator, extract_type: str, attribute_name: str = None):
+    """提取元素值"""
+    if extract_type == "text":
+        return await locator.text_content()
+    elif extract_type == "html":
+        return await locator.inner_html()
+    elif extract_type == "attribute" and attribute_name:
+        return await locator.get_attribute(attribute_name)
+    else:
+        return await locator.text_content()  # 默认提取文本
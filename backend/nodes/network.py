@@ -0,0 +1,223 @@
+"""
+网络请求拦截
+按预设的拦截配置（或自定义URL通配符）中止不需要的请求，例如图片、字体、
+媒体和第三方脚本，并统计每次执行拦截的请求数量和放行的响应字节数；
+也负责把一次执行的网络响应录制为HAR存档，以及在离线执行时从存档回放
+"""
+
+import fnmatch
+import logging
+import os
+from typing import Any, Dict, Iterable, List, Optional, Set
+from urllib.parse import urlparse
+
+from playwright.async_api import BrowserContext, Page, Request, Response, Route
+
+logger = logging.getLogger(__name__)
+
+# 拦截配置：资源类型、是否拦截第三方请求、URL通配符
+BLOCKING_PROFILES: Dict[str, Dict[str, Any]] = {
+    "none": {},
+    "block_media": {
+        "resource_types": {"image", "media", "font"},
+    },
+    "block_third_party": {
+        "third_party": True,
+    },
+    "block_trackers": {
+        "patterns": [
+            "*google-analytics.com*",
+            "*googletagmanager.com*",
+            "*doubleclick.net*",
+            "*hm.baidu.com*",
+            "*facebook.net*",
+        ],
+    },
+    "text_only": {
+        "resource_types": {"image", "media", "font", "stylesheet"},
+        "third_party": True,
+    },
+}
+
+
+# HAR模式：off 不录制；record 录制本次执行的所有响应；replay 只从存档回放，不访问网络
+HAR_MODES = ("off", "record", "replay")
+
+
+def _site(host: str) -> str:
+    """粗略的站点标识：主机名的最后两段"""
+    parts = host.lower().split(".")
+    return ".".join(parts[-2:]) if len(parts) >= 2 else host.lower()
+
+
+class NetworkStats:
+    """单次执行的网络统计（分支上下文共享同一个实例）"""
+
+    def __init__(self):
+        self.blocked_requests = 0
+        self.blocked_by_type: Dict[str, int] = {}
+        self.responses = 0
+        self.response_bytes = 0  # 放行的响应字节数（按Content-Length统计）
+
+    def record_blocked(self, resource_type: str):
+        self.blocked_requests += 1
+        self.blocked_by_type[resource_type] = self.blocked_by_type.get(resource_type, 0) + 1
+
+    def record_response(self, response: Response):
+        self.responses += 1
+        length = response.headers.get("content-length")
+        if length and length.isdigit():
+            self.response_bytes += int(length)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "blocked_requests": self.blocked_requests,
+            "blocked_by_type": dict(self.blocked_by_type),
+            "responses": self.responses,
+            "response_bytes": self.response_bytes,
+        }
+
+
+class RequestBlocker:
+    """请求拦截规则"""
+
+    def __init__(self,
+                 stats: NetworkStats,
+                 resource_types: Iterable[str] = (),
+                 third_party: bool = False,
+                 patterns: Iterable[str] = (),
+                 first_party: Optional[str] = None):
+        """
+        Args:
+            stats: 统计对象
+            resource_types: 要拦截的资源类型
+            third_party: 是否拦截第三方请求
+            patterns: 要拦截的URL通配符
+            first_party: 第一方站点的主机名；为空时使用请求所在页面的当前地址
+        """
+        self.stats = stats
+        self.resource_types: Set[str] = set(resource_types)
+        self.third_party = third_party
+        self.patterns: List[str] = list(patterns)
+        self.first_party = _site(first_party) if first_party else None
+
+    def should_block(self, request: Request) -> bool:
+        # 顶层页面导航永远放行
+        if request.is_navigation_request() and request.frame.parent_frame is None:
+            return False
+        if request.resource_type in self.resource_types:
+            return True
+        url = request.url
+        if self.third_party:
+            first_party = self.first_party or self._current_site(request)
+            host = urlparse(url).hostname or ""
+            if first_party and host and _site(host) != first_party:
+                return True
+        return any(fnmatch.fnmatchcase(url, pattern) for pattern in self.patterns)
+
+    @staticmethod
+    def _current_site(request: Request) -> Optional[str]:
+        """未指定第一方站点时，以请求所在页面当前的地址为准"""
+        try:
+            host = urlparse(request.frame.page.main_frame.url).hostname
+        except Exception:
+            return None
+        return _site(host) if host else None
+
+    async def handle(self, route: Route):
+        request = route.request
+        if self.should_block(request):
+            self.stats.record_blocked(request.resource_type)
+            await route.abort("blockedbyclient")
+        else:
+            # 放行时交给下一层路由（页面级规则之后是上下文级规则），没有则发往网络
+            await route.fallback()
+
+
+class NetworkController:
+    """单次执行的请求拦截管理 - 记录每个页面当前生效的拦截规则"""
+
+    def __init__(self):
+        self.stats = NetworkStats()
+        self._page_blockers: Dict[int, RequestBlocker] = {}
+
+    def build_blocker(self,
+                      profile: str,
+                      patterns: Iterable[str] = (),
+                      first_party: Optional[str] = None) -> Optional[RequestBlocker]:
+        """按配置名称和自定义通配符构建拦截规则，无需拦截时返回None"""
+        if profile not in BLOCKING_PROFILES:
+            raise ValueError(f"不支持的请求拦截配置: {profile}")
+        config = BLOCKING_PROFILES[profile]
+        patterns = list(config.get("patterns", [])) + list(patterns or [])
+        if not (config.get("resource_types") or config.get("third_party") or patterns):
+            return None
+        return RequestBlocker(
+            self.stats,
+            resource_types=config.get("resource_types", ()),
+            third_party=config.get("third_party", False),
+            patterns=patterns,
+            first_party=first_party
+        )
+
+    async def attach(self, browser_context: BrowserContext, profile: str = "none"):
+        """
+        在浏览器上下文上启用统计和默认拦截配置（对所有页面生效）
+
+        Args:
+            browser_context: 浏览器上下文
+            profile: 默认拦截配置
+        """
+        browser_context.on("response", self.stats.record_response)
+        blocker = self.build_blocker(profile)
+        if blocker:
+            await browser_context.route("**/*", blocker.handle)
+            logger.info(f"已启用请求拦截配置: {profile}")
+
+    async def apply_to_page(self,
+                            page: Page,
+                            profile: str,
+                            patterns: Iterable[str] = (),
+                            first_party: Optional[str] = None):
+        """
+        为单个页面设置拦截规则，替换该页面之前的规则
+
+        Args:
+            page: 页面
+            profile: 拦截配置名称
+            patterns: 额外的URL通配符
+            first_party: 第一方站点的主机名（用于识别第三方请求）
+        """
+        previous = self._page_blockers.pop(id(page), None)
+        if previous:
+            await page.unroute("**/*", previous.handle)
+
+        blocker = self.build_blocker(profile, patterns, first_party)
+        if blocker:
+            self._page_blockers[id(page)] = blocker
+            await page.route("**/*", blocker.handle)
+
+    async def attach_har(self, browser_context: BrowserContext, mode: str, path: str):
+        """
+        在浏览器上下文上启用HAR录制或回放
+
+        需要在 attach 之前调用：后注册的拦截规则先执行，被拦截的请求既不录制也不回放
+
+        Args:
+            browser_context: 浏览器上下文
+            mode: record 或 replay
+            path: 存档路径（.har.zip 时响应内容单独存放在压缩包中）
+        """
+        if mode == "record":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            # 存档在浏览器上下文关闭时写出
+            await browser_context.route_from_har(path, update=True)
+            logger.info(f"正在录制HAR: {path}")
+        elif mode == "replay":
+            if not os.path.exists(path):
+                raise ValueError(f"HAR存档不存在: {path}")
+            # 存档中没有的请求直接中止，回放期间不访问网络
+            await browser_context.route_from_har(path, not_found="abort")
+            logger.info(f"正在从HAR回放: {path}")
+        elif mode != "off":
+            raise ValueError(f"不支持的HAR模式: {mode}")
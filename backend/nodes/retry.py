@@ -0,0 +1,139 @@
+"""
+节点重试与超时策略
+按节点类型配置默认策略，单个节点可以通过 retry 参数覆盖。只重试可恢复的错误
+（超时、网络错误、元素暂时不可操作），参数错误等确定性失败不重试
+"""
+
+import asyncio
+import random
+from typing import Any, Dict, Iterable, Optional
+
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+
+# 可重试的错误类别
+ERROR_CLASSES = ("timeout", "network", "element", "any")
+
+# 内置的按节点类型默认策略；会重复写入数据的节点（分页、循环）默认不重试
+DEFAULT_NODE_POLICIES: Dict[str, Dict[str, Any]] = {
+    "visit_page": {"max_attempts": 3},
+    "click_element": {"max_attempts": 3},
+    "input_text": {"max_attempts": 2},
+    "scroll_page": {"max_attempts": 2},
+    "extract_data": {"max_attempts": 2},
+    "wait": {"max_attempts": 1},
+}
+
+_NETWORK_MARKERS = ("net::err", "ns_error", "connection refused", "connection reset", "econnreset")
+_ELEMENT_MARKERS = (
+    "not attached", "detached", "not visible", "not stable", "not enabled",
+    "intercepts pointer events", "element is outside of the viewport"
+)
+
+
+class NodeTimeoutError(TimeoutError):
+    """节点单次执行或整体截止时间超时"""
+
+
+def classify_error(error: BaseException) -> str:
+    """错误类别：timeout / network / element / other"""
+    if isinstance(error, (TimeoutError, asyncio.TimeoutError, PlaywrightTimeoutError)):
+        return "timeout"
+    message = str(error).lower()
+    if any(marker in message for marker in _NETWORK_MARKERS):
+        return "network"
+    if any(marker in message for marker in _ELEMENT_MARKERS):
+        return "element"
+    return "other"
+
+
+class RetryPolicy:
+    """单个节点的重试与超时策略（只读）"""
+
+    def __init__(self,
+                 max_attempts: int = 1,
+                 initial_delay_ms: int = 500,
+                 max_delay_ms: int = 10000,
+                 multiplier: float = 2.0,
+                 jitter: float = 0.5,
+                 retry_on: Iterable[str] = ("timeout", "network", "element"),
+                 attempt_timeout_ms: Optional[int] = None,
+                 deadline_ms: Optional[int] = None):
+        """
+        Args:
+            max_attempts: 最多执行次数（含第一次）
+            initial_delay_ms: 第一次重试前的等待时间（毫秒）
+            max_delay_ms: 重试等待时间上限（毫秒）
+            multiplier: 每次重试等待时间的增长倍数
+            jitter: 随机抖动比例（0-1），实际等待时间在 [1-jitter, 1] 倍之间
+            retry_on: 可重试的错误类别（timeout/network/element/any）
+            attempt_timeout_ms: 单次执行的超时时间（毫秒）
+            deadline_ms: 包括所有重试和等待在内的截止时间（毫秒）
+        """
+        unknown = set(retry_on) - set(ERROR_CLASSES)
+        if unknown:
+            raise ValueError(f"不支持的重试错误类别: {sorted(unknown)}")
+
+        self.max_attempts = max(1, max_attempts)
+        self.initial_delay_ms = initial_delay_ms
+        self.max_delay_ms = max_delay_ms
+        self.multiplier = multiplier
+        self.jitter = min(max(jitter, 0.0), 1.0)
+        self.retry_on = frozenset(retry_on)
+        self.attempt_timeout_ms = attempt_timeout_ms
+        self.deadline_ms = deadline_ms
+
+    def retries(self, error: BaseException) -> bool:
+        """该错误是否可重试"""
+        return "any" in self.retry_on or classify_error(error) in self.retry_on
+
+    def delay(self, attempt: int) -> float:
+        """第 attempt 次执行失败后的等待时间（秒），指数退避加随机抖动"""
+        base = min(self.max_delay_ms, self.initial_delay_ms * self.multiplier ** (attempt - 1))
+        return base * (1 - self.jitter * random.random()) / 1000
+
+    def merged(self, overrides: Optional[Dict[str, Any]]) -> "RetryPolicy":
+        """返回用 overrides 覆盖部分字段后的新策略"""
+        if not overrides:
+            return self
+        values = self.to_dict()
+        unknown = set(overrides) - set(values)
+        if unknown:
+            raise ValueError(f"不支持的重试策略字段: {sorted(unknown)}")
+        values.update(overrides)
+        return RetryPolicy(**values)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "max_attempts": self.max_attempts,
+            "initial_delay_ms": self.initial_delay_ms,
+            "max_delay_ms": self.max_delay_ms,
+            "multiplier": self.multiplier,
+            "jitter": self.jitter,
+            "retry_on": sorted(self.retry_on),
+            "attempt_timeout_ms": self.attempt_timeout_ms,
+            "deadline_ms": self.deadline_ms,
+        }
+
+
+class RetryPolicies:
+    """按节点类型的策略表（只读，可被多个执行共享）"""
+
+    def __init__(self,
+                 node_policies: Optional[Dict[str, Dict[str, Any]]] = None,
+                 default: Optional[RetryPolicy] = None):
+        """
+        Args:
+            node_policies: 节点类型 -> 策略字段，覆盖内置的默认策略
+            default: 没有配置的节点类型使用的策略
+        """
+        self.default = default or RetryPolicy()
+        configured = dict(DEFAULT_NODE_POLICIES)
+        for node_type, values in (node_policies or {}).items():
+            configured[node_type] = {**configured.get(node_type, {}), **values}
+        self._policies: Dict[str, RetryPolicy] = {
+            node_type: self.default.merged(values) for node_type, values in configured.items()
+        }
+
+    def for_node(self, node_type: str, overrides: Optional[Dict[str, Any]] = None) -> RetryPolicy:
+        """节点的生效策略：节点类型策略，再用节点自己的 retry 参数覆盖"""
+        return self._policies.get(node_type, self.default).merged(overrides)
@@ -0,0 +1,156 @@
+"""
+截图策略
+决定哪些节点在什么时候截图，以及截图格式。截图数据在页面上获取后，
+文件写入交给后台线程，节点不等待磁盘IO
+"""
+
+import asyncio
+import logging
+import os
+from datetime import datetime
+from typing import Callable, Iterable, Optional, Set
+
+from playwright.async_api import Page
+
+logger = logging.getLogger(__name__)
+
+SCREENSHOT_MODES = ("off", "on_error", "every_n", "node_types", "always")
+
+
+class ScreenshotPolicy:
+    """截图策略（只读，可被多个执行共享）"""
+
+    def __init__(self,
+                 mode: str = "on_error",
+                 every_n: int = 10,
+                 node_types: Optional[Iterable[str]] = None,
+                 full_page: bool = False,
+                 image_format: str = "jpeg",
+                 quality: int = 70):
+        """
+        Args:
+            mode: off 不截图；on_error 仅失败时；every_n 每N个节点；
+                  node_types 仅指定类型的节点；always 每个节点执行前后（旧行为）
+            every_n: every_n 模式下的间隔
+            node_types: node_types 模式下需要截图的节点类型
+            full_page: 是否截取整个页面（否则只截取视口）
+            image_format: 图片格式（jpeg/png）
+            quality: JPEG质量（0-100）
+        """
+        if mode not in SCREENSHOT_MODES:
+            raise ValueError(f"不支持的截图模式: {mode}")
+        if image_format not in ("jpeg", "png"):
+            raise ValueError(f"不支持的截图格式: {image_format}")
+
+        self.mode = mode
+        self.every_n = max(1, every_n)
+        self.node_types: Set[str] = set(node_types or [])
+        self.full_page = full_page
+        self.image_format = image_format
+        self.quality = quality
+
+    def captures_node(self, node_type: str, node_index: int) -> bool:
+        """节点执行前后是否截图（失败截图由 captures_errors 决定）"""
+        if self.mode == "always":
+            return True
+        if self.mode == "every_n":
+            return node_index % self.every_n == 0
+        if self.mode == "node_types":
+            return node_type in self.node_types
+        return False
+
+    @property
+    def captures_errors(self) -> bool:
+        return self.mode != "off"
+
+    def with_mode(self, mode: str) -> "ScreenshotPolicy":
+        """返回只替换了模式的新策略"""
+        return ScreenshotPolicy(
+            mode=mode,
+            every_n=self.every_n,
+            node_types=self.node_types,
+            full_page=self.full_page,
+            image_format=self.image_format,
+            quality=self.quality
+        )
+
+
+class ScreenshotRecorder:
+    """单次执行的截图记录器 - 分配节点序号并在后台写入截图文件"""
+
+    def __init__(self,
+                 policy: ScreenshotPolicy,
+                 directory: str = "screenshots",
+                 on_written: Optional[Callable[[int], None]] = None):
+        """
+        Args:
+            policy: 截图策略
+            directory: 截图目录
+            on_written: 截图文件写入完成时调用（字节数），用于运行指标
+        """
+        self.policy = policy
+        self.directory = directory
+        self.on_written = on_written
+        self.bytes_written = 0
+        self.files_written = 0
+        self._node_index = 0
+        self._pending: Set[asyncio.Task] = set()
+
+    def next_node_index(self) -> int:
+        """为即将执行的节点分配序号"""
+        index = self._node_index
+        self._node_index += 1
+        return index
+
+    async def capture(self, page: Page, node_id: str, suffix: str = "") -> Optional[str]:
+        """
+        截图 - 只在页面上等待截图数据，文件写入在后台完成
+
+        Args:
+            page: 页面
+            node_id: 节点ID
+            suffix: 文件名后缀
+
+        Returns:
+            Optional[str]: 截图文件路径，失败时为None
+        """
+        policy = self.policy
+        try:
+            options = {"full_page": policy.full_page, "type": policy.image_format}
+            if policy.image_format == "jpeg":
+                options["quality"] = policy.quality
+            data = await page.screenshot(**options)
+        except Exception as e:
+            logger.warning(f"截图失败: {e}")
+            return None
+
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        extension = "jpg" if policy.image_format == "jpeg" else "png"
+        path = os.path.join(self.directory, f"{node_id}_{timestamp}{suffix}.{extension}")
+
+        task = asyncio.get_running_loop().create_task(self._write_in_background(path, data))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+        return path
+
+    async def flush(self):
+        """等待所有后台写入完成"""
+        if self._pending:
+            await asyncio.gather(*self._pending, return_exceptions=True)
+
+    async def _write_in_background(self, path: str, data: bytes):
+        if await asyncio.to_thread(self._write, path, data):
+            self.bytes_written += len(data)
+            self.files_written += 1
+            if self.on_written:
+                self.on_written(len(data))
+
+    def _write(self, path: str, data: bytes) -> bool:
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(path, "wb") as f:
+                f.write(data)
+            return True
+        except Exception as e:
+            logger.warning(f"写入截图失败: {path}, 错误: {e}")
+            return False
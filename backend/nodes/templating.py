@@ -0,0 +1,145 @@
+"""
+参数模板
+节点参数中的 ${变量名} 在编译执行计划（实例化节点）时解析一次，运行时按变量一次遍历求值：
+
+- 只有包含占位符的字符串参数会被编译，求值时只复制这些参数所在的路径，其余参数原样共享
+- 求值结果是字符串；节点声明为非字符串的参数（typed_params，如循环次数）整个就是一个占位符时
+  （如 "${count}"）返回变量的原始值，保留数字、列表等类型
+- 未定义的变量报错；JavaScript表达式参数（script_params）中未定义的 ${...} 是JavaScript自己的
+  模板字符串，保留原样
+"""
+
+import re
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+_PLACEHOLDER = re.compile(r"\$\{(\w+)\}")
+
+
+class Template:
+    """编译后的字符串模板：文本片段与变量名交替排列"""
+
+    __slots__ = ("source", "literals", "names", "whole")
+
+    def __init__(self, source: str):
+        self.source = source
+        parts = _PLACEHOLDER.split(source)
+        self.literals: List[str] = parts[0::2]  # 比变量名多一个
+        self.names: List[str] = parts[1::2]
+        self.whole = len(self.names) == 1 and not self.literals[0] and not self.literals[1]
+
+    def render(self, variables: Dict[str, Any], typed: bool = False, strict: bool = True) -> Any:
+        """
+        Args:
+            variables: 变量
+            typed: 整个字符串是一个占位符时返回变量的原始值
+            strict: 变量未定义时报错，否则保留占位符原样
+        """
+        if self.whole and typed and self.names[0] in variables:
+            return variables[self.names[0]]
+
+        pieces = [self.literals[0]]
+        for name, literal in zip(self.names, self.literals[1:]):
+            if name in variables:
+                pieces.append(str(variables[name]))
+            elif strict:
+                raise ValueError(f"参数中的变量未定义: ${{{name}}}")
+            else:
+                pieces.append(f"${{{name}}}")
+            pieces.append(literal)
+        return "".join(pieces)
+
+
+@lru_cache(maxsize=4096)
+def compile_template(source: str) -> Optional[Template]:
+    """编译字符串模板（缓存），不包含占位符时返回None"""
+    if "${" not in source or not _PLACEHOLDER.search(source):
+        return None
+    return Template(source)
+
+
+class _Container:
+    """包含模板的字典或列表：只记录有模板的键（下标）"""
+
+    __slots__ = ("children",)
+
+    def __init__(self, children: Dict[Any, "_Compiled"]):
+        self.children = children
+
+
+_Compiled = Union[Template, _Container]
+
+
+def _compile(value: Any) -> Optional[_Compiled]:
+    if isinstance(value, str):
+        return compile_template(value)
+    if isinstance(value, dict):
+        items = value.items()
+    elif isinstance(value, list):
+        items = enumerate(value)
+    else:
+        return None
+
+    children = {}
+    for key, item in items:
+        compiled = _compile(item)
+        if compiled is not None:
+            children[key] = compiled
+    return _Container(children) if children else None
+
+
+def _resolve(value: Any, compiled: _Compiled, variables: Dict[str, Any], typed: bool, strict: bool) -> Any:
+    if isinstance(compiled, Template):
+        return compiled.render(variables, typed, strict)
+    resolved = dict(value) if isinstance(value, dict) else list(value)
+    for key, child in compiled.children.items():
+        resolved[key] = _resolve(value[key], child, variables, typed, strict)
+    return resolved
+
+
+class CompiledParams:
+    """节点参数的编译结果（只读，可被并发执行共享）"""
+
+    __slots__ = ("params", "typed_params", "script_params", "_compiled")
+
+    def __init__(self,
+                 params: Dict[str, Any],
+                 typed_params: Iterable[str] = (),
+                 script_params: Iterable[str] = ()):
+        """
+        Args:
+            params: 节点参数
+            typed_params: 非字符串参数，整个是一个占位符时保留变量的原始类型
+            script_params: JavaScript表达式参数，未定义的变量保留原样
+        """
+        self.params = params
+        self.typed_params = frozenset(typed_params)
+        self.script_params = frozenset(script_params)
+        self._compiled = _compile(params)
+
+    @property
+    def dynamic(self) -> bool:
+        """参数中是否有占位符"""
+        return self._compiled is not None
+
+    def resolve(self, variables: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        按变量求值 - 没有占位符时直接返回原参数，调用方不能修改返回的字典
+
+        Args:
+            variables: 执行上下文中的变量
+
+        Returns:
+            Dict[str, Any]: 求值后的参数
+
+        Raises:
+            ValueError: 参数中的变量未定义
+        """
+        if self._compiled is None:
+            return self.params
+        resolved = dict(self.params)
+        for key, child in self._compiled.children.items():
+            resolved[key] = _resolve(
+                self.params[key], child, variables, key in self.typed_params, key not in self.script_params
+            )
+        return resolved
@@ -0,0 +1,300 @@
+"""
+页面稳定等待
+替代固定的 sleep 和 networkidle：在页面内用 MutationObserver 观察DOM，
+连续一段静默时间没有DOM变化和滚动（或目标选择器的匹配数量发生变化）即认为页面已稳定，
+并有硬超时。长轮询的站点永远达不到 networkidle，但DOM会安静下来
+
+操作（如点击）之后的等待要求页面先有反应：操作后发出的XHR/fetch请求结束前不开始观察，
+出现DOM变化、请求结束或导航之后静默窗口才开始计时；一直没有任何反应时在较短的
+空闲超时后结束，不必等到硬超时
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Dict, Optional, Set
+
+from playwright.async_api import Frame, Page, Request
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_QUIET_MS = 500  # 默认静默窗口（毫秒）
+DEFAULT_SETTLE_TIMEOUT = 10000  # 默认硬超时（毫秒）
+DEFAULT_IDLE_TIMEOUT = 2000  # 操作后没有任何反应时的超时（毫秒）
+
+# 页面内等待：静默窗口内没有DOM变化和滚动时结束；指定选择器时匹配数量变化立即结束；
+# requireActivity 时第一次变化之后静默窗口才开始计时，idleMs 内没有变化则以 idle 结束
+_SETTLE_SCRIPT = """
+({ quietMs, timeoutMs, selector, baseline, requireActivity, idleMs }) => new Promise(resolve => {
+    const started = performance.now();
+    const count = () => document.querySelectorAll(selector).length;
+    let mutations = 0;
+    let quietTimer = null;
+    let idleTimer = null;
+    let deadline = null;
+    let observer = null;
+    const finish = (reason) => {
+        if (observer) observer.disconnect();
+        window.removeEventListener('scroll', onActivity, true);
+        clearTimeout(quietTimer);
+        clearTimeout(idleTimer);
+        clearTimeout(deadline);
+        resolve({
+            reason,
+            elapsed_ms: Math.round(performance.now() - started),
+            mutations,
+            count: selector ? count() : null
+        });
+    };
+    const onActivity = () => {
+        clearTimeout(idleTimer);
+        clearTimeout(quietTimer);
+        quietTimer = setTimeout(() => finish('quiet'), quietMs);
+    };
+    if (selector && baseline !== null && count() !== baseline) {
+        finish('selector_changed');
+        return;
+    }
+    observer = new MutationObserver(records => {
+        mutations += records.length;
+        if (selector && baseline !== null && count() !== baseline) {
+            finish('selector_changed');
+            return;
+        }
+        onActivity();
+    });
+    // 只观察内容变化，不观察属性（动画和样式切换会不断修改属性）
+    observer.observe(document.documentElement || document, {
+        childList: true, subtree: true, characterData: true
+    });
+    window.addEventListener('scroll', onActivity, true);
+    if (requireActivity) {
+        idleTimer = setTimeout(() => finish('idle'), idleMs);
+    } else {
+        quietTimer = setTimeout(() => finish('quiet'), quietMs);
+    }
+    deadline = setTimeout(() => finish('timeout'), timeoutMs);
+})
+"""
+
+
+# 页面标记：选择器所有匹配元素的数量和文本摘要，翻页后内容变化即标记变化
+_MARKER_SCRIPT = """
+(selector) => {
+    const elements = document.querySelectorAll(selector);
+    let hash = 0;
+    for (const el of elements) {
+        const text = el.textContent || '';
+        for (let i = 0; i < text.length; i++) {
+            hash = (hash * 31 + text.charCodeAt(i)) | 0;
+        }
+        hash = (hash * 31 + 1) | 0;
+    }
+    return `${elements.length}:${hash}`;
+}
+"""
+
+# 等待标记与给定值不同
+_MARKER_CHANGED_SCRIPT = f"""
+([selector, marker]) => ({_MARKER_SCRIPT.strip()})(selector) !== marker
+"""
+
+
+def _is_navigation_error(error: Exception) -> bool:
+    """求值失败是否因为页面导航销毁了执行上下文"""
+    message = str(error).lower()
+    return "context was destroyed" in message or "navigat" in message
+
+
+async def count_elements(page: Page, selector: str) -> int:
+    """选择器当前匹配的元素数量"""
+    return await page.evaluate(
+        "selector => document.querySelectorAll(selector).length", selector
+    )
+
+
+async def read_marker(page: Page, selector: str) -> str:
+    """选择器当前匹配内容的标记（数量和文本摘要）"""
+    return await page.evaluate(_MARKER_SCRIPT, selector)
+
+
+async def wait_for_marker_change(page: Page, selector: str, marker: str, timeout: int) -> bool:
+    """
+    等待选择器匹配内容的标记与 marker 不同
+
+    数量不变（每页条数固定）但内容换了也算变化。期间发生整页导航时在新文档上继续等待
+
+    Args:
+        page: 页面
+        selector: 标记选择器（仅CSS）
+        marker: 操作前的标记（read_marker 的结果）
+        timeout: 超时（毫秒），为0时只检查一次
+
+    Returns:
+        bool: 标记是否已变化
+    """
+    started = time.monotonic()
+    while True:
+        remaining = timeout - int((time.monotonic() - started) * 1000)
+        try:
+            if remaining <= 0:
+                return await read_marker(page, selector) != marker
+            await page.wait_for_function(
+                _MARKER_CHANGED_SCRIPT, arg=[selector, marker], timeout=remaining
+            )
+            return True
+        except PlaywrightTimeoutError:
+            return False
+        except Exception as e:
+            if not _is_navigation_error(e):
+                raise
+            if remaining <= 0:
+                return False
+            # 旧文档的执行上下文被销毁，等新文档就绪后重新检查
+            try:
+                await page.wait_for_load_state("domcontentloaded", timeout=remaining)
+            except PlaywrightTimeoutError:
+                return False
+
+
+async def settle(page: Page,
+                 action: Optional[Awaitable[Any]] = None,
+                 quiet_ms: int = DEFAULT_QUIET_MS,
+                 timeout: int = DEFAULT_SETTLE_TIMEOUT,
+                 selector: Optional[str] = None,
+                 idle_timeout: int = DEFAULT_IDLE_TIMEOUT,
+                 require_activity: Optional[bool] = None) -> Dict[str, Any]:
+    """
+    执行可选的页面操作，然后等待页面稳定
+
+    操作引起整页导航时，等待新文档的DOM就绪后在新文档上继续观察。
+    超时不抛出异常：持续变化的页面（滚动字幕、计时器）在超时后照常继续
+
+    Args:
+        page: 页面
+        action: 触发页面变化的操作（如点击），在开始监听导航之后执行
+        quiet_ms: 静默窗口（毫秒）
+        timeout: 硬超时（毫秒），从操作完成后开始计算
+        selector: 目标选择器（仅CSS），匹配数量相对操作前发生变化时立即结束
+        idle_timeout: 要求页面有反应时，一直没有任何变化的超时（毫秒）
+        require_activity: 静默窗口是否在第一次变化（DOM变化、滚动、请求结束或导航）之后
+                          才开始计时，默认在有操作时要求
+
+    Returns:
+        Dict[str, Any]: reason（quiet/selector_changed/idle/timeout）、elapsed_ms、
+                        mutations、count、navigated
+    """
+    if require_activity is None:
+        require_activity = action is not None
+    baseline = await count_elements(page, selector) if selector else None
+
+    # 主框架的导航请求：发出后直到新文档提交（或请求失败）前都视为进行中
+    pending: Set[Request] = set()
+    committed = asyncio.Event()
+    # 开始等待后发出的XHR/fetch请求：结束前不开始观察，结束即算页面有了反应
+    in_flight: Set[Request] = set()
+    drained = asyncio.Event()
+    drained.set()
+    responded = False
+
+    def on_request(request: Request):
+        if request.is_navigation_request() and request.frame == page.main_frame:
+            pending.add(request)
+            committed.clear()
+        elif request.resource_type in ("xhr", "fetch"):
+            in_flight.add(request)
+            drained.clear()
+
+    def on_request_finished(request: Request):
+        nonlocal responded
+        if request in in_flight:
+            in_flight.discard(request)
+            responded = True
+            if not in_flight:
+                drained.set()
+
+    def on_request_failed(request: Request):
+        on_request_finished(request)
+        if request in pending:
+            pending.discard(request)
+            if not pending:
+                committed.set()
+
+    def on_frame_navigated(frame: Frame):
+        if frame == page.main_frame:
+            pending.clear()
+            committed.set()
+
+    page.on("request", on_request)
+    page.on("requestfinished", on_request_finished)
+    page.on("requestfailed", on_request_failed)
+    page.on("framenavigated", on_frame_navigated)
+    try:
+        if action is not None:
+            await action
+
+        started = time.monotonic()
+        navigated = False
+        result: Dict[str, Any] = {"reason": "timeout", "mutations": 0, "count": None}
+
+        while True:
+            remaining = timeout - int((time.monotonic() - started) * 1000)
+            if remaining <= 0:
+                break
+
+            if pending:
+                # 整页导航：等新文档提交后在新文档上重新观察
+                navigated = True
+                try:
+                    await asyncio.wait_for(committed.wait(), remaining / 1000)
+                except asyncio.TimeoutError:
+                    break
+                continue
+
+            if in_flight:
+                # 操作触发的请求还没返回，新内容尚未到达
+                try:
+                    await asyncio.wait_for(drained.wait(), remaining / 1000)
+                except asyncio.TimeoutError:
+                    break
+                continue
+
+            try:
+                if navigated:
+                    await page.wait_for_load_state("domcontentloaded", timeout=remaining)
+                result = await page.evaluate(
+                    _SETTLE_SCRIPT,
+                    {
+                        "quietMs": quiet_ms,
+                        "timeoutMs": remaining,
+                        "selector": selector,
+                        "baseline": baseline,
+                        "requireActivity": require_activity and not (responded or navigated),
+                        "idleMs": min(idle_timeout, remaining)
+                    }
+                )
+            except PlaywrightTimeoutError:
+                break
+            except Exception as e:
+                # 观察期间发生导航，旧文档的执行上下文被销毁
+                if pending or _is_navigation_error(e):
+                    navigated = True
+                    continue
+                raise
+
+            if pending or in_flight:
+                # 静默期间发出了导航或数据请求，等它们结束后重新观察
+                continue
+            break
+    finally:
+        page.remove_listener("request", on_request)
+        page.remove_listener("requestfinished", on_request_finished)
+        page.remove_listener("requestfailed", on_request_failed)
+        page.remove_listener("framenavigated", on_frame_navigated)
+
+    result["elapsed_ms"] = int((time.monotonic() - started) * 1000)
+    result["navigated"] = navigated
+    if result["reason"] == "timeout":
+        logger.debug(f"页面在 {timeout}ms 内未稳定，继续执行")
+    return result
@@ -0,0 +1,242 @@
+"""
+执行检查点
+顶层节点执行成功后记录检查点：已完成的节点、变量、提取数据的写入位置、
+当前页面URL和浏览器存储状态（Cookie、localStorage）。执行失败或被停止后，
+可以从检查点恢复，只执行尚未完成的节点，不必从头重跑登录和翻页。
+
+恢复时提取数据截断到检查点记录的数量，所以这个数量只能包含已完成节点写入的记录：
+节点并发执行时，只在没有其他顶层节点运行的时刻记录检查点；有节点失败后不再记录，
+失败节点和之后完成的节点写入的记录在恢复时丢弃并重新执行。
+
+检查点按执行ID保存为JSON文件（先写临时文件再替换），API进程和工作进程共用同一目录
+"""
+
+import asyncio
+import json
+import logging
+import os
+import re
+import time
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from models.workflow import ExecutionOptions, WorkflowDefinition
+
+logger = logging.getLogger(__name__)
+
+
+class Checkpoint:
+    """单次执行的检查点"""
+
+    def __init__(self,
+                 execution_id: str,
+                 workflow: WorkflowDefinition,
+                 options: ExecutionOptions,
+                 completed: List[str],
+                 variables: Dict[str, Any],
+                 sink: Dict[str, Any],
+                 url: Optional[str] = None,
+                 storage_state: Optional[Dict[str, Any]] = None,
+                 updated_at: Optional[float] = None,
+                 storage_state_at: Optional[float] = None):
+        """
+        Args:
+            execution_id: 执行ID
+            workflow: 工作流定义（恢复时默认使用）
+            options: 执行选项
+            completed: 已执行成功的顶层节点ID
+            variables: 执行上下文中的变量
+            sink: 提取数据输出的摘要（格式、路径、已写入的记录数）
+            url: 主页面的当前URL
+            storage_state: 浏览器上下文的存储状态
+            updated_at: 记录时间（Unix时间戳），其余字段都是这一时刻的状态
+            storage_state_at: 读取存储状态的时间，可能晚于 updated_at（之后开始的节点
+                              已经改动了Cookie和localStorage）
+        """
+        self.execution_id = execution_id
+        self.workflow = workflow
+        self.options = options
+        self.completed = completed
+        self.variables = variables
+        self.sink = sink
+        self.url = url
+        self.storage_state = storage_state
+        self.updated_at = updated_at or time.time()
+        self.storage_state_at = storage_state_at
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "execution_id": self.execution_id,
+            "workflow": self.workflow.model_dump(mode="json"),
+            "options": self.options.model_dump(mode="json"),
+            "completed": self.completed,
+            "variables": self.variables,
+            "sink": self.sink,
+            "url": self.url,
+            "storage_state": self.storage_state,
+            "updated_at": self.updated_at,
+            "storage_state_at": self.storage_state_at
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Checkpoint":
+        return cls(
+            execution_id=data["execution_id"],
+            workflow=WorkflowDefinition.model_validate(data["workflow"]),
+            options=ExecutionOptions.model_validate(data["options"]),
+            completed=data["completed"],
+            variables=data["variables"],
+            sink=data["sink"],
+            url=data.get("url"),
+            storage_state=data.get("storage_state"),
+            updated_at=data.get("updated_at"),
+            storage_state_at=data.get("storage_state_at")
+        )
+
+
+class CheckpointStore:
+    """检查点文件存储"""
+
+    def __init__(self, directory: str = "checkpoints"):
+        self.directory = directory
+
+    def path(self, execution_id: str) -> str:
+        name = re.sub(r"[^\w.-]", "_", execution_id)
+        return os.path.join(self.directory, f"{name}.json")
+
+    async def save(self, checkpoint: Checkpoint):
+        await asyncio.to_thread(self._write, checkpoint.execution_id, checkpoint.to_dict())
+
+    async def load(self, execution_id: str) -> Optional[Checkpoint]:
+        """读取检查点，不存在时返回None"""
+        data = await asyncio.to_thread(self._read, execution_id)
+        return Checkpoint.from_dict(data) if data is not None else None
+
+    async def delete(self, execution_id: str):
+        await asyncio.to_thread(self._remove, self.path(execution_id))
+
+    async def prune(self, ttl: float) -> int:
+        """删除超过 ttl 秒没有更新的检查点，返回删除的数量"""
+        return await asyncio.to_thread(self._prune, ttl)
+
+    def _write(self, execution_id: str, data: Dict[str, Any]):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path(execution_id)
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, default=str)
+        os.replace(temp_path, path)
+
+    def _read(self, execution_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self.path(execution_id), encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def _remove(self, path: str):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def _prune(self, ttl: float) -> int:
+        if ttl <= 0 or not os.path.isdir(self.directory):
+            return 0
+        cutoff = time.time() - ttl
+        removed = 0
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".json") and entry.stat().st_mtime < cutoff:
+                self._remove(entry.path)
+                removed += 1
+        return removed
+
+
+class CheckpointRecorder:
+    """
+    执行过程中的检查点记录
+
+    节点完成且没有其他顶层节点在运行时，同步记下已完成节点、变量、写入位置和页面URL（保证彼此一致），
+    存储状态的读取和文件写入在后台进行；写入期间又有节点完成时只保留最新的一次，节点不等待检查点。
+    存储状态是在后续节点已经开始后读取的，可能比快照新，读取时间另记在 storage_state_at
+    """
+
+    def __init__(self,
+                 store: CheckpointStore,
+                 execution_id: str,
+                 workflow: WorkflowDefinition,
+                 options: ExecutionOptions,
+                 context,
+                 completed: Iterable[str] = ()):
+        """
+        Args:
+            store: 检查点存储
+            execution_id: 执行ID
+            workflow: 工作流定义
+            options: 执行选项
+            context: 执行上下文
+            completed: 恢复执行时检查点中已完成的节点
+        """
+        self.store = store
+        self.execution_id = execution_id
+        self.workflow = workflow
+        self.options = options
+        self.context = context
+        self.completed = set(completed)
+        self.running: Set[str] = set()
+        self.failed = False  # 有节点失败后不再记录检查点
+        self.saved = 0
+        self._pending: Optional[Dict[str, Any]] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def node_started(self, node_id: str):
+        """顶层节点开始执行"""
+        self.running.add(node_id)
+
+    def node_finished(self, node_id: str, status: str):
+        """顶层节点执行结束"""
+        self.running.discard(node_id)
+        if status == "failed":
+            self.failed = True
+        elif status == "success":
+            self.completed.add(node_id)
+        # 还有节点在运行时，输出中可能有它们写入的记录，等运行中的节点都结束后再记录
+        if self.failed or self.running:
+            return
+
+        self._pending = {
+            "completed": sorted(self.completed),
+            # 序列化后再还原，之后节点修改变量不影响这次记录
+            "variables": json.loads(json.dumps(self.context.variables, ensure_ascii=False, default=str)),
+            "sink": self.context.sink.describe(),
+            "url": self.context.page.url,
+            "updated_at": time.time()
+        }
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._write_loop())
+
+    async def flush(self):
+        """等待后台写入完成"""
+        if self._task:
+            await asyncio.shield(self._task)
+
+    async def _write_loop(self):
+        try:
+            while self._pending is not None:
+                snapshot, self._pending = self._pending, None
+                storage_state = await self.context.browser_context.storage_state()
+                await self.store.save(Checkpoint(
+                    self.execution_id,
+                    self.workflow,
+                    self.options,
+                    storage_state=storage_state,
+                    storage_state_at=time.time(),
+                    **snapshot
+                ))
+                self.saved += 1
+                if self.saved == 1 and self.options.resume_from:
+                    # 新的检查点已经包含恢复前完成的节点，原检查点不再需要
+                    await self.store.delete(self.options.resume_from)
+        except Exception as e:
+            logger.warning(f"保存检查点失败: {self.execution_id}, 错误: {e}")
+        finally:
+            self._task = None
@@ -0,0 +1,374 @@
+"""
+执行结果存储
+替代API进程中永久增长的结果字典：内存后端按LRU和过期时间淘汰，SQLite后端（WAL模式）
+把结果持久化到本地文件，重启后仍可查询。步骤单独存表，可以分页读取
+"""
+
+import asyncio
+import logging
+import os
+import sqlite3
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from models.workflow import ExecutionResult, StepResult
+
+logger = logging.getLogger(__name__)
+
+# 已结束的状态，只有这些执行会被过期淘汰
+FINISHED_STATUSES = ("completed", "failed", "stopped")
+
+
+class ResultStore(ABC):
+    """执行结果存储基类"""
+
+    def __init__(self, ttl: float = 86400.0, eviction_interval: float = 300.0):
+        """
+        Args:
+            ttl: 已结束的执行保留多久（秒），0 表示不过期
+            eviction_interval: 定期淘汰的间隔（秒），0 表示不启动定期淘汰
+        """
+        self.ttl = ttl
+        self.eviction_interval = eviction_interval
+        self.evicted = 0
+        self._eviction_task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        """启动存储和定期淘汰任务"""
+        if self.eviction_interval > 0:
+            self._eviction_task = asyncio.create_task(self._eviction_loop())
+
+    async def close(self):
+        """停止定期淘汰并写出缓冲的结果"""
+        if self._eviction_task:
+            self._eviction_task.cancel()
+            try:
+                await self._eviction_task
+            except asyncio.CancelledError:
+                pass
+            self._eviction_task = None
+
+    @abstractmethod
+    async def save(self, result: ExecutionResult):
+        """保存（或更新）执行结果"""
+
+    @abstractmethod
+    async def get(self, execution_id: str, include_steps: bool = True) -> Optional[ExecutionResult]:
+        """读取执行结果，不存在时返回None"""
+
+    @abstractmethod
+    async def get_steps(self, execution_id: str, offset: int = 0, limit: int = 100) -> Tuple[List[StepResult], int]:
+        """分页读取步骤结果，返回 (步骤列表, 步骤总数)"""
+
+    @abstractmethod
+    async def evict(self) -> int:
+        """淘汰过期的执行，返回淘汰数量"""
+
+    def stats(self) -> Dict[str, Any]:
+        return {"ttl": self.ttl, "evicted": self.evicted}
+
+    async def _eviction_loop(self):
+        while True:
+            await asyncio.sleep(self.eviction_interval)
+            try:
+                evicted = await self.evict()
+                if evicted:
+                    logger.info(f"已淘汰过期的执行结果: {evicted}")
+            except Exception as e:
+                logger.error(f"淘汰执行结果失败: {e}")
+
+
+class MemoryResultStore(ResultStore):
+    """内存存储 - 数量超过上限时淘汰最久未访问的执行，已结束的执行过期后淘汰"""
+
+    def __init__(self, max_entries: int = 1000, ttl: float = 86400.0, eviction_interval: float = 300.0):
+        super().__init__(ttl, eviction_interval)
+        self.max_entries = max_entries
+        self._results: "OrderedDict[str, Tuple[ExecutionResult, float]]" = OrderedDict()
+
+    async def save(self, result: ExecutionResult):
+        self._results[result.execution_id] = (result, time.time())
+        self._results.move_to_end(result.execution_id)
+        while len(self._results) > self.max_entries:
+            self._results.popitem(last=False)
+            self.evicted += 1
+
+    async def get(self, execution_id: str, include_steps: bool = True) -> Optional[ExecutionResult]:
+        entry = self._results.get(execution_id)
+        if entry is None:
+            return None
+        self._results.move_to_end(execution_id)
+        result = entry[0]
+        if not include_steps:
+            return result.model_copy(update={"steps": []})
+        return result
+
+    async def get_steps(self, execution_id: str, offset: int = 0, limit: int = 100) -> Tuple[List[StepResult], int]:
+        entry = self._results.get(execution_id)
+        if entry is None:
+            return [], 0
+        steps = entry[0].steps
+        return steps[offset:offset + limit], len(steps)
+
+    async def evict(self) -> int:
+        if self.ttl <= 0:
+            return 0
+        deadline = time.time() - self.ttl
+        expired = [
+            execution_id for execution_id, (result, saved_at) in self._results.items()
+            if saved_at < deadline and result.status in FINISHED_STATUSES
+        ]
+        for execution_id in expired:
+            del self._results[execution_id]
+        self.evicted += len(expired)
+        return len(expired)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": "memory", "entries": len(self._results), **super().stats()}
+
+
+class SqliteResultStore(ResultStore):
+    """
+    SQLite存储（WAL模式）
+
+    save 只把结果放进待写缓冲区，由后台任务按批写入（同一执行的多次更新合并为一次）；
+    步骤只追加写入新增的部分。读取时先查缓冲区，保证写入后立即可读
+    """
+
+    def __init__(self,
+                 path: str,
+                 ttl: float = 86400.0,
+                 eviction_interval: float = 300.0,
+                 batch_size: int = 50,
+                 flush_interval: float = 1.0):
+        """
+        Args:
+            path: 数据库文件路径
+            ttl: 已结束的执行保留多久（秒），0 表示不过期
+            eviction_interval: 定期淘汰的间隔（秒）
+            batch_size: 待写的执行数量达到多少时立即写出
+            flush_interval: 后台写出的间隔（秒）
+        """
+        super().__init__(ttl, eviction_interval)
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._pending: Dict[str, ExecutionResult] = {}
+        self._written_steps: Dict[str, int] = {}  # 执行ID -> 已写入的步骤数
+        self._connection: Optional[sqlite3.Connection] = None
+        self._lock = asyncio.Lock()
+        self._flush_requested = asyncio.Event()
+        self._flush_task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        await asyncio.to_thread(self._open)
+        self._flush_task = asyncio.create_task(self._flush_loop())
+        await super().start()
+
+    async def close(self):
+        await super().close()
+        if self._flush_task:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        await self.flush()
+        if self._connection:
+            await asyncio.to_thread(self._connection.close)
+            self._connection = None
+
+    async def save(self, result: ExecutionResult):
+        self._pending[result.execution_id] = result
+        if len(self._pending) >= self.batch_size:
+            self._flush_requested.set()
+
+    async def get(self, execution_id: str, include_steps: bool = True) -> Optional[ExecutionResult]:
+        pending = self._pending.get(execution_id)
+        if pending is not None:
+            return pending if include_steps else pending.model_copy(update={"steps": []})
+
+        async with self._lock:
+            row = await asyncio.to_thread(self._fetch_execution, execution_id)
+            if row is None:
+                return None
+            result = ExecutionResult.model_validate_json(row)
+            if include_steps:
+                rows = await asyncio.to_thread(self._fetch_steps, execution_id, 0, -1)
+                result.steps = [StepResult.model_validate_json(data) for data in rows]
+        return result
+
+    async def get_steps(self, execution_id: str, offset: int = 0, limit: int = 100) -> Tuple[List[StepResult], int]:
+        pending = self._pending.get(execution_id)
+        if pending is not None:
+            return pending.steps[offset:offset + limit], len(pending.steps)
+
+        async with self._lock:
+            total = await asyncio.to_thread(self._count_steps, execution_id)
+            rows = await asyncio.to_thread(self._fetch_steps, execution_id, offset, limit)
+        return [StepResult.model_validate_json(data) for data in rows], total
+
+    async def flush(self):
+        """把缓冲的结果写入数据库"""
+        if not self._pending or self._connection is None:
+            return
+        async with self._lock:
+            batch, self._pending = self._pending, {}
+            rows = []
+            for execution_id, result in batch.items():
+                written = self._written_steps.get(execution_id, 0)
+                if len(result.steps) < written:
+                    written = 0  # 步骤被重置（如恢复执行），整体重写
+                rows.append((result, written))
+            try:
+                await asyncio.to_thread(self._write_batch, rows)
+            except Exception:
+                # 写入失败时放回缓冲区，未被更新的结果在下次重试
+                for execution_id, result in batch.items():
+                    self._pending.setdefault(execution_id, result)
+                raise
+            for result, _ in rows:
+                if result.status in FINISHED_STATUSES:
+                    self._written_steps.pop(result.execution_id, None)
+                else:
+                    self._written_steps[result.execution_id] = len(result.steps)
+
+    async def evict(self) -> int:
+        if self.ttl <= 0 or self._connection is None:
+            return 0
+        async with self._lock:
+            evicted = await asyncio.to_thread(self._delete_expired, time.time() - self.ttl)
+        self.evicted += evicted
+        return evicted
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": "sqlite", "path": self.path, "pending": len(self._pending), **super().stats()}
+
+    async def _flush_loop(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_requested.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_requested.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"写入执行结果失败: {e}")
+
+    # 以下方法在工作线程中执行
+
+    def _open(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        connection = sqlite3.connect(self.path, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.executescript("""
+            CREATE TABLE IF NOT EXISTS executions (
+                execution_id TEXT PRIMARY KEY,
+                workflow_id TEXT NOT NULL,
+                status TEXT NOT NULL,
+                updated_at REAL NOT NULL,
+                data TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_executions_updated ON executions (status, updated_at);
+            CREATE TABLE IF NOT EXISTS steps (
+                execution_id TEXT NOT NULL,
+                seq INTEGER NOT NULL,
+                data TEXT NOT NULL,
+                PRIMARY KEY (execution_id, seq)
+            );
+        """)
+        connection.commit()
+        self._connection = connection
+
+    def _write_batch(self, rows: List[Tuple[ExecutionResult, int]]):
+        now = time.time()
+        with self._connection:
+            for result, written in rows:
+                self._connection.execute(
+                    "INSERT OR REPLACE INTO executions (execution_id, workflow_id, status, updated_at, data) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (
+                        result.execution_id,
+                        result.workflow_id,
+                        result.status,
+                        now,
+                        result.model_dump_json(exclude={"steps"})
+                    )
+                )
+                if written == 0:
+                    self._connection.execute("DELETE FROM steps WHERE execution_id = ?", (result.execution_id,))
+                self._connection.executemany(
+                    "INSERT OR REPLACE INTO steps (execution_id, seq, data) VALUES (?, ?, ?)",
+                    [
+                        (result.execution_id, seq, step.model_dump_json())
+                        for seq, step in enumerate(result.steps[written:], start=written)
+                    ]
+                )
+
+    def _fetch_execution(self, execution_id: str) -> Optional[str]:
+        row = self._connection.execute(
+            "SELECT data FROM executions WHERE execution_id = ?", (execution_id,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def _fetch_steps(self, execution_id: str, offset: int, limit: int) -> List[str]:
+        rows = self._connection.execute(
+            "SELECT data FROM steps WHERE execution_id = ? ORDER BY seq LIMIT ? OFFSET ?",
+            (execution_id, limit, offset)
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def _count_steps(self, execution_id: str) -> int:
+        return self._connection.execute(
+            "SELECT COUNT(*) FROM steps WHERE execution_id = ?", (execution_id,)
+        ).fetchone()[0]
+
+    def _delete_expired(self, deadline: float) -> int:
+        placeholders = ", ".join("?" for _ in FINISHED_STATUSES)
+        with self._connection:
+            expired = [
+                row[0] for row in self._connection.execute(
+                    f"SELECT execution_id FROM executions WHERE status IN ({placeholders}) AND updated_at < ?",
+                    (*FINISHED_STATUSES, deadline)
+                )
+            ]
+            for execution_id in expired:
+                self._connection.execute("DELETE FROM steps WHERE execution_id = ?", (execution_id,))
+                self._connection.execute("DELETE FROM executions WHERE execution_id = ?", (execution_id,))
+        return len(expired)
+
+
+def create_result_store(backend: str,
+                        path: str = "data/results.db",
+                        max_entries: int = 1000,
+                        ttl: float = 86400.0,
+                        eviction_interval: float = 300.0,
+                        batch_size: int = 50,
+                        flush_interval: float = 1.0) -> ResultStore:
+    """
+    创建执行结果存储
+
+    Args:
+        backend: 存储后端（memory/sqlite）
+        path: SQLite数据库文件路径
+        max_entries: 内存后端保留的执行数量上限
+        ttl: 已结束的执行保留多久（秒）
+        eviction_interval: 定期淘汰的间隔（秒）
+        batch_size: SQLite后端批量写入的执行数量
+        flush_interval: SQLite后端后台写出的间隔（秒）
+
+    Returns:
+        ResultStore: 存储实例
+    """
+    if backend == "memory":
+        return MemoryResultStore(max_entries, ttl, eviction_interval)
+    if backend == "sqlite":
+        return SqliteResultStore(path, ttl, eviction_interval, batch_size, flush_interval)
+    raise ValueError(f"不支持的结果存储后端: {backend}")
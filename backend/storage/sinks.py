@@ -0,0 +1,339 @@
+"""
+提取数据输出
+ExecutionContext.add_extracted_data 写入的目标。文件型输出只在内存中保留一个
+有界缓冲区，缓冲区满时在后台线程中追加写入文件，内存占用与抓取总量无关
+"""
+
+import asyncio
+import csv
+import json
+import logging
+import os
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class DataSink(ABC):
+    """提取数据输出基类"""
+
+    format: str = ""
+
+    def __init__(self):
+        self.count = 0  # 已写入的记录数
+        self.path: Optional[str] = None  # 输出文件路径，内存输出为None
+
+    @abstractmethod
+    def write(self, record: Dict[str, Any]):
+        """写入一条记录（不阻塞事件循环）"""
+
+    async def flush(self):
+        """把缓冲的记录写出"""
+
+    async def close(self):
+        """写出剩余记录并释放资源"""
+
+    def describe(self) -> Dict[str, Any]:
+        """输出摘要 - 步骤结果和执行结果中只保留这些信息"""
+        return {"format": self.format, "path": self.path, "records": self.count}
+
+
+class MemorySink(DataSink):
+    """内存输出 - 所有记录保存在列表中，适合小规模抓取和调试"""
+
+    format = "memory"
+
+    def __init__(self):
+        super().__init__()
+        self.records: List[Dict[str, Any]] = []
+
+    def write(self, record: Dict[str, Any]):
+        self.records.append(record)
+        self.count += 1
+
+
+class BufferedFileSink(DataSink):
+    """
+    缓冲文件输出基类
+
+    记录先进入内存缓冲区，达到 buffer_size 时由单个后台任务在线程中追加写入，
+    写入期间到达的记录继续缓冲，写入顺序与到达顺序一致
+    """
+
+    extension: str = ""
+
+    def __init__(self, directory: str, name: str, buffer_size: int = 500):
+        super().__init__()
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, f"{name}.{self.extension}")
+        self.buffer_size = buffer_size
+        self._buffer: List[Dict[str, Any]] = []
+        self._flush_task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+
+    def write(self, record: Dict[str, Any]):
+        self._buffer.append(record)
+        self.count += 1
+        if len(self._buffer) >= self.buffer_size and self._flush_task is None:
+            self._flush_task = asyncio.get_running_loop().create_task(self._background_flush())
+
+    async def _background_flush(self):
+        try:
+            while len(self._buffer) >= self.buffer_size:
+                await self.flush()
+        except Exception as e:
+            logger.error(f"写入提取数据失败: {self.path}, 错误: {e}")
+        finally:
+            self._flush_task = None
+
+    async def flush(self):
+        async with self._lock:
+            if not self._buffer:
+                return
+            batch, self._buffer = self._buffer, []
+            await asyncio.to_thread(self._write_batch, batch)
+
+    async def close(self):
+        if self._flush_task:
+            await self._flush_task
+        await self.flush()
+        await asyncio.to_thread(self._close_file)
+
+    @abstractmethod
+    def _write_batch(self, batch: List[Dict[str, Any]]):
+        """在工作线程中追加写入一批记录"""
+
+    def _truncate(self, records: int):
+        """在工作线程中把已有文件截断到前 records 条记录（从检查点续写时）"""
+        raise ValueError(f"{self.format}输出不支持从检查点续写")
+
+    def _close_file(self):
+        """在工作线程中关闭文件"""
+
+
+class JsonlSink(BufferedFileSink):
+    """JSON Lines输出 - 每行一条记录，只追加"""
+
+    format = "jsonl"
+    extension = "jsonl"
+
+    def _write_batch(self, batch: List[Dict[str, Any]]):
+        with open(self.path, "a", encoding="utf-8") as f:
+            for record in batch:
+                f.write(json.dumps(record, ensure_ascii=False, default=str))
+                f.write("\n")
+
+    def _truncate(self, records: int):
+        if not os.path.exists(self.path):
+            if records:
+                raise ValueError(f"数据文件不存在: {self.path}")
+            return
+        with open(self.path, "rb+") as f:
+            for _ in range(records):
+                if not f.readline():
+                    raise ValueError(f"数据文件中的记录少于检查点: {self.path}")
+            f.truncate()
+
+
+class CsvSink(BufferedFileSink):
+    """
+    CSV输出 - 列为所有记录字段的并集，嵌套值序列化为JSON
+
+    后面的批次出现新字段时，已写出的文件逐行复制到补齐新列的新文件中（不整体读入内存）
+    """
+
+    format = "csv"
+    extension = "csv"
+
+    def __init__(self, directory: str, name: str, buffer_size: int = 500):
+        super().__init__(directory, name, buffer_size)
+        self._columns: Optional[List[str]] = None
+
+    def _write_batch(self, batch: List[Dict[str, Any]]):
+        write_header = self._columns is None
+        columns: List[str] = list(self._columns or [])
+        known = len(columns)
+        for record in batch:
+            columns.extend(key for key in record if key not in columns)
+        if not write_header and len(columns) > known:
+            logger.warning(f"CSV输出出现新字段 {columns[known:]}，补齐已写出记录的列: {self.path}")
+            self._widen(columns)
+        self._columns = columns
+
+        with open(self.path, "a", encoding="utf-8", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=self._columns, extrasaction="ignore")
+            if write_header:
+                writer.writeheader()
+            for record in batch:
+                writer.writerow({key: _flatten(value) for key, value in record.items()})
+
+    def _widen(self, columns: List[str]):
+        """按新的列重写表头，已写出的行在末尾补空单元格"""
+        temp_path = f"{self.path}.tmp"
+        with open(self.path, encoding="utf-8", newline="") as src, \
+                open(temp_path, "w", encoding="utf-8", newline="") as dst:
+            reader = csv.reader(src)
+            writer = csv.writer(dst)
+            next(reader, None)
+            writer.writerow(columns)
+            for row in reader:
+                writer.writerow(row + [""] * (len(columns) - len(row)))
+        os.replace(temp_path, self.path)
+
+    def _truncate(self, records: int):
+        if not os.path.exists(self.path):
+            if records:
+                raise ValueError(f"数据文件不存在: {self.path}")
+            return
+        # 单元格中可能有换行，按CSV解析后重写表头和前 records 行
+        with open(self.path, encoding="utf-8", newline="") as f:
+            rows = list(csv.reader(f))
+        if len(rows) - 1 < records:
+            raise ValueError(f"数据文件中的记录少于检查点: {self.path}")
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w", encoding="utf-8", newline="") as f:
+            csv.writer(f).writerows(rows[:records + 1])
+        os.replace(temp_path, self.path)
+        self._columns = rows[0] if rows else None
+
+
+class ParquetSink(BufferedFileSink):
+    """
+    Parquet列式输出 - 每次写出一个行组，需要安装pyarrow
+
+    列为所有记录字段的并集。一个Parquet文件只有一个schema：后面的批次出现新字段时，
+    之后的行组写入新的分段文件；关闭时逐个行组把分段合并到最终文件，缺少的列补空值
+    （记录结构一致时只有一个分段，直接改名）。文件在关闭后才可读
+    """
+
+    format = "parquet"
+    extension = "parquet"
+
+    def __init__(self, directory: str, name: str, buffer_size: int = 500):
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise ValueError("Parquet输出需要安装pyarrow: pip install pyarrow")
+        super().__init__(directory, name, buffer_size)
+        self._writer = None
+        self._schema = None
+        self._parts: List[str] = []  # 分段文件，每个分段一个schema
+
+    def _write_batch(self, batch: List[Dict[str, Any]]):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        columns: List[str] = list(self._schema.names) if self._schema is not None else []
+        known = len(columns)
+        for record in batch:
+            columns.extend(key for key in record if key not in columns)
+
+        if self._schema is None or len(columns) > known:
+            if self._writer is not None:
+                logger.warning(f"Parquet输出出现新字段 {columns[known:]}，后续记录写入新的分段: {self.path}")
+                self._writer.close()
+            self._schema = pa.schema([(column, pa.string()) for column in columns])
+            part = f"{self.path}.part{len(self._parts)}"
+            self._parts.append(part)
+            self._writer = pq.ParquetWriter(part, self._schema)
+
+        table = pa.Table.from_pylist(
+            [{name: _flatten(record.get(name)) for name in self._schema.names} for record in batch],
+            schema=self._schema
+        )
+        self._writer.write_table(table)
+
+    def _close_file(self):
+        if self._writer is None:
+            return
+        self._writer.close()
+        self._writer = None
+        if len(self._parts) == 1:
+            os.replace(self._parts[0], self.path)
+        else:
+            self._merge_parts()
+        self._parts = []
+
+    def _merge_parts(self):
+        """按最终的列逐个行组合并分段文件，内存中只有一个行组"""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        with pq.ParquetWriter(self.path, self._schema) as writer:
+            for part in self._parts:
+                source = pq.ParquetFile(part)
+                for index in range(source.num_row_groups):
+                    table = source.read_row_group(index)
+                    writer.write_table(pa.table(
+                        [
+                            table.column(name) if name in table.column_names else pa.nulls(table.num_rows, pa.string())
+                            for name in self._schema.names
+                        ],
+                        schema=self._schema
+                    ))
+                source.close()
+                os.remove(part)
+
+
+def _flatten(value: Any) -> Optional[str]:
+    """表格型输出的单元格值：嵌套结构序列化为JSON字符串"""
+    if value is None:
+        return None
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, ensure_ascii=False, default=str)
+    return str(value)
+
+
+SINK_TYPES = {
+    "jsonl": JsonlSink,
+    "csv": CsvSink,
+    "parquet": ParquetSink,
+}
+
+
+def create_sink(sink_format: str, directory: str, name: str, buffer_size: int = 500) -> DataSink:
+    """
+    创建提取数据输出
+
+    Args:
+        sink_format: 输出格式（memory/jsonl/csv/parquet）
+        directory: 输出目录
+        name: 文件名（不含扩展名），通常为执行ID
+        buffer_size: 缓冲多少条记录后写出
+
+    Returns:
+        DataSink: 输出实例
+    """
+    if sink_format == "memory":
+        return MemorySink()
+    if sink_format not in SINK_TYPES:
+        raise ValueError(f"不支持的数据输出格式: {sink_format}")
+    return SINK_TYPES[sink_format](directory, name, buffer_size)
+
+
+async def reopen_sink(description: Dict[str, Any], buffer_size: int = 500) -> DataSink:
+    """
+    从检查点续写提取数据输出 - 文件截断到检查点记录的位置后继续追加，
+    丢弃失败节点已经写出的部分记录
+
+    Args:
+        description: 检查点中的输出摘要（DataSink.describe() 的结果）
+        buffer_size: 缓冲多少条记录后写出
+
+    Returns:
+        DataSink: 记录数从检查点位置开始的输出实例
+    """
+    sink_format, records = description["format"], description["records"]
+    if sink_format == "memory":
+        # 内存输出的记录保留在原执行的步骤结果中
+        sink = MemorySink()
+    else:
+        if sink_format not in SINK_TYPES:
+            raise ValueError(f"不支持的数据输出格式: {sink_format}")
+        sink_class = SINK_TYPES[sink_format]
+        directory, filename = os.path.split(description["path"])
+        sink = sink_class(directory, filename[:-len(sink_class.extension) - 1], buffer_size)
+        await asyncio.to_thread(sink._truncate, records)
+    sink.count = records
+    return sink
@@ -0,0 +1,160 @@
+"""
+准入控制
+限制同时运行的执行数量和排队深度：超出并发上限的执行按提交顺序排队，
+队列也满时直接拒绝并给出建议的重试时间，防止突发请求拉起过多浏览器耗尽内存
+"""
+
+import asyncio
+import logging
+import math
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# 排队等待时间的统计分桶（秒）
+QUEUE_WAIT_BUCKETS = (0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+
+class QueueFullError(Exception):
+    """执行队列已满"""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"执行队列已满，建议 {retry_after} 秒后重试")
+        self.retry_after = retry_after
+
+
+class AdmissionTicket:
+    """一次执行的准入凭证"""
+
+    def __init__(self, execution_id: str, granted: asyncio.Future):
+        self.execution_id = execution_id
+        self.admitted_at = time.monotonic()
+        self.started_at: Optional[float] = None
+        self._granted = granted
+
+    @property
+    def started(self) -> bool:
+        return self.started_at is not None
+
+    @property
+    def queue_wait(self) -> Optional[float]:
+        """排队等待的时间（秒），尚未开始时为None"""
+        if self.started_at is None:
+            return None
+        return self.started_at - self.admitted_at
+
+
+class AdmissionController:
+    """执行准入控制器（在API进程的事件循环中使用）"""
+
+    def __init__(self, max_concurrency: int = 8, max_queue: int = 32, default_duration: float = 30.0):
+        """
+        Args:
+            max_concurrency: 同时运行的执行数量上限
+            max_queue: 排队等待的执行数量上限
+            default_duration: 还没有完成的执行时用于估算重试时间的执行时长（秒）
+        """
+        if max_concurrency < 1:
+            raise ValueError(f"并发上限必须大于0: {max_concurrency}")
+
+        self.max_concurrency = max_concurrency
+        self.max_queue = max(0, max_queue)
+        self.running = 0
+        self._queue: "OrderedDict[str, AdmissionTicket]" = OrderedDict()
+        self._average_duration = default_duration
+
+        # 统计
+        self.admitted = 0
+        self.rejected = 0
+        self.wait_count = 0
+        self.wait_sum = 0.0
+        self.wait_max = 0.0
+        self.wait_buckets = [0] * len(QUEUE_WAIT_BUCKETS)
+
+    @property
+    def queued(self) -> int:
+        return len(self._queue)
+
+    def admit(self, execution_id: str) -> AdmissionTicket:
+        """
+        登记一次执行 - 有空闲名额时立即获得运行资格，否则进入队列
+
+        Raises:
+            QueueFullError: 并发名额和队列都已占满
+        """
+        if self.running >= self.max_concurrency and len(self._queue) >= self.max_queue:
+            self.rejected += 1
+            raise QueueFullError(self.retry_after())
+
+        ticket = AdmissionTicket(execution_id, asyncio.get_running_loop().create_future())
+        self._queue[execution_id] = ticket
+        self.admitted += 1
+        self._grant()
+        return ticket
+
+    async def wait(self, ticket: AdmissionTicket):
+        """等待轮到该执行；等待期间被取消时让出队列位置"""
+        try:
+            await ticket._granted
+        except asyncio.CancelledError:
+            self.release(ticket)
+            raise
+
+    def release(self, ticket: AdmissionTicket):
+        """执行结束（或放弃排队），释放名额并让队首的执行开始"""
+        if self._queue.pop(ticket.execution_id, None) is None and ticket.started:
+            self.running -= 1
+            duration = time.monotonic() - ticket.started_at
+            # 指数滑动平均，用于估算重试时间
+            self._average_duration = 0.8 * self._average_duration + 0.2 * duration
+            ticket.started_at = None
+        self._grant()
+
+    def position(self, execution_id: str) -> Optional[int]:
+        """排队位置（从1开始），不在队列中时为None"""
+        for index, queued_id in enumerate(self._queue):
+            if queued_id == execution_id:
+                return index + 1
+        return None
+
+    def retry_after(self) -> int:
+        """按平均执行时长估算的重试等待时间（秒）"""
+        estimate = self._average_duration * (len(self._queue) + 1) / self.max_concurrency
+        return max(1, math.ceil(estimate))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "queued": len(self._queue),
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "queue_wait": {
+                "count": self.wait_count,
+                "sum": round(self.wait_sum, 3),
+                "max": round(self.wait_max, 3),
+                "buckets": dict(zip(QUEUE_WAIT_BUCKETS, self.wait_buckets))
+            }
+        }
+
+    def _grant(self):
+        while self._queue and self.running < self.max_concurrency:
+            _, ticket = self._queue.popitem(last=False)
+            if ticket._granted.done():
+                # 排队期间已被取消
+                continue
+            self.running += 1
+            ticket.started_at = time.monotonic()
+            self._record_wait(ticket.queue_wait)
+            ticket._granted.set_result(None)
+
+    def _record_wait(self, seconds: float):
+        self.wait_count += 1
+        self.wait_sum += seconds
+        self.wait_max = max(self.wait_max, seconds)
+        for index, bound in enumerate(QUEUE_WAIT_BUCKETS):
+            if seconds <= bound:
+                self.wait_buckets[index] += 1
@@ -0,0 +1,213 @@
+"""
+批量执行
+同一个工作流按输入表的每一行执行一次：执行计划只构建一次，浏览器上下文和页面在行之间复用，
+所有行的提取数据写入同一个输出（记录带 _row 行号），每行只保留状态摘要
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from models.workflow import (
+    BatchInput, BatchRowResult, ExecutionOptions, ExecutionResult, WorkflowDefinition
+)
+from nodes.base import EventCallback, ExecutionContext
+from storage.sinks import DataSink
+from workflow.compiler import CompiledWorkflow
+from workflow.session import ExecutionSession
+
+logger = logging.getLogger(__name__)
+
+
+def _row_variables(row: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    行字段转换为变量：数字、布尔值等单元格转为字符串（与表格中的文本一致，可直接用于输入文本），
+    空单元格为空字符串，列表和字典保持原样（供列表循环使用）
+    """
+    variables = {}
+    for key, value in row.items():
+        if value is None:
+            value = ""
+        elif not isinstance(value, (str, list, dict)):
+            value = str(value)
+        variables[key] = value
+    return variables
+
+
+class _RowSink(DataSink):
+    """单行的数据输出 - 写入批量执行共用的输出，每条记录带上行号"""
+
+    def __init__(self, sink: DataSink, row: int):
+        super().__init__()
+        self.sink = sink
+        self.row = row
+        self.format = sink.format
+        self.path = sink.path
+
+    def write(self, record: Dict[str, Any]):
+        self.sink.write({"_row": self.row, **record})
+        self.count += 1
+
+
+class BatchRunner:
+    """一次批量执行"""
+
+    def __init__(self,
+                 engine,
+                 workflow: WorkflowDefinition,
+                 batch: BatchInput,
+                 execution_id: str = "",
+                 options: Optional[ExecutionOptions] = None,
+                 on_event: Optional[EventCallback] = None):
+        """
+        Args:
+            engine: 执行引擎（提供执行计划缓存、浏览器池和节点调度）
+            workflow: 工作流定义
+            batch: 输入表和并发设置
+            execution_id: 执行ID
+            options: 执行选项
+            on_event: 执行事件的接收方，每行结束时调用 ("row_finished", 行结果)
+        """
+        self.engine = engine
+        self.workflow = workflow
+        self.batch = batch
+        self.execution_id = execution_id
+        self.options = options or ExecutionOptions()
+        self.on_event = on_event
+        self._rows: Deque[Tuple[int, Dict[str, Any]]] = deque(enumerate(batch.rows))
+        self._row_results: List[Optional[BatchRowResult]] = [None] * len(batch.rows)
+
+    async def run(self) -> ExecutionResult:
+        engine = self.engine
+        result = ExecutionResult(
+            execution_id=self.execution_id,
+            workflow_id=self.workflow.workflow_id,
+            status="running",
+            start_time=datetime.now(),
+            steps=[]
+        )
+        sessions: List[ExecutionSession] = []
+        sink: Optional[DataSink] = None
+
+        try:
+            plan = engine.plan_cache.get(self.workflow)
+            if not plan.start_nodes:
+                raise ValueError("未找到开始节点")
+            if not self.batch.rows:
+                raise ValueError("输入表为空")
+
+            # 批量结果总是写入文件，内存输出改为jsonl
+            sink_format = self.options.data_sink or engine.data_sink
+            if sink_format == "memory":
+                sink_format = "jsonl"
+            sink = engine._create_sink(self.execution_id, self.options.model_copy(update={"data_sink": sink_format}))
+            screenshots = engine._create_screenshot_recorder(self.options)
+            network_profile = self.options.network_profile or engine.network_profile
+
+            concurrency = max(1, min(self.batch.concurrency, len(self.batch.rows)))
+            browsers = max(1, min(self.batch.browsers, concurrency))
+            for index in range(browsers):
+                sessions.append(await ExecutionSession.open(
+                    f"{self.execution_id}#{index}", engine.browser_pool, None, screenshots, network_profile
+                ))
+
+            # 页面轮流分配到各个浏览器上下文，每个会话自带的页面先用
+            slots = []
+            for index in range(concurrency):
+                session = sessions[index % browsers]
+                page = session.page if index < browsers else await session.browser_context.new_page()
+                slots.append((session, page))
+
+            logger.info(f"开始批量执行: {self.execution_id}, {len(self.batch.rows)} 行, "
+                        f"{concurrency} 个页面, {browsers} 个浏览器上下文")
+            await asyncio.gather(*(self._worker(plan, sink, session, page) for session, page in slots))
+            result.status = "completed"
+
+        except asyncio.CancelledError:
+            logger.info(f"批量执行已停止: {self.execution_id}")
+            result.status = "stopped"
+            result.error = "执行已被停止"
+
+        except Exception as e:
+            logger.error(f"批量执行失败: {self.execution_id}, 错误: {str(e)}")
+            result.status = "failed"
+            result.error = str(e)
+
+        finally:
+            for session in sessions:
+                await session.close(engine.close_timeout)
+            if sink:
+                try:
+                    await asyncio.wait_for(sink.close(), engine.close_timeout)
+                except asyncio.TimeoutError:
+                    logger.warning(f"写出提取数据超时: {self.execution_id}")
+                result.extracted_count = sink.count
+                result.data_file = sink.path
+
+            result.rows = [row for row in self._row_results if row is not None]
+            result.end_time = datetime.now()
+            result.total_duration = (result.end_time - result.start_time).total_seconds()
+
+        return result
+
+    async def _worker(self, plan: CompiledWorkflow, sink: DataSink, session: ExecutionSession, page):
+        """在一个页面上依次处理输入表中的行，直到没有剩余的行"""
+        while self._rows:
+            index, row = self._rows.popleft()
+            if page.is_closed():
+                # 上一行把页面弄崩溃或关闭了，换一个新页面
+                page = await session.browser_context.new_page()
+            row_result = await self._run_row(plan, sink, session, page, index, row)
+            self._row_results[index] = row_result
+            if self.on_event:
+                self.on_event("row_finished", row_result.model_dump(mode="json"))
+
+    async def _run_row(self,
+                       plan: CompiledWorkflow,
+                       sink: DataSink,
+                       session: ExecutionSession,
+                       page,
+                       index: int,
+                       row: Dict[str, Any]) -> BatchRowResult:
+        context = ExecutionContext(
+            session.browser,
+            page,
+            session.browser_context,
+            _RowSink(sink, index),
+            session.context.screenshots,
+            session.context.network
+        )
+        context.retry_policies = self.engine.retry_policies
+        context.variables.update(_row_variables(row))
+        context.set_variable("row_index", index)
+
+        # 步骤结果只在本行执行期间保留，用于汇总状态
+        row_steps = ExecutionResult(
+            execution_id=self.execution_id,
+            workflow_id=self.workflow.workflow_id,
+            status="running",
+            start_time=datetime.now()
+        )
+        started = time.monotonic()
+        error: Optional[str] = None
+        failed_node: Optional[str] = None
+        try:
+            await self.engine._execute_nodes(plan, context, row_steps, self.options)
+        except Exception as e:
+            error = str(e)
+
+        failed = next((step for step in row_steps.steps if step.status == "failed"), None)
+        if failed:
+            failed_node, error = failed.node_id, error or failed.error
+
+        return BatchRowResult(
+            row=index,
+            status="failed" if failed or error is not None else "completed",
+            duration=round(time.monotonic() - started, 3),
+            records=context.sink.count,
+            failed_node=failed_node,
+            error=error
+        )
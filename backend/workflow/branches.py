@@ -0,0 +1,105 @@
+"""
+并行分支页面管理
+分支模式下，图中每条独立的分支在同一浏览器上下文中使用自己的页面（共享Cookie），
+分支在汇合节点处合并回其中一条分支的页面
+
+分配规则：
+- 节点把自己的页面交给第一个后继节点，其余后继节点各自打开新页面，并打开前驱节点
+  结束时页面所在的URL（同一浏览器上下文，Cookie和localStorage共享；页面内未提交的状态不复制）
+- 汇合节点沿用第一个把页面交给它的前驱的页面，其他前驱交来的页面随即关闭
+- 分支结束（没有后继或执行未成功）时关闭该分支的页面
+"""
+
+import logging
+from typing import Dict, List
+
+from playwright.async_api import Page
+
+from nodes.base import ExecutionContext
+from workflow.compiler import CompiledWorkflow
+
+logger = logging.getLogger(__name__)
+
+
+class BranchManager:
+    """为并行分支分配和回收页面"""
+
+    def __init__(self, plan: CompiledWorkflow, root_context: ExecutionContext):
+        self.plan = plan
+        self.root_context = root_context
+        self.main_page = root_context.page
+        self._contexts: Dict[str, ExecutionContext] = {}  # 节点ID -> 该节点使用的上下文
+        self._page_ids: Dict[int, int] = {id(self.main_page): 0}
+        self._urls: Dict[str, str] = {}  # 节点ID -> 节点成功结束时页面的URL
+        self._root_assigned = False
+
+    def page_id(self, node_id: str) -> int:
+        """节点所用页面的编号，主页面为0"""
+        context = self._contexts.get(node_id)
+        return self._page_ids.get(id(context.page), 0) if context else 0
+
+    async def context_for(self, node_id: str) -> ExecutionContext:
+        """
+        获取节点执行时使用的上下文
+
+        Args:
+            node_id: 节点ID
+
+        Returns:
+            ExecutionContext: 与其他分支共享状态、但页面独立的上下文
+        """
+        inherited: List[ExecutionContext] = [
+            self._contexts[pred]
+            for pred in self.plan.predecessors[node_id]
+            if pred in self._contexts and self._hands_page_to(pred, node_id)
+        ]
+
+        if inherited:
+            context = inherited[0]
+            # 汇合：其他分支到此结束，关闭它们的页面
+            for other in inherited[1:]:
+                if other.page is not context.page:
+                    await self._close_page(other.page)
+        elif not self._root_assigned and node_id in self.plan.start_nodes:
+            self._root_assigned = True
+            context = self.root_context
+        else:
+            page = await self.root_context.browser_context.new_page()
+            self._page_ids[id(page)] = len(self._page_ids)
+            context = self.root_context.fork(page)
+            # 分叉出的分支从前驱节点所在的页面开始，而不是空白页
+            url = next(
+                (self._urls[pred] for pred in self.plan.predecessors[node_id] if pred in self._urls), None
+            )
+            if url and url != "about:blank":
+                try:
+                    await page.goto(url, wait_until="domcontentloaded")
+                except BaseException:
+                    await self._close_page(page)
+                    raise
+            logger.info(f"为分支节点 {node_id} 打开新页面: {url or 'about:blank'}")
+
+        self._contexts[node_id] = context
+        return context
+
+    async def finish(self, node_id: str, status: str):
+        """节点结束 - 分支没有后续时关闭其页面"""
+        context = self._contexts.get(node_id)
+        if context is None:
+            return
+        if status == "success" and not context.page.is_closed():
+            self._urls[node_id] = context.page.url
+        if status != "success" or not self.plan.successors[node_id]:
+            await self._close_page(context.page)
+
+    def _hands_page_to(self, pred: str, node_id: str) -> bool:
+        successors = self.plan.successors[pred]
+        return bool(successors) and successors[0] == node_id
+
+    async def _close_page(self, page: Page):
+        if page is self.main_page or page.is_closed():
+            return
+        try:
+            await page.close()
+        except Exception as e:
+            logger.warning(f"关闭分支页面失败: {e}")
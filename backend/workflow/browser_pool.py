@@ -0,0 +1,352 @@
+"""
+浏览器池
+在API进程内常驻若干已启动的Chromium实例，为每次执行分配隔离的BrowserContext/Page，
+避免每个工作流都承担一次完整的浏览器冷启动
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Optional
+from playwright.async_api import async_playwright, Browser, BrowserContext, Page
+
+from workflow.launch_profiles import LaunchProfile, get_launch_profile
+
+logger = logging.getLogger(__name__)
+
+
+class PooledBrowser:
+    """池中的单个浏览器实例"""
+
+    def __init__(self, browser: Browser):
+        self.browser = browser
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        self.active_contexts = 0  # 当前借出的上下文数量
+        self.leases_served = 0  # 累计服务的执行次数
+        self.retired = False  # 已标记退役，不再分配新的上下文
+
+    @property
+    def healthy(self) -> bool:
+        return not self.retired and self.browser.is_connected()
+
+
+class BrowserLease:
+    """一次执行借用的浏览器资源 - 独立的上下文和页面"""
+
+    def __init__(self, pooled: PooledBrowser, context: BrowserContext, page: Page):
+        self._pooled = pooled
+        self.browser: Browser = pooled.browser
+        self.context = context
+        self.page = page
+
+
+class BrowserPool:
+    """浏览器池 - 管理预热浏览器的创建、分配、回收与健康检查"""
+
+    def __init__(self,
+                 min_size: int = 1,
+                 max_size: int = 4,
+                 max_contexts_per_browser: int = 8,
+                 idle_timeout: float = 300.0,
+                 health_check_interval: float = 30.0,
+                 max_leases_per_browser: int = 200,
+                 launch_profile: Optional[LaunchProfile] = None):
+        if max_size < 1 or min_size < 0 or min_size > max_size:
+            raise ValueError(f"浏览器池大小配置无效: min={min_size}, max={max_size}")
+
+        self.min_size = min_size
+        self.max_size = max_size
+        self.max_contexts_per_browser = max_contexts_per_browser
+        self.idle_timeout = idle_timeout
+        self.health_check_interval = health_check_interval
+        self.max_leases_per_browser = max_leases_per_browser
+        self.launch_profile = launch_profile or get_launch_profile("headless")
+
+        self.playwright = None
+        self._browsers: List[PooledBrowser] = []
+        self._launching = 0  # 正在启动中的浏览器数量
+        self._condition = asyncio.Condition()
+        self._maintenance_task: Optional[asyncio.Task] = None
+        self._closed = False
+
+    async def start(self):
+        """启动Playwright和后台维护任务"""
+        if self.playwright is None:
+            self.playwright = await async_playwright().start()
+        if self._maintenance_task is None and self.health_check_interval > 0:
+            self._maintenance_task = asyncio.create_task(self._maintenance_loop())
+        logger.info(f"浏览器池已启动: min={self.min_size}, max={self.max_size}, profile={self.launch_profile.name}")
+
+    async def warm_up(self):
+        """
+        预热 - 启动最小数量（至少一个）的浏览器，并在每个浏览器上打开关闭一次页面，
+        服务启动后的第一个执行不再承担浏览器冷启动
+        """
+        if self.playwright is None:
+            await self.start()
+
+        started = time.monotonic()
+        async with self._condition:
+            missing = min(max(self.min_size, 1), self.max_size) - len(self._browsers) - self._launching
+            if missing <= 0:
+                return
+            self._launching += missing
+
+        launched = await self._launch_missing(missing, warm=True)
+        logger.info(f"浏览器预热完成: {launched} 个, 用时 {time.monotonic() - started:.2f}秒")
+
+    async def close(self):
+        """关闭所有浏览器和Playwright"""
+        self._closed = True
+
+        if self._maintenance_task:
+            self._maintenance_task.cancel()
+            try:
+                await self._maintenance_task
+            except asyncio.CancelledError:
+                pass
+            self._maintenance_task = None
+
+        async with self._condition:
+            browsers = self._browsers
+            self._browsers = []
+            self._condition.notify_all()
+
+        for pooled in browsers:
+            await self._close_browser(pooled)
+
+        if self.playwright:
+            await self.playwright.stop()
+            self.playwright = None
+
+        logger.info("浏览器池已关闭")
+
+    async def acquire(self, storage_state: Optional[Dict[str, Any]] = None) -> BrowserLease:
+        """
+        借用一个隔离的浏览器上下文
+
+        Args:
+            storage_state: 新上下文的初始存储状态（Cookie、localStorage），从检查点恢复时使用
+
+        Returns:
+            BrowserLease: 包含浏览器、上下文和页面的租约
+        """
+        if self._closed:
+            raise RuntimeError("浏览器池已关闭")
+        if self.playwright is None:
+            await self.start()
+
+        pooled = await self._reserve_browser()
+        context: Optional[BrowserContext] = None
+        try:
+            context = await self._new_context(pooled.browser, storage_state)
+            page = await context.new_page()
+        except BaseException:
+            # 创建失败或执行被停止（CancelledError）：关闭已创建的上下文，归还占用的名额
+            if context is not None:
+                try:
+                    await context.close()
+                except Exception as e:
+                    logger.warning(f"关闭浏览器上下文失败: {e}")
+            await self._return_slot(pooled)
+            raise
+
+        return BrowserLease(pooled, context, page)
+
+    async def release(self, lease: BrowserLease, timeout: Optional[float] = None):
+        """
+        归还租约 - 关闭上下文，浏览器留在池中复用
+
+        Args:
+            lease: 租约
+            timeout: 关闭上下文的超时时间（秒）；超时的浏览器不再分配新的上下文，
+                     其余上下文归还后关闭
+        """
+        try:
+            await asyncio.wait_for(lease.context.close(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("关闭浏览器上下文超时，该浏览器将被回收")
+            lease._pooled.retired = True
+        except Exception as e:
+            logger.warning(f"关闭浏览器上下文失败: {e}")
+        await self._return_slot(lease._pooled)
+
+    def stats(self) -> Dict[str, Any]:
+        """池状态统计"""
+        return {
+            "browsers": len(self._browsers),
+            "launching": self._launching,
+            "active_contexts": sum(p.active_contexts for p in self._browsers),
+            "pages": sum(len(context.pages) for p in self._browsers for context in p.browser.contexts),
+            "min_size": self.min_size,
+            "max_size": self.max_size,
+        }
+
+    async def _reserve_browser(self) -> PooledBrowser:
+        """选出一个有空闲名额的浏览器，必要时启动新实例，池满时等待"""
+        async with self._condition:
+            while True:
+                if self._closed:
+                    raise RuntimeError("浏览器池已关闭")
+
+                candidates = [
+                    p for p in self._browsers
+                    if p.healthy and p.active_contexts < self.max_contexts_per_browser
+                ]
+                if candidates:
+                    pooled = min(candidates, key=lambda p: p.active_contexts)
+                    self._occupy(pooled)
+                    return pooled
+
+                if len(self._browsers) + self._launching < self.max_size:
+                    self._launching += 1
+                    break
+
+                await self._condition.wait()
+
+        # 在锁外启动浏览器，避免阻塞其他借用者
+        try:
+            pooled = await self._launch_browser()
+        finally:
+            async with self._condition:
+                self._launching -= 1
+                self._condition.notify_all()
+
+        async with self._condition:
+            if not self._closed:
+                self._browsers.append(pooled)
+                self._occupy(pooled)
+                return pooled
+
+        # 启动期间池已关闭
+        await self._close_browser(pooled)
+        raise RuntimeError("浏览器池已关闭")
+
+    def _occupy(self, pooled: PooledBrowser):
+        pooled.active_contexts += 1
+        pooled.leases_served += 1
+        pooled.last_used = time.monotonic()
+        if pooled.leases_served >= self.max_leases_per_browser:
+            # 达到服务上限后退役，当前执行结束时关闭
+            pooled.retired = True
+
+    async def _return_slot(self, pooled: PooledBrowser):
+        to_close = None
+        async with self._condition:
+            pooled.active_contexts -= 1
+            pooled.last_used = time.monotonic()
+            if pooled.active_contexts == 0 and not pooled.healthy and pooled in self._browsers:
+                self._browsers.remove(pooled)
+                to_close = pooled
+            self._condition.notify_all()
+
+        if to_close:
+            await self._close_browser(to_close)
+
+    async def _launch_browser(self, warm: bool = False) -> PooledBrowser:
+        """按启动配置启动一个新的Chromium实例"""
+        browser = await self.playwright.chromium.launch(**self.launch_profile.launch_options())
+        if warm:
+            try:
+                context = await self._new_context(browser)
+                await context.new_page()
+                await context.close()
+            except Exception:
+                await browser.close()
+                raise
+        logger.info("浏览器启动成功")
+        return PooledBrowser(browser)
+
+    async def _new_context(self,
+                           browser: Browser,
+                           storage_state: Optional[Dict[str, Any]] = None) -> BrowserContext:
+        """创建隔离的浏览器上下文"""
+        return await browser.new_context(
+            **self.launch_profile.context_options(),
+            storage_state=storage_state
+        )
+
+    async def _close_browser(self, pooled: PooledBrowser):
+        try:
+            await pooled.browser.close()
+        except Exception as e:
+            logger.warning(f"关闭浏览器失败: {e}")
+        logger.info("浏览器已关闭")
+
+    async def _maintenance_loop(self):
+        """后台维护：健康检查、空闲回收、补足最小数量"""
+        while not self._closed:
+            try:
+                await self._maintain()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"浏览器池维护失败: {e}")
+            await asyncio.sleep(self.health_check_interval)
+
+    async def _maintain(self):
+        now = time.monotonic()
+        to_close: List[PooledBrowser] = []
+
+        async with self._condition:
+            # 移除断开连接或已退役且空闲的浏览器
+            for pooled in list(self._browsers):
+                if not pooled.healthy and pooled.active_contexts == 0:
+                    self._browsers.remove(pooled)
+                    to_close.append(pooled)
+
+            # 回收超过空闲时间的浏览器，但保留最小数量
+            idle = sorted(
+                (p for p in self._browsers
+                 if p.active_contexts == 0 and now - p.last_used > self.idle_timeout),
+                key=lambda p: p.last_used
+            )
+            for pooled in idle:
+                if len(self._browsers) <= self.min_size:
+                    break
+                self._browsers.remove(pooled)
+                to_close.append(pooled)
+
+            missing = self.min_size - len(self._browsers) - self._launching
+            if missing > 0:
+                self._launching += missing
+            self._condition.notify_all()
+
+        for pooled in to_close:
+            await self._close_browser(pooled)
+
+        if missing > 0:
+            await self._launch_missing(missing)
+
+    async def _launch_missing(self, count: int, warm: bool = False) -> int:
+        """
+        启动已计入 _launching 的 count 个浏览器并加入池中
+
+        Args:
+            count: 浏览器数量
+            warm: 启动后打开关闭一次页面（预热渲染进程）
+
+        Returns:
+            int: 成功启动的数量
+        """
+        results = await asyncio.gather(
+            *(self._launch_browser(warm) for _ in range(count)),
+            return_exceptions=True
+        )
+        launched: List[PooledBrowser] = []
+        async with self._condition:
+            self._launching -= count
+            for result in results:
+                if isinstance(result, Exception):
+                    logger.error(f"预热浏览器启动失败: {result}")
+                elif not self._closed:
+                    self._browsers.append(result)
+                    launched.append(result)
+            self._condition.notify_all()
+
+        # 启动期间池已关闭
+        for result in results:
+            if isinstance(result, PooledBrowser) and result not in launched:
+                await self._close_browser(result)
+        return len(launched)
@@ -0,0 +1,375 @@
+"""
+工作流编译
+把工作流定义一次性编译为执行计划：节点索引、邻接表、入度、开始节点以及
+预先实例化并校验过的节点对象。执行计划按工作流内容哈希缓存，重复执行同一
+工作流时直接复用
+
+循环节点的循环体在编译时拆成独立的子图：
+- 循环节点上 sourceHandle 为 "body" 的连接指向循环体入口；没有显式标记时，
+  由指回循环节点的回边确定循环体（环上的节点）
+- 指回循环节点的回边被去掉，循环体内指向外部的连接被提升为循环节点的出边
+- 循环体中入度为0的节点是每轮迭代的起点
+- 拆分后主图和各循环体必须无环，不经过循环节点的环在编译时报错
+"""
+
+import hashlib
+import json
+import logging
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Set
+
+from models.workflow import WorkflowDefinition, WorkflowNode, NodeType
+from nodes.base import BaseNode
+from nodes import node_registry
+
+logger = logging.getLogger(__name__)
+
+# 循环节点指向循环体入口的连接句柄
+LOOP_BODY_HANDLE = "body"
+
+
+class CompiledWorkflow:
+    """编译后的执行计划（只读，可被并发执行共享）"""
+
+    def __init__(self,
+                 workflow_hash: str,
+                 nodes: Dict[str, WorkflowNode],
+                 order: List[str],
+                 successors: Dict[str, List[str]],
+                 predecessors: Dict[str, List[str]],
+                 in_degree: Dict[str, int],
+                 start_nodes: List[str],
+                 instances: Dict[str, Optional[BaseNode]],
+                 loop_bodies: Optional[Dict[str, List[str]]] = None):
+        self.workflow_hash = workflow_hash
+        self.nodes = nodes  # 节点ID -> 节点定义
+        self.order = order  # 节点在定义中的顺序
+        self.successors = successors  # 节点ID -> 后继节点ID列表
+        self.predecessors = predecessors  # 节点ID -> 前驱节点ID列表
+        self.in_degree = in_degree  # 节点ID -> 入度
+        self.start_nodes = start_nodes
+        self.instances = instances  # 节点ID -> 节点实例（注释节点为None）
+        self.loop_bodies = loop_bodies or {}  # 循环节点ID -> 循环体每轮迭代的起点
+
+    def node_type(self, node_id: str) -> Optional[NodeType]:
+        """获取节点类型"""
+        node = self.nodes.get(node_id)
+        return node.data.nodeType if node else None
+
+
+def workflow_hash(workflow: WorkflowDefinition) -> str:
+    """
+    计算工作流内容哈希 - 只包含影响执行的字段（节点类型、参数和连接关系）
+
+    Args:
+        workflow: 工作流定义
+
+    Returns:
+        str: 十六进制的SHA-256摘要
+    """
+    content = {
+        "nodes": [
+            [node.id, node.data.nodeType.value, node.data.params]
+            for node in workflow.nodes
+        ],
+        "edges": [
+            [edge.source, edge.target, edge.sourceHandle, edge.targetHandle]
+            for edge in workflow.edges
+        ],
+    }
+    payload = json.dumps(content, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def compile_workflow(workflow: WorkflowDefinition, digest: Optional[str] = None) -> CompiledWorkflow:
+    """
+    编译工作流
+
+    Args:
+        workflow: 工作流定义
+        digest: 预先计算好的内容哈希
+
+    Returns:
+        CompiledWorkflow: 执行计划
+
+    Raises:
+        ValueError: 节点ID重复、连接指向不存在的节点、存在不经过循环节点的环、节点类型不支持或参数缺失
+    """
+    nodes: Dict[str, WorkflowNode] = {}
+    order: List[str] = []
+    for node in workflow.nodes:
+        if node.id in nodes:
+            raise ValueError(f"节点ID重复: {node.id}")
+        nodes[node.id] = node
+        order.append(node.id)
+
+    raw_successors: Dict[str, List[str]] = {node_id: [] for node_id in order}
+    body_entries: Dict[str, List[str]] = {}
+    for edge in workflow.edges:
+        if edge.source not in nodes:
+            raise ValueError(f"连接 {edge.id} 的源节点不存在: {edge.source}")
+        if edge.target not in nodes:
+            raise ValueError(f"连接 {edge.id} 的目标节点不存在: {edge.target}")
+        # 重复的连接只计一次
+        if edge.target not in raw_successors[edge.source]:
+            raw_successors[edge.source].append(edge.target)
+        if edge.sourceHandle == LOOP_BODY_HANDLE:
+            body_entries.setdefault(edge.source, []).append(edge.target)
+
+    loop_ids = [node_id for node_id in order if nodes[node_id].data.nodeType == NodeType.LOOP]
+    owner = _assign_loop_owners(order, raw_successors, loop_ids, body_entries)
+
+    # 把每条连接提升到两端所在的同一层子图中
+    successors: Dict[str, List[str]] = {node_id: [] for node_id in order}
+    predecessors: Dict[str, List[str]] = {node_id: [] for node_id in order}
+    for source in order:
+        for target in raw_successors[source]:
+            edge = _lift_edge(source, target, owner)
+            if edge is None:
+                continue
+            lifted_source, lifted_target = edge
+            if lifted_target not in successors[lifted_source]:
+                successors[lifted_source].append(lifted_target)
+                predecessors[lifted_target].append(lifted_source)
+
+    in_degree = {node_id: len(predecessors[node_id]) for node_id in order}
+    _check_acyclic(order, successors, in_degree)
+
+    loop_bodies: Dict[str, List[str]] = {}
+    for node_id in order:
+        loop_id = owner[node_id]
+        if loop_id is not None and in_degree[node_id] == 0:
+            loop_bodies.setdefault(loop_id, []).append(node_id)
+
+    # 开始节点：没有入边的节点或者类型为start的节点
+    start_nodes = [
+        node_id for node_id in order
+        if owner[node_id] is None and (
+            in_degree[node_id] == 0 or nodes[node_id].data.nodeType == NodeType.START
+        )
+    ]
+
+    # 预先实例化节点，参数校验在这里一次完成
+    instances: Dict[str, Optional[BaseNode]] = {}
+    for node_id in order:
+        node_type = nodes[node_id].data.nodeType.value
+        if node_type == "comment":
+            instances[node_id] = None
+            continue
+        if node_type not in node_registry:
+            raise ValueError(f"不支持的节点类型: {node_type}")
+        instances[node_id] = node_registry[node_type](node_id, nodes[node_id].data.params)
+
+    return CompiledWorkflow(
+        workflow_hash=digest or workflow_hash(workflow),
+        nodes=nodes,
+        order=order,
+        successors=successors,
+        predecessors=predecessors,
+        in_degree=in_degree,
+        start_nodes=start_nodes,
+        instances=instances,
+        loop_bodies=loop_bodies
+    )
+
+
+def _check_acyclic(order: List[str], successors: Dict[str, List[str]], in_degree: Dict[str, int]):
+    """
+    确认提升后的连接无环（拓扑排序），否则环上节点的入度永远无法满足，调度时会被静默跳过
+
+    Raises:
+        ValueError: 存在不经过循环节点的环
+    """
+    remaining = dict(in_degree)
+    ready = [node_id for node_id in order if remaining[node_id] == 0]
+    while ready:
+        node_id = ready.pop()
+        for successor in successors[node_id]:
+            remaining[successor] -= 1
+            if remaining[successor] == 0:
+                ready.append(successor)
+
+    blocked = {node_id for node_id in order if remaining[node_id] > 0}
+    if not blocked:
+        return
+
+    # 去掉只是位于环下游的节点，只报告环上的节点
+    pruned = True
+    while pruned:
+        pruned = False
+        for node_id in list(blocked):
+            if not any(successor in blocked for successor in successors[node_id]):
+                blocked.discard(node_id)
+                pruned = True
+    cyclic = [node_id for node_id in order if node_id in blocked]
+    raise ValueError(f"工作流中存在不经过循环节点的环: {cyclic}")
+
+
+def _reachable(starts: Iterable[str], edges: Dict[str, List[str]], barrier: str) -> Set[str]:
+    """从starts出发沿edges可达的节点（不穿过barrier）"""
+    seen: Set[str] = set()
+    stack = [node_id for node_id in starts if node_id != barrier]
+    while stack:
+        node_id = stack.pop()
+        if node_id in seen:
+            continue
+        seen.add(node_id)
+        stack.extend(n for n in edges[node_id] if n != barrier and n not in seen)
+    return seen
+
+
+def _find_back_edge_sources(order: List[str],
+                            successors: Dict[str, List[str]],
+                            predecessors: Dict[str, List[str]]) -> Dict[str, List[str]]:
+    """
+    深度优先遍历找出回边（指向遍历栈上祖先节点的连接）
+
+    Returns:
+        Dict[str, List[str]]: 回边目标节点ID -> 回边源节点ID列表
+    """
+    back_sources: Dict[str, List[str]] = {}
+    visited: Set[str] = set()
+    on_stack: Set[str] = set()
+
+    roots = [node_id for node_id in order if not predecessors[node_id]]
+    for root in roots + order:
+        if root in visited:
+            continue
+        visited.add(root)
+        on_stack.add(root)
+        stack = [(root, iter(successors[root]))]
+        while stack:
+            node_id, children = stack[-1]
+            child = next(children, None)
+            if child is None:
+                stack.pop()
+                on_stack.discard(node_id)
+            elif child in on_stack:
+                back_sources.setdefault(child, []).append(node_id)
+            elif child not in visited:
+                visited.add(child)
+                on_stack.add(child)
+                stack.append((child, iter(successors[child])))
+
+    return back_sources
+
+
+def _assign_loop_owners(order: List[str],
+                        successors: Dict[str, List[str]],
+                        loop_ids: List[str],
+                        body_entries: Dict[str, List[str]]) -> Dict[str, Optional[str]]:
+    """
+    计算每个节点所属的最内层循环
+
+    Returns:
+        Dict[str, Optional[str]]: 节点ID -> 所属循环节点ID（不在任何循环体中为None）
+    """
+    predecessors: Dict[str, List[str]] = {node_id: [] for node_id in order}
+    for source in order:
+        for target in successors[source]:
+            predecessors[target].append(source)
+
+    back_sources = _find_back_edge_sources(order, successors, predecessors)
+
+    bodies: Dict[str, Set[str]] = {}
+    for loop_id in loop_ids:
+        if loop_id in body_entries:
+            body = _reachable(body_entries[loop_id], successors, loop_id)
+        else:
+            # 自然循环：不经过循环节点就能到达回边源节点的所有节点
+            body = (_reachable(back_sources.get(loop_id, []), predecessors, loop_id) &
+                    _reachable(successors[loop_id], successors, loop_id))
+        if body:
+            bodies[loop_id] = body
+
+    owner: Dict[str, Optional[str]] = {}
+    for node_id in order:
+        containing = [loop_id for loop_id, body in bodies.items() if node_id in body]
+        # 最内层循环的循环体最小，且必须被其他外层循环体完整包含
+        containing.sort(key=lambda loop_id: len(bodies[loop_id]))
+        for inner, outer in zip(containing, containing[1:]):
+            if not bodies[inner] <= bodies[outer]:
+                raise ValueError(f"循环 {inner} 与 {outer} 的循环体交叉")
+        owner[node_id] = containing[0] if containing else None
+
+    return owner
+
+
+def _loop_chain(node_id: str, owner: Dict[str, Optional[str]]) -> List[Optional[str]]:
+    """节点由内到外所在的各层子图（None表示主图）"""
+    chain: List[Optional[str]] = []
+    current = owner[node_id]
+    while current is not None:
+        chain.append(current)
+        current = owner[current]
+    chain.append(None)
+    return chain
+
+
+def _lift_edge(source: str, target: str, owner: Dict[str, Optional[str]]) -> Optional[tuple]:
+    """
+    把一条连接提升到两端共同所在的最内层子图
+
+    Returns:
+        Optional[tuple]: (源, 目标)；回边、循环体入口边以及提升后首尾相同的连接返回None
+    """
+    source_chain = _loop_chain(source, owner)
+    target_chain = _loop_chain(target, owner)
+
+    # 指回外层循环节点的回边，以及循环节点进入自己循环体的连接
+    if target in source_chain or source in target_chain:
+        return None
+
+    section = next(s for s in source_chain if s in target_chain)
+
+    def lift(node_id: str) -> str:
+        while owner[node_id] != section:
+            node_id = owner[node_id]
+        return node_id
+
+    lifted_source, lifted_target = lift(source), lift(target)
+    if lifted_source == lifted_target:
+        return None
+    return lifted_source, lifted_target
+
+
+class PlanCache:
+    """执行计划的LRU缓存，以工作流内容哈希为键"""
+
+    def __init__(self, maxsize: int = 128):
+        self.maxsize = maxsize
+        self._plans: "OrderedDict[str, CompiledWorkflow]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, workflow: WorkflowDefinition) -> CompiledWorkflow:
+        """
+        获取执行计划，未命中时编译并放入缓存
+
+        Args:
+            workflow: 工作流定义
+
+        Returns:
+            CompiledWorkflow: 执行计划
+        """
+        digest = workflow_hash(workflow)
+        plan = self._plans.get(digest)
+        if plan is not None:
+            self._plans.move_to_end(digest)
+            self.hits += 1
+            return plan
+
+        self.misses += 1
+        plan = compile_workflow(workflow, digest)
+        if self.maxsize > 0:
+            self._plans[digest] = plan
+            if len(self._plans) > self.maxsize:
+                self._plans.popitem(last=False)
+        logger.info(f"工作流已编译: {workflow.workflow_id} ({len(plan.order)} 个节点)")
+        return plan
+
+    def clear(self):
+        self._plans.clear()
+
+    def __len__(self) -> int:
+        return len(self._plans)
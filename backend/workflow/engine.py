@@ -5,38 +5,109 @@
 
 import asyncio
 import logging
+import os
+import re
+import uuid
 from datetime import datetime
-from typing import Dict, List, Optional, Set
-from playwright.async_api import async_playwright, Browser, Page
+from typing import Any, Callable, Dict, List, Optional
 
-from models.workflow import WorkflowDefinition, ExecutionResult, StepResult
-from nodes.base import ExecutionContext
-from nodes import node_registry
+from models.workflow import BatchInput, WorkflowDefinition, ExecutionResult, ExecutionOptions, StepResult
+from nodes.base import BaseNode, ExecutionContext
+from nodes.browser_nodes import LoopNode
+from nodes.retry import RetryPolicies
+from nodes.screenshots import ScreenshotPolicy, ScreenshotRecorder
+from workflow.batch import BatchRunner
+from workflow.branches import BranchManager
+from workflow.browser_pool import BrowserPool
+from workflow.compiler import CompiledWorkflow, PlanCache
+from workflow.metrics import EngineMetrics
+from workflow.scheduler import DagScheduler
+from workflow.session import ExecutionSession
+from storage.checkpoints import Checkpoint, CheckpointRecorder, CheckpointStore
+from storage.sinks import DataSink, create_sink, reopen_sink
 
 logger = logging.getLogger(__name__)
 
 
 class WorkflowEngine:
-    """工作流执行引擎"""
+    """
+    工作流执行引擎
+
+    引擎本身不持有任何单次执行的状态，每次执行的浏览器资源和上下文都放在
+    独立的 ExecutionSession 中，因此同一个引擎实例可以被并发调用
+    """
     
-    def __init__(self):
-        self.browser: Optional[Browser] = None
-        self.page: Optional[Page] = None
-        self.playwright = None
+    def __init__(self,
+                 browser_pool: Optional[BrowserPool] = None,
+                 plan_cache_size: int = 128,
+                 max_concurrency: int = 8,
+                 data_sink: str = "memory",
+                 data_dir: str = "data",
+                 data_sink_buffer_size: int = 500,
+                 screenshot_policy: Optional[ScreenshotPolicy] = None,
+                 screenshots_dir: str = "screenshots",
+                 network_profile: str = "none",
+                 har_dir: str = "har",
+                 close_timeout: float = 10.0,
+                 retry_policies: Optional[RetryPolicies] = None,
+                 checkpoint_store: Optional[CheckpointStore] = None,
+                 checkpoints_enabled: bool = True):
+        """
+        Args:
+            browser_pool: 共享的浏览器池；不提供时每次执行使用一次性的私有池
+            plan_cache_size: 执行计划缓存容量
+            max_concurrency: 单次执行内同时运行的节点数量上限
+            data_sink: 默认的提取数据输出格式
+            data_dir: 文件型输出的目录
+            data_sink_buffer_size: 文件型输出缓冲多少条记录后写出
+            screenshot_policy: 默认截图策略
+            screenshots_dir: 截图目录
+            network_profile: 默认的请求拦截配置
+            har_dir: HAR存档目录
+            close_timeout: 执行结束（或被停止）时写出数据和释放浏览器的超时时间（秒）
+            retry_policies: 按节点类型的重试与超时策略
+            checkpoint_store: 检查点存储；不提供时不记录检查点，也不能恢复执行
+            checkpoints_enabled: 默认是否记录检查点
+        """
+        self.browser_pool = browser_pool
+        self.plan_cache = PlanCache(plan_cache_size)
+        self.max_concurrency = max_concurrency
+        self.data_sink = data_sink
+        self.data_dir = data_dir
+        self.data_sink_buffer_size = data_sink_buffer_size
+        self.screenshot_policy = screenshot_policy or ScreenshotPolicy()
+        self.screenshots_dir = screenshots_dir
+        self.network_profile = network_profile
+        self.har_dir = har_dir
+        self.close_timeout = close_timeout
+        self.retry_policies = retry_policies or RetryPolicies()
+        self.checkpoint_store = checkpoint_store
+        self.checkpoints_enabled = checkpoints_enabled
+        self.metrics = EngineMetrics()  # 本进程所有执行累计的运行指标
     
-    async def execute(self, workflow: WorkflowDefinition) -> ExecutionResult:
+    async def execute(self,
+                      workflow: WorkflowDefinition,
+                      execution_id: str = "",
+                      options: Optional[ExecutionOptions] = None,
+                      on_event: Optional[Callable[[str, Dict[str, Any]], None]] = None) -> ExecutionResult:
         """
         执行工作流
         
         Args:
             workflow: 工作流定义
+            execution_id: 执行ID
+            options: 执行选项
+            on_event: 执行事件的接收方，节点开始和结束时调用 (事件类型, 数据)
             
         Returns:
             ExecutionResult: 执行结果
         """
+        options = options or ExecutionOptions()
         start_time = datetime.now()
+        session: Optional[ExecutionSession] = None
+        recorder: Optional[CheckpointRecorder] = None
         execution_result = ExecutionResult(
-            execution_id="",  # 将在main.py中设置
+            execution_id=execution_id,
             workflow_id=workflow.workflow_id,
             status="running",
             start_time=start_time,
@@ -44,41 +115,94 @@ class WorkflowEngine:
         )
         
         try:
-            # 启动浏览器
-            await self._start_browser()
+            # 获取执行计划（按内容哈希缓存，重复执行不再重新构建）
+            plan = self.plan_cache.get(workflow)
             
-            # 创建执行上下文
-            context = ExecutionContext(self.browser, self.page)
+            if not plan.start_nodes:
+                raise ValueError("未找到开始节点")
             
-            # 构建执行图
-            execution_graph = self._build_execution_graph(workflow)
+            checkpoint: Optional[Checkpoint] = None
+            if options.resume_from:
+                checkpoint = await self._load_checkpoint(plan, options.resume_from)
+                execution_result.resumed_from = options.resume_from
             
-            # 找到开始节点
-            start_nodes = self._find_start_nodes(workflow, execution_graph)
+            har_path = await asyncio.to_thread(self._har_path, workflow, options, execution_id)
+            if checkpoint:
+                # 续写原执行的数据文件，丢弃失败节点写出的部分记录
+                sink = await reopen_sink(checkpoint.sink, self.data_sink_buffer_size)
+            else:
+                sink = self._create_sink(execution_id, options)
             
-            if not start_nodes:
-                raise ValueError("未找到开始节点")
+            # 创建本次执行独占的会话（浏览器上下文、页面和执行上下文）
+            session = await ExecutionSession.open(
+                execution_id,
+                self.browser_pool,
+                sink,
+                self._create_screenshot_recorder(options),
+                options.network_profile or self.network_profile,
+                options.har_mode,
+                har_path,
+                checkpoint.storage_state if checkpoint else None
+            )
+            execution_result.har_file = har_path
+            context = session.context
+            context.on_event = on_event
+            context.retry_policies = self.retry_policies
+            
+            completed: List[str] = []
+            if checkpoint:
+                context.variables.update(checkpoint.variables)
+                completed = checkpoint.completed
+                if checkpoint.url and checkpoint.url != "about:blank":
+                    await context.page.goto(checkpoint.url, wait_until="domcontentloaded")
+                logger.info(f"从检查点恢复执行: {options.resume_from}, 已完成 {len(completed)} 个节点")
+            
+            checkpoints = options.checkpoint if options.checkpoint is not None else self.checkpoints_enabled
+            if checkpoints and self.checkpoint_store:
+                recorder = CheckpointRecorder(
+                    self.checkpoint_store, execution_id, workflow, options, context, completed
+                )
             
             # 执行工作流
-            await self._execute_nodes(
-                workflow, 
-                execution_graph, 
-                start_nodes, 
-                context, 
-                execution_result
-            )
+            await self._execute_nodes(plan, context, execution_result, options, recorder, completed)
             
-            execution_result.status = "completed"
-            logger.info(f"工作流执行完成: {workflow.workflow_id}")
+            # 节点失败不抛出异常：有失败的步骤时执行失败，保留检查点以便从失败的节点恢复
+            failed = next((step for step in execution_result.steps if step.status == "failed"), None)
+            if failed:
+                execution_result.status = "failed"
+                execution_result.error = f"节点执行失败: {failed.node_id}, 错误: {failed.error}"
+                logger.error(f"工作流执行失败: {workflow.workflow_id}, 节点: {failed.node_id}")
+            else:
+                execution_result.status = "completed"
+                await self._discard_checkpoints(execution_id, options, recorder)
+                logger.info(f"工作流执行完成: {workflow.workflow_id}")
             
+        except asyncio.CancelledError:
+            # 执行被停止：取消已传递到正在运行的节点（Playwright调用和等待），
+            # 这里只记录状态，浏览器资源在下面限时释放
+            logger.info(f"工作流执行已停止: {workflow.workflow_id}")
+            execution_result.status = "stopped"
+            execution_result.error = "执行已被停止"
+        
         except Exception as e:
             logger.error(f"工作流执行失败: {workflow.workflow_id}, 错误: {str(e)}")
             execution_result.status = "failed"
             execution_result.error = str(e)
         
         finally:
-            # 关闭浏览器
-            await self._stop_browser()
+            if recorder:
+                try:
+                    await asyncio.wait_for(recorder.flush(), self.close_timeout)
+                except asyncio.TimeoutError:
+                    logger.warning(f"保存检查点超时: {execution_id}")
+            
+            # 归还浏览器资源
+            if session:
+                await session.close(self.close_timeout)
+                sink = session.context.sink
+                execution_result.extracted_count = sink.count
+                execution_result.data_file = sink.path
+                execution_result.network_stats = session.context.network.stats.to_dict()
             
             execution_result.end_time = datetime.now()
             if execution_result.start_time and execution_result.end_time:
@@ -88,218 +212,281 @@ class WorkflowEngine:
         
         return execution_result
     
-    async def _start_browser(self):
-        """启动浏览器"""
-        self.playwright = await async_playwright().start()
-        
-        # 启动浏览器（可配置为headless或有界面模式）
-        self.browser = await self.playwright.chromium.launch(
-            headless=False,  # 设为False可以看到浏览器界面，调试时很有用
-            args=[
-                '--no-sandbox',
-                '--disable-dev-shm-usage',
-                '--disable-blink-features=AutomationControlled',
-                '--disable-web-security'
-            ]
-        )
-        
-        # 创建新页面
-        self.page = await self.browser.new_page()
-        
-        # 设置用户代理，避免被检测为bot
-        await self.page.set_extra_http_headers({
-            'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8'
-        })
-        
-        # 设置视口大小
-        await self.page.set_viewport_size({"width": 1920, "height": 1080})
-        
-        logger.info("浏览器启动成功")
-    
-    async def _stop_browser(self):
-        """关闭浏览器"""
-        if self.page:
-            await self.page.close()
-            self.page = None
-        
-        if self.browser:
-            await self.browser.close()
-            self.browser = None
-        
-        if self.playwright:
-            await self.playwright.stop()
-            self.playwright = None
-        
-        logger.info("浏览器已关闭")
-    
-    def _build_execution_graph(self, workflow: WorkflowDefinition) -> Dict[str, List[str]]:
+    async def execute_batch(self,
+                            workflow: WorkflowDefinition,
+                            batch: BatchInput,
+                            execution_id: str = "",
+                            options: Optional[ExecutionOptions] = None,
+                            on_event: Optional[Callable[[str, Dict[str, Any]], None]] = None) -> ExecutionResult:
         """
-        构建执行图 - 节点ID到其后继节点ID列表的映射
+        批量执行 - 同一工作流按输入表的每一行执行一次，页面在行之间复用
         
         Args:
             workflow: 工作流定义
+            batch: 输入表和并发设置
+            execution_id: 执行ID
+            options: 执行选项（不支持检查点和HAR）
+            on_event: 执行事件的接收方，每行结束时调用
             
         Returns:
-            Dict[str, List[str]]: 执行图
+            ExecutionResult: 执行结果，rows 中是每一行的状态摘要
         """
-        graph = {}
-        
-        # 初始化所有节点
-        for node in workflow.nodes:
-            graph[node.id] = []
-        
-        # 根据边构建图
-        for edge in workflow.edges:
-            if edge.source in graph:
-                graph[edge.source].append(edge.target)
-        
-        return graph
+        return await BatchRunner(self, workflow, batch, execution_id, options, on_event).run()
+    
+    async def _load_checkpoint(self, plan: CompiledWorkflow, execution_id: str) -> Checkpoint:
+        """读取要恢复的执行的检查点，并确认其中的节点都在当前工作流中"""
+        checkpoint = await self.checkpoint_store.load(execution_id) if self.checkpoint_store else None
+        if checkpoint is None:
+            raise ValueError(f"执行 {execution_id} 没有可恢复的检查点")
+        unknown = [node_id for node_id in checkpoint.completed if node_id not in plan.instances]
+        if unknown:
+            raise ValueError(f"检查点中的节点在工作流中不存在: {unknown}")
+        return checkpoint
     
-    def _find_start_nodes(self, workflow: WorkflowDefinition, graph: Dict[str, List[str]]) -> List[str]:
+    async def _discard_checkpoints(self,
+                                   execution_id: str,
+                                   options: ExecutionOptions,
+                                   recorder: Optional[CheckpointRecorder]):
+        """执行完成后删除本次和被恢复执行的检查点"""
+        if self.checkpoint_store is None:
+            return
+        if recorder:
+            await recorder.flush()
+        await self.checkpoint_store.delete(execution_id)
+        if options.resume_from:
+            await self.checkpoint_store.delete(options.resume_from)
+    
+    def _har_path(self,
+                  workflow: WorkflowDefinition,
+                  options: ExecutionOptions,
+                  execution_id: str) -> Optional[str]:
         """
-        找到开始节点（没有入边的节点或类型为start的节点）
-        
-        Args:
-            workflow: 工作流定义
-            graph: 执行图
-            
-        Returns:
-            List[str]: 开始节点ID列表
+        HAR存档路径
+
+        指定 har_name 时录制和回放都使用该名称。未指定时录制按工作流ID和执行ID命名
+        （同一工作流的并发录制互不覆盖），回放使用该工作流最近一次录制的存档
         """
-        # 找到所有有入边的节点
-        nodes_with_incoming = set()
-        for edge in workflow.edges:
-            nodes_with_incoming.add(edge.target)
-        
-        # 开始节点：没有入边的节点或者类型为start的节点
-        start_nodes = []
-        for node in workflow.nodes:
-            if (node.id not in nodes_with_incoming or 
-                node.data.nodeType.value == "start"):
-                start_nodes.append(node.id)
-        
-        return start_nodes
+        if options.har_mode == "off":
+            return None
+        if options.har_name:
+            name = re.sub(r"[^\w.-]", "_", options.har_name)
+            return os.path.join(self.har_dir, f"{name}.har.zip")
+
+        workflow_name = re.sub(r"[^\w.-]", "_", workflow.workflow_id)
+        if options.har_mode == "record":
+            suffix = re.sub(r"[^\w.-]", "_", execution_id or uuid.uuid4().hex[:8])
+            return os.path.join(self.har_dir, f"{workflow_name}_{suffix}.har.zip")
+
+        pattern = re.compile(rf"{re.escape(workflow_name)}(_[\w.-]+)?\.har\.zip")
+        try:
+            archives = [
+                entry for entry in os.scandir(self.har_dir)
+                if entry.is_file() and pattern.fullmatch(entry.name)
+            ]
+        except FileNotFoundError:
+            archives = []
+        if not archives:
+            raise ValueError(f"工作流 {workflow.workflow_id} 没有录制过的HAR存档")
+        return max(archives, key=lambda entry: entry.stat().st_mtime).path
+    
+    def _create_sink(self, execution_id: str, options: ExecutionOptions) -> DataSink:
+        """创建本次执行的提取数据输出"""
+        name = execution_id or f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
+        return create_sink(
+            options.data_sink or self.data_sink,
+            self.data_dir,
+            name,
+            self.data_sink_buffer_size
+        )
+    
+    def _create_screenshot_recorder(self, options: ExecutionOptions) -> ScreenshotRecorder:
+        """创建本次执行的截图记录器"""
+        policy = self.screenshot_policy
+        if options.screenshot_mode and options.screenshot_mode != policy.mode:
+            policy = policy.with_mode(options.screenshot_mode)
+        return ScreenshotRecorder(policy, self.screenshots_dir, self.metrics.screenshot_written)
     
     async def _execute_nodes(self, 
-                           workflow: WorkflowDefinition,
-                           graph: Dict[str, List[str]], 
-                           current_nodes: List[str],
+                           plan: CompiledWorkflow,
                            context: ExecutionContext,
-                           execution_result: ExecutionResult):
+                           execution_result: ExecutionResult,
+                           options: ExecutionOptions,
+                           recorder: Optional[CheckpointRecorder] = None,
+                           completed: Optional[List[str]] = None):
         """
-        递归执行节点
+        按依赖关系调度执行所有节点
         
         Args:
-            workflow: 工作流定义
-            graph: 执行图
-            current_nodes: 当前要执行的节点ID列表
+            plan: 执行计划
             context: 执行上下文
-            execution_result: 执行结果对象
+            execution_result: 执行结果对象，节点结束时实时追加步骤结果
+            options: 执行选项
+            recorder: 检查点记录，节点成功且没有其他节点在运行时记录一次
+            completed: 从检查点恢复时已完成的节点
         """
-        if not current_nodes:
-            return
-        
-        # 并行执行当前层的所有节点
-        tasks = []
-        for node_id in current_nodes:
-            task = self._execute_single_node(workflow, node_id, context)
-            tasks.append(task)
-        
-        # 等待所有节点执行完成
-        step_results = await asyncio.gather(*tasks, return_exceptions=True)
-        
-        # 处理执行结果
-        next_nodes = set()
-        for i, result in enumerate(step_results):
-            node_id = current_nodes[i]
-            
-            if isinstance(result, Exception):
-                # 节点执行出错
-                error_result = StepResult(
-                    node_id=node_id,
-                    node_type=self._get_node_type(workflow, node_id),
-                    status="failed",
-                    start_time=datetime.now(),
-                    end_time=datetime.now(),
-                    error=str(result)
-                )
-                execution_result.steps.append(error_result)
-                logger.error(f"节点执行异常: {node_id}, 错误: {result}")
-                
-                # 出错时不继续执行后续节点
-                continue
-            else:
-                # 节点执行成功
-                execution_result.steps.append(result)
-                
-                if result.status == "success":
-                    # 添加后续节点到执行队列
-                    next_nodes.update(graph.get(node_id, []))
-        
-        # 递归执行下一层节点
-        if next_nodes:
-            await self._execute_nodes(
-                workflow, 
-                graph, 
-                list(next_nodes), 
-                context, 
-                execution_result
-            )
+        branches = BranchManager(plan, context) if options.parallel_branches else None
+        
+        def on_step(step: StepResult):
+            execution_result.steps.append(step)
+            self.metrics.record_step(step)
+            if recorder:
+                recorder.node_finished(step.node_id, step.status)
+            self._emit_step_finished(context, step)
+        
+        def on_start(node_id: str):
+            if recorder:
+                recorder.node_started(node_id)
+            self._emit_step_started(plan, context, node_id)
+        
+        scheduler = DagScheduler(
+            successors=plan.successors,
+            in_degree=plan.in_degree,
+            run_node=lambda node_id: self._execute_single_node(
+                plan, node_id, context, execution_result, branches
+            ),
+            node_type=plan.node_type,
+            max_concurrency=self.max_concurrency,
+            on_step=on_step,
+            on_start=on_start
+        )
+        await scheduler.run(plan.start_nodes, completed or ())
+    
+    def _emit_step_started(self, plan: CompiledWorkflow, context: ExecutionContext, node_id: str):
+        if context.on_event:
+            node_type = plan.node_type(node_id)
+            context.emit("step_started", {
+                "node_id": node_id,
+                "node_type": node_type.value if node_type else None,
+                "loop_index": context.get_variable("loop_index")
+            })
+    
+    def _emit_step_finished(self, context: ExecutionContext, step: StepResult, loop_id: Optional[str] = None):
+        if context.on_event:
+            data = step.model_dump(mode="json")
+            data["loop_id"] = loop_id  # 循环体内的步骤，成功时不计入执行结果
+            context.emit("step_finished", data)
     
     async def _execute_single_node(self, 
-                                 workflow: WorkflowDefinition, 
+                                 plan: CompiledWorkflow, 
                                  node_id: str,
-                                 context: ExecutionContext) -> StepResult:
+                                 context: ExecutionContext,
+                                 execution_result: ExecutionResult,
+                                 branches: Optional[BranchManager] = None) -> StepResult:
         """
         执行单个节点
         
         Args:
-            workflow: 工作流定义
+            plan: 执行计划
             node_id: 节点ID
             context: 执行上下文
+            execution_result: 执行结果对象
+            branches: 分支模式下的页面管理器
             
         Returns:
             StepResult: 节点执行结果
         """
-        # 找到节点定义
-        node_def = None
-        for node in workflow.nodes:
-            if node.id == node_id:
-                node_def = node
-                break
-        
-        if not node_def:
-            raise ValueError(f"未找到节点定义: {node_id}")
-        
-        # 获取节点类型
-        node_type = node_def.data.nodeType.value
+        node_instance = plan.instances[node_id]
         
         # 跳过注释节点
-        if node_type == "comment":
+        if node_instance is None:
             return StepResult(
                 node_id=node_id,
-                node_type=node_def.data.nodeType,
+                node_type=plan.node_type(node_id),
                 status="skipped",
                 start_time=datetime.now(),
                 end_time=datetime.now(),
                 result_data={"message": "注释节点已跳过"}
             )
         
-        # 获取节点类
-        if node_type not in node_registry:
-            raise ValueError(f"不支持的节点类型: {node_type}")
-        
-        node_class = node_registry[node_type]
-        
-        # 创建节点实例
-        node_instance = node_class(node_id, node_def.data.params)
+        if branches is None:
+            return await self._run_node(plan, node_instance, context, execution_result)
         
-        # 执行节点
+        # 分支模式：在分支自己的页面上执行
+        branch_context = await branches.context_for(node_id)
+        status = "failed"
+        try:
+            result = await self._run_node(plan, node_instance, branch_context, execution_result)
+            result.page_id = branches.page_id(node_id)
+            status = result.status
+            return result
+        finally:
+            await branches.finish(node_id, status)
+
+    
+    async def _run_node(self,
+                        plan: CompiledWorkflow,
+                        node_instance: BaseNode,
+                        context: ExecutionContext,
+                        execution_result: ExecutionResult) -> StepResult:
+        """执行预先实例化的节点，带循环体的循环节点交给循环执行"""
+        if node_instance.node_id in plan.loop_bodies:
+            return await self._execute_loop(plan, node_instance, context, execution_result)
         return await node_instance.safe_execute(context)
     
-    def _get_node_type(self, workflow: WorkflowDefinition, node_id: str):
-        """获取节点类型"""
-        for node in workflow.nodes:
-            if node.id == node_id:
-                return node.data.nodeType
-        return None
+    async def _execute_loop(self,
+                            plan: CompiledWorkflow,
+                            loop_node: LoopNode,
+                            context: ExecutionContext,
+                            execution_result: ExecutionResult) -> StepResult:
+        """
+        执行循环 - 循环节点初始化后，按迭代重复调度循环体子图
+        
+        节点实例和子图在编译时已经准备好，每轮迭代只重置调度状态；
+        循环体的成功步骤只计数不保留，内存占用与迭代次数无关
+        
+        Args:
+            plan: 执行计划
+            loop_node: 循环节点
+            context: 执行上下文
+            execution_result: 执行结果对象（只追加循环体中失败的步骤）
+            
+        Returns:
+            StepResult: 循环节点的执行结果，包含迭代次数和循环体步骤统计
+        """
+        result = await loop_node.safe_execute(context)
+        if result.status != "success":
+            return result
+        
+        body_steps: Dict[str, Dict[str, int]] = {}
+        failed_steps: List[StepResult] = []
+        
+        def on_step(step: StepResult):
+            counts = body_steps.setdefault(step.node_id, {"success": 0, "failed": 0, "skipped": 0})
+            counts[step.status] = counts.get(step.status, 0) + 1
+            self.metrics.record_step(step)
+            if step.status == "failed":
+                failed_steps.append(step)
+                execution_result.steps.append(step)
+            self._emit_step_finished(context, step, loop_node.node_id)
+        
+        scheduler = DagScheduler(
+            successors=plan.successors,
+            in_degree=plan.in_degree,
+            run_node=lambda node_id: self._execute_single_node(
+                plan, node_id, context, execution_result
+            ),
+            node_type=plan.node_type,
+            max_concurrency=self.max_concurrency,
+            on_step=on_step,
+            on_start=lambda node_id: self._emit_step_started(plan, context, node_id)
+        )
+        body_roots = plan.loop_bodies[loop_node.node_id]
+        
+        iterations = 0
+        while not failed_steps and await loop_node.should_continue(context, iterations):
+            loop_node.begin_iteration(context, iterations)
+            await scheduler.run(body_roots)
+            iterations += 1
+        
+        result.end_time = datetime.now()
+        result.result_data.update({
+            "current_iteration": iterations,
+            "iterations": iterations,
+            "body_steps": body_steps
+        })
+        if failed_steps:
+            result.status = "failed"
+            result.error = f"循环体节点执行失败: {failed_steps[0].node_id}, 错误: {failed_steps[0].error}"
+        
+        logger.info(f"循环执行结束: {loop_node.node_id}, 共 {iterations} 轮")
+        return result
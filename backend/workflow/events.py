@@ -0,0 +1,115 @@
+"""
+执行事件
+每次执行一个事件通道：执行引擎在节点开始和结束时发布事件，客户端通过SSE订阅。
+通道保留最近的事件（环形缓冲区），断线重连时按 Last-Event-ID 从断点继续；
+执行结束后通道再保留一段时间，供晚到的客户端回放
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Deque, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# 执行结束的事件类型，发布后通道关闭
+FINISHED_EVENT = "finished"
+
+
+class ExecutionEvent:
+    """执行事件"""
+
+    def __init__(self, event_id: int, event_type: str, data: Dict[str, Any]):
+        self.id = event_id
+        self.type = event_type
+        self.data = data
+        self.timestamp = time.time()
+
+
+class EventChannel:
+    """单次执行的事件通道"""
+
+    def __init__(self, buffer_size: int = 1000):
+        self.events: Deque[ExecutionEvent] = deque(maxlen=buffer_size)
+        self.closed = False
+        self._next_id = 1
+        self._changed: asyncio.Future = asyncio.get_running_loop().create_future()
+
+    def publish(self, event_type: str, data: Dict[str, Any]) -> ExecutionEvent:
+        event = ExecutionEvent(self._next_id, event_type, data)
+        self._next_id += 1
+        self.events.append(event)
+        if event_type == FINISHED_EVENT:
+            self.closed = True
+        self._notify()
+        return event
+
+    async def subscribe(self,
+                        last_event_id: int = 0,
+                        heartbeat: Optional[float] = None) -> AsyncIterator[Optional[ExecutionEvent]]:
+        """
+        订阅事件 - 先回放 last_event_id 之后仍在缓冲区中的事件，再等待新事件
+
+        Args:
+            last_event_id: 客户端已收到的最后一个事件ID
+            heartbeat: 没有新事件时每隔多少秒产出一次None（用于发送心跳），为空时不产出
+
+        Yields:
+            Optional[ExecutionEvent]: 事件，心跳时为None
+        """
+        while True:
+            changed = self._changed
+            for event in list(self.events):
+                if event.id > last_event_id:
+                    last_event_id = event.id
+                    yield event
+            if self.closed:
+                return
+            try:
+                await asyncio.wait_for(asyncio.shield(changed), heartbeat)
+            except asyncio.TimeoutError:
+                yield None
+
+    def _notify(self):
+        changed, self._changed = self._changed, asyncio.get_running_loop().create_future()
+        changed.set_result(None)
+
+
+class EventBus:
+    """所有执行的事件通道（在API进程的事件循环中使用）"""
+
+    def __init__(self, buffer_size: int = 1000, retention: float = 300.0):
+        """
+        Args:
+            buffer_size: 每个通道保留的事件数量
+            retention: 执行结束后通道保留多久（秒）
+        """
+        self.buffer_size = buffer_size
+        self.retention = retention
+        self._channels: Dict[str, EventChannel] = {}
+
+    def open(self, execution_id: str) -> EventChannel:
+        channel = self._channels.get(execution_id)
+        if channel is None:
+            channel = EventChannel(self.buffer_size)
+            self._channels[execution_id] = channel
+        return channel
+
+    def get(self, execution_id: str) -> Optional[EventChannel]:
+        return self._channels.get(execution_id)
+
+    def publish(self, execution_id: str, event_type: str, data: Dict[str, Any]):
+        """发布事件；执行结束的事件发布后，通道在保留期结束时删除"""
+        channel = self.open(execution_id)
+        if channel.closed:
+            return
+        channel.publish(event_type, data)
+        if channel.closed:
+            asyncio.get_running_loop().call_later(self.retention, self._channels.pop, execution_id, None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "channels": len(self._channels),
+            "open": sum(1 for channel in self._channels.values() if not channel.closed)
+        }
@@ -0,0 +1,92 @@
+"""
+浏览器启动配置
+按名称选择一组启动参数和浏览器上下文默认值：
+
+- headless：无界面运行（服务器默认，不需要Xvfb，也不为没人看的页面做合成显示）
+- headed-debug：有界面运行，用于本地调试时观察浏览器操作
+- low-memory：无界面运行，关闭GPU和多线程光栅化、后台网络和扩展，较小的视口，适合内存紧张的机器
+"""
+
+from typing import Any, Dict, List, Optional
+
+# 所有配置共用的启动参数
+COMMON_ARGS = [
+    '--no-sandbox',
+    '--disable-dev-shm-usage',
+    '--disable-blink-features=AutomationControlled',
+    '--disable-web-security'
+]
+
+DEFAULT_HEADERS = {
+    'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8'
+}
+
+
+class LaunchProfile:
+    """浏览器启动配置（只读）"""
+
+    def __init__(self,
+                 name: str,
+                 headless: bool = True,
+                 args: Optional[List[str]] = None,
+                 viewport: Optional[Dict[str, int]] = None,
+                 extra_http_headers: Optional[Dict[str, str]] = None,
+                 device_scale_factor: float = 1,
+                 slow_mo: float = 0):
+        """
+        Args:
+            name: 配置名称
+            headless: 是否无界面运行
+            args: 额外的Chromium启动参数（在公共参数之后）
+            viewport: 浏览器上下文的视口大小
+            extra_http_headers: 浏览器上下文默认附加的请求头
+            device_scale_factor: 设备像素比
+            slow_mo: 每个浏览器操作之后的延迟（毫秒），调试时便于观察
+        """
+        self.name = name
+        self.headless = headless
+        self.args = COMMON_ARGS + (args or [])
+        self.viewport = viewport or {"width": 1920, "height": 1080}
+        self.extra_http_headers = extra_http_headers or DEFAULT_HEADERS
+        self.device_scale_factor = device_scale_factor
+        self.slow_mo = slow_mo
+
+    def launch_options(self) -> Dict[str, Any]:
+        """chromium.launch 的参数"""
+        return {"headless": self.headless, "args": self.args, "slow_mo": self.slow_mo}
+
+    def context_options(self) -> Dict[str, Any]:
+        """browser.new_context 的参数"""
+        return {
+            "viewport": self.viewport,
+            "extra_http_headers": self.extra_http_headers,
+            "device_scale_factor": self.device_scale_factor
+        }
+
+
+LAUNCH_PROFILES: Dict[str, LaunchProfile] = {
+    "headless": LaunchProfile("headless"),
+    "headed-debug": LaunchProfile("headed-debug", headless=False, slow_mo=50),
+    "low-memory": LaunchProfile(
+        "low-memory",
+        args=[
+            '--disable-gpu',
+            '--disable-software-rasterizer',
+            '--disable-accelerated-2d-canvas',
+            '--num-raster-threads=1',
+            '--disable-extensions',
+            '--disable-background-networking',
+            '--disable-component-update',
+            '--mute-audio',
+            '--renderer-process-limit=4'
+        ],
+        viewport={"width": 1280, "height": 720}
+    ),
+}
+
+
+def get_launch_profile(name: str) -> LaunchProfile:
+    """按名称获取启动配置"""
+    if name not in LAUNCH_PROFILES:
+        raise ValueError(f"不支持的浏览器启动配置: {name}，可选: {list(LAUNCH_PROFILES)}")
+    return LAUNCH_PROFILES[name]
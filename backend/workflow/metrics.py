@@ -0,0 +1,231 @@
+"""
+运行指标
+每个进程的执行引擎记录节点耗时（按节点类型和结果）、重试次数和截图写入量，步骤结束时
+只做一次字典查找和一次二分查找；API进程在抓取时汇总各工作进程的快照、浏览器池状态、
+准入控制状态和执行计数，以Prometheus文本格式输出（/metrics）
+"""
+
+from bisect import bisect_left
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from models.workflow import StepResult
+
+# 节点耗时直方图的分桶上限（秒）
+NODE_LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4"  # PlainTextResponse 会加上 charset
+
+
+class Histogram:
+    """直方图：各分桶的计数（最后一个是超出所有上限的部分）和总和"""
+
+    __slots__ = ("counts", "sum")
+
+    def __init__(self, size: int):
+        self.counts = [0] * (size + 1)
+        self.sum = 0.0
+
+    def observe(self, buckets: Tuple[float, ...], value: float):
+        self.counts[bisect_left(buckets, value)] += 1
+        self.sum += value
+
+
+class EngineMetrics:
+    """单个进程内执行引擎的指标（只在事件循环线程中更新）"""
+
+    def __init__(self, buckets: Tuple[float, ...] = NODE_LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.node_latency: Dict[Tuple[str, str], Histogram] = {}
+        self.node_retries: Dict[str, int] = {}
+        self.screenshot_bytes = 0
+        self.screenshot_files = 0
+
+    def record_step(self, step: StepResult):
+        """记录一个结束的步骤：耗时按 (节点类型, 结果) 计入直方图，重试次数按节点类型累加"""
+        node_type = step.node_type.value if step.node_type else "unknown"
+        key = (node_type, step.status)
+        histogram = self.node_latency.get(key)
+        if histogram is None:
+            histogram = self.node_latency[key] = Histogram(len(self.buckets))
+        duration = (step.end_time - step.start_time).total_seconds() if step.end_time else 0.0
+        histogram.observe(self.buckets, duration)
+        if step.attempts > 1:
+            self.node_retries[node_type] = self.node_retries.get(node_type, 0) + step.attempts - 1
+
+    def screenshot_written(self, size: int):
+        """截图文件写入完成"""
+        self.screenshot_bytes += size
+        self.screenshot_files += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        """可序列化的快照（工作进程通过队列传回API进程）"""
+        return {
+            "buckets": list(self.buckets),
+            "node_latency": [
+                {"node_type": node_type, "outcome": outcome, "counts": list(h.counts), "sum": h.sum}
+                for (node_type, outcome), h in self.node_latency.items()
+            ],
+            "node_retries": dict(self.node_retries),
+            "screenshot_bytes": self.screenshot_bytes,
+            "screenshot_files": self.screenshot_files,
+        }
+
+
+def collect_metrics(engine, browser_pool) -> Dict[str, Any]:
+    """一个进程的指标快照：执行引擎的累计指标加上浏览器池的当前状态"""
+    snapshot = engine.metrics.snapshot()
+    pool = browser_pool.stats()
+    snapshot.update({
+        "browsers": pool["browsers"],
+        "browser_contexts": pool["active_contexts"],
+        "pages": pool["pages"],
+    })
+    return snapshot
+
+
+def merge_snapshots(snapshots: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """汇总多个进程的快照（各进程使用相同的分桶）"""
+    merged: Dict[str, Any] = {
+        "buckets": list(NODE_LATENCY_BUCKETS),
+        "node_latency": [],
+        "node_retries": {},
+        "screenshot_bytes": 0,
+        "screenshot_files": 0,
+        "browsers": 0,
+        "browser_contexts": 0,
+        "pages": 0,
+    }
+    latency: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    for snapshot in snapshots:
+        merged["buckets"] = snapshot["buckets"]
+        for item in snapshot["node_latency"]:
+            key = (item["node_type"], item["outcome"])
+            if key not in latency:
+                latency[key] = {**item, "counts": list(item["counts"])}
+                continue
+            total = latency[key]
+            total["counts"] = [a + b for a, b in zip(total["counts"], item["counts"])]
+            total["sum"] += item["sum"]
+        for node_type, retries in snapshot["node_retries"].items():
+            merged["node_retries"][node_type] = merged["node_retries"].get(node_type, 0) + retries
+        for name in ("screenshot_bytes", "screenshot_files", "browsers", "browser_contexts", "pages"):
+            merged[name] += snapshot.get(name, 0)
+    merged["node_latency"] = list(latency.values())
+    return merged
+
+
+class _Exposition:
+    """Prometheus文本格式的输出"""
+
+    def __init__(self):
+        self.lines: List[str] = []
+
+    def metric(self, name: str, kind: str, help_text: str):
+        self.lines.append(f"# HELP {name} {help_text}")
+        self.lines.append(f"# TYPE {name} {kind}")
+
+    def sample(self, name: str, value: float, labels: Optional[Dict[str, Any]] = None):
+        if labels:
+            label_text = ",".join(f'{key}="{_escape(str(val))}"' for key, val in labels.items())
+            name = f"{name}{{{label_text}}}"
+        self.lines.append(f"{name} {_format_value(value)}")
+
+    def histogram(self,
+                  name: str,
+                  buckets: Iterable[float],
+                  cumulative: Iterable[int],
+                  count: int,
+                  total: float,
+                  labels: Optional[Dict[str, Any]] = None):
+        labels = labels or {}
+        for bound, value in zip(buckets, cumulative):
+            self.sample(f"{name}_bucket", value, {**labels, "le": _format_value(bound)})
+        self.sample(f"{name}_bucket", count, {**labels, "le": "+Inf"})
+        self.sample(f"{name}_sum", total, labels)
+        self.sample(f"{name}_count", count, labels)
+
+    def render(self) -> str:
+        return "\n".join(self.lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def _cumulative(counts: Iterable[int]) -> List[int]:
+    total, values = 0, []
+    for count in counts:
+        total += count
+        values.append(total)
+    return values
+
+
+def render_metrics(engine: Dict[str, Any],
+                   executions: Dict[str, int],
+                   admission: Dict[str, Any]) -> str:
+    """
+    输出Prometheus文本格式的指标
+
+    Args:
+        engine: 汇总后的执行引擎快照（merge_snapshots 或 collect_metrics 的结果）
+        executions: 按状态统计的已结束执行数量
+        admission: 准入控制状态（AdmissionController.stats）
+
+    Returns:
+        str: 文本格式的指标
+    """
+    out = _Exposition()
+
+    out.metric("lingda_node_duration_seconds", "histogram", "节点执行耗时（含重试），按节点类型和结果")
+    buckets = engine["buckets"]
+    for item in sorted(engine["node_latency"], key=lambda i: (i["node_type"], i["outcome"])):
+        cumulative = _cumulative(item["counts"])
+        out.histogram(
+            "lingda_node_duration_seconds", buckets, cumulative[:-1], cumulative[-1], item["sum"],
+            {"node_type": item["node_type"], "outcome": item["outcome"]}
+        )
+
+    out.metric("lingda_node_retries_total", "counter", "节点重试次数（不含第一次执行），按节点类型")
+    for node_type, retries in sorted(engine["node_retries"].items()):
+        out.sample("lingda_node_retries_total", retries, {"node_type": node_type})
+
+    out.metric("lingda_executions_total", "counter", "已结束的执行数量，按状态")
+    for status, count in sorted(executions.items()):
+        out.sample("lingda_executions_total", count, {"status": status})
+
+    out.metric("lingda_executions_rejected_total", "counter", "队列已满被拒绝的执行数量")
+    out.sample("lingda_executions_rejected_total", admission["rejected"])
+
+    out.metric("lingda_executions_running", "gauge", "正在运行的执行数量")
+    out.sample("lingda_executions_running", admission["running"])
+
+    out.metric("lingda_executions_queued", "gauge", "排队中的执行数量")
+    out.sample("lingda_executions_queued", admission["queued"])
+
+    queue_wait = admission["queue_wait"]
+    out.metric("lingda_queue_wait_seconds", "histogram", "执行在队列中的等待时间")
+    out.histogram(
+        "lingda_queue_wait_seconds", queue_wait["buckets"].keys(), queue_wait["buckets"].values(),
+        queue_wait["count"], queue_wait["sum"]
+    )
+
+    out.metric("lingda_browsers", "gauge", "浏览器池中的浏览器数量（所有进程）")
+    out.sample("lingda_browsers", engine["browsers"])
+
+    out.metric("lingda_browser_contexts", "gauge", "借出中的浏览器上下文数量（所有进程）")
+    out.sample("lingda_browser_contexts", engine["browser_contexts"])
+
+    out.metric("lingda_pages", "gauge", "打开的页面数量（所有进程）")
+    out.sample("lingda_pages", engine["pages"])
+
+    out.metric("lingda_screenshot_bytes_total", "counter", "写入的截图字节数")
+    out.sample("lingda_screenshot_bytes_total", engine["screenshot_bytes"])
+
+    out.metric("lingda_screenshot_files_total", "counter", "写入的截图文件数量")
+    out.sample("lingda_screenshot_files_total", engine["screenshot_files"])
+
+    return out.render()
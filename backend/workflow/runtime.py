@@ -0,0 +1,53 @@
+"""
+运行时组装
+按服务配置创建浏览器池和执行引擎。API进程（进程内执行时）和每个工作进程
+都通过这里创建自己的实例，保证两种部署方式的行为一致
+"""
+
+from config import settings
+from nodes.retry import RetryPolicies
+from nodes.screenshots import ScreenshotPolicy
+from storage.checkpoints import CheckpointStore
+from workflow.browser_pool import BrowserPool
+from workflow.engine import WorkflowEngine
+from workflow.launch_profiles import get_launch_profile
+
+
+def create_browser_pool() -> BrowserPool:
+    """按配置创建浏览器池（未启动）"""
+    return BrowserPool(
+        min_size=settings.browser_pool_min_size,
+        max_size=settings.browser_pool_max_size,
+        max_contexts_per_browser=settings.browser_pool_max_contexts,
+        idle_timeout=settings.browser_pool_idle_timeout,
+        health_check_interval=settings.browser_pool_health_interval,
+        max_leases_per_browser=settings.browser_pool_max_leases,
+        launch_profile=get_launch_profile(settings.browser_profile)
+    )
+
+
+def create_workflow_engine(browser_pool: BrowserPool) -> WorkflowEngine:
+    """按配置创建执行引擎（无状态，可被并发的执行共享）"""
+    return WorkflowEngine(
+        browser_pool,
+        plan_cache_size=settings.plan_cache_size,
+        max_concurrency=settings.max_node_concurrency,
+        data_sink=settings.data_sink,
+        data_dir=settings.data_dir,
+        data_sink_buffer_size=settings.data_sink_buffer_size,
+        screenshot_policy=ScreenshotPolicy(
+            mode=settings.screenshot_mode,
+            every_n=settings.screenshot_every_n,
+            node_types=settings.screenshot_node_types,
+            full_page=settings.screenshot_full_page,
+            image_format=settings.screenshot_format,
+            quality=settings.screenshot_quality
+        ),
+        screenshots_dir=settings.screenshots_dir,
+        network_profile=settings.network_profile,
+        har_dir=settings.har_dir,
+        close_timeout=settings.session_close_timeout,
+        retry_policies=RetryPolicies(settings.retry_policies),
+        checkpoint_store=CheckpointStore(settings.checkpoint_dir),
+        checkpoints_enabled=settings.checkpoints_enabled
+    )
@@ -0,0 +1,150 @@
+"""
+DAG调度器
+基于入度的就绪队列调度：节点的所有前驱都执行成功后立即启动，
+不再按"层"等待最慢的兄弟节点，也不会因为多条路径重复执行同一个节点
+"""
+
+import asyncio
+import logging
+from collections import deque
+from datetime import datetime
+from typing import Awaitable, Callable, Deque, Dict, Iterable, List, Optional
+
+from models.workflow import NodeType, StepResult
+
+logger = logging.getLogger(__name__)
+
+NodeRunner = Callable[[str], Awaitable[StepResult]]
+StepCallback = Callable[[StepResult], None]
+StartCallback = Callable[[str], None]
+
+
+class DagScheduler:
+    """迭代式DAG调度器"""
+
+    def __init__(self,
+                 successors: Dict[str, List[str]],
+                 in_degree: Dict[str, int],
+                 run_node: NodeRunner,
+                 node_type: Callable[[str], Optional[NodeType]],
+                 max_concurrency: int = 8,
+                 on_step: Optional[StepCallback] = None,
+                 on_start: Optional[StartCallback] = None):
+        """
+        Args:
+            successors: 节点ID -> 后继节点ID列表
+            in_degree: 节点ID -> 入度
+            run_node: 执行单个节点的协程函数
+            node_type: 查询节点类型（用于记录异常节点的结果）
+            max_concurrency: 同时运行的节点数量上限
+            on_step: 每个节点结束时的回调
+            on_start: 每个节点开始执行时的回调
+        """
+        if max_concurrency < 1:
+            raise ValueError(f"并发上限必须大于0: {max_concurrency}")
+
+        self.successors = successors
+        self.in_degree = in_degree
+        self.run_node = run_node
+        self.node_type = node_type
+        self.max_concurrency = max_concurrency
+        self.on_step = on_step
+        self.on_start = on_start
+
+        # 每个节点进入就绪队列和实际开始执行的时间，用于分析关键路径
+        self.ready_times: Dict[str, datetime] = {}
+        self.start_times: Dict[str, datetime] = {}
+
+    async def run(self, roots: Iterable[str], completed: Iterable[str] = ()) -> List[StepResult]:
+        """
+        从给定的开始节点执行到图中所有可达节点结束
+
+        Args:
+            roots: 开始节点ID列表
+            completed: 已经执行成功的节点（从检查点恢复时），不再执行，
+                       直接解锁它们的后续节点
+
+        Returns:
+            List[StepResult]: 按完成顺序排列的步骤结果
+        """
+        # 只为实际触达的节点记录剩余入度，同一调度器可按迭代反复运行子图
+        remaining: Dict[str, int] = {}
+        scheduled = set()
+        ready: Deque[str] = deque()
+        running: Dict[asyncio.Task, str] = {}
+        results: List[StepResult] = []
+
+        def mark_ready(node_id: str):
+            if node_id in scheduled:
+                return
+            scheduled.add(node_id)
+            self.ready_times[node_id] = datetime.now()
+            ready.append(node_id)
+
+        for node_id in completed:
+            scheduled.add(node_id)
+            for successor in self.successors.get(node_id, []):
+                remaining[successor] = remaining.get(successor, self.in_degree[successor]) - 1
+
+        for node_id in roots:
+            mark_ready(node_id)
+        for node_id, count in list(remaining.items()):
+            if count <= 0:
+                mark_ready(node_id)
+
+        try:
+            while ready or running:
+                # 在并发上限内启动所有就绪节点
+                while ready and len(running) < self.max_concurrency:
+                    node_id = ready.popleft()
+                    self.start_times[node_id] = datetime.now()
+                    running[asyncio.create_task(self.run_node(node_id))] = node_id
+                    if self.on_start:
+                        self.on_start(node_id)
+
+                done, _ = await asyncio.wait(running.keys(), return_when=asyncio.FIRST_COMPLETED)
+
+                for task in done:
+                    node_id = running.pop(task)
+                    result = self._collect(node_id, task)
+                    results.append(result)
+                    if self.on_step:
+                        self.on_step(result)
+
+                    if result.status != "success":
+                        # 失败或跳过的节点不解锁后续节点
+                        continue
+
+                    for successor in self.successors.get(node_id, []):
+                        count = remaining.get(successor, self.in_degree[successor]) - 1
+                        remaining[successor] = count
+                        if count <= 0:
+                            mark_ready(successor)
+        finally:
+            # 被取消或出错时不留下孤儿任务
+            for task in running:
+                task.cancel()
+            if running:
+                await asyncio.gather(*running.keys(), return_exceptions=True)
+
+        return results
+
+    def _collect(self, node_id: str, task: asyncio.Task) -> StepResult:
+        """取出节点结果，把异常转换为失败的步骤结果"""
+        error = task.exception()
+        if error is not None:
+            logger.error(f"节点执行异常: {node_id}, 错误: {error}")
+            result = StepResult(
+                node_id=node_id,
+                node_type=self.node_type(node_id),
+                status="failed",
+                start_time=self.start_times[node_id],
+                end_time=datetime.now(),
+                error=str(error)
+            )
+        else:
+            result = task.result()
+            result.start_time = self.start_times[node_id]
+
+        result.ready_time = self.ready_times[node_id]
+        return result
@@ -0,0 +1,139 @@
+"""
+执行会话
+每次工作流执行独占一个会话，持有该执行的浏览器上下文、页面和执行上下文，
+并发执行之间互不共享任何可变的浏览器状态
+"""
+
+import asyncio
+import logging
+from typing import Any, Dict, Optional
+
+from nodes.base import ExecutionContext
+from nodes.screenshots import ScreenshotRecorder
+from nodes.network import NetworkController
+from storage.sinks import DataSink
+from workflow.browser_pool import BrowserPool, BrowserLease
+
+logger = logging.getLogger(__name__)
+
+
+class ExecutionSession:
+    """单次执行的会话"""
+
+    def __init__(self,
+                 execution_id: str,
+                 pool: BrowserPool,
+                 lease: BrowserLease,
+                 owns_pool: bool = False,
+                 sink: Optional[DataSink] = None,
+                 screenshots: Optional[ScreenshotRecorder] = None,
+                 network: Optional[NetworkController] = None):
+        self.execution_id = execution_id
+        self.pool = pool
+        self.lease = lease
+        self.owns_pool = owns_pool  # 一次性私有池随会话一起关闭
+        self.context = ExecutionContext(
+            lease.browser, lease.page, lease.context, sink, screenshots, network
+        )
+        self._closed = False
+
+    @property
+    def playwright(self):
+        return self.pool.playwright
+
+    @property
+    def browser(self):
+        return self.lease.browser
+
+    @property
+    def browser_context(self):
+        return self.lease.context
+
+    @property
+    def page(self):
+        return self.lease.page
+
+    @classmethod
+    async def open(cls,
+                   execution_id: str,
+                   pool: Optional[BrowserPool] = None,
+                   sink: Optional[DataSink] = None,
+                   screenshots: Optional[ScreenshotRecorder] = None,
+                   network_profile: str = "none",
+                   har_mode: str = "off",
+                   har_path: Optional[str] = None,
+                   storage_state: Optional[Dict[str, Any]] = None) -> "ExecutionSession":
+        """
+        打开会话
+
+        Args:
+            execution_id: 执行ID
+            pool: 共享的浏览器池；为空时创建仅供本次执行使用的私有池
+            sink: 提取数据输出；为空时保存在内存中
+            screenshots: 截图记录器；为空时使用默认截图策略
+            network_profile: 对整个浏览器上下文生效的默认请求拦截配置
+            har_mode: HAR模式（off/record/replay）
+            har_path: HAR存档路径
+            storage_state: 浏览器上下文的初始存储状态（从检查点恢复时）
+
+        Returns:
+            ExecutionSession: 新的执行会话
+        """
+        owns_pool = pool is None
+        if owns_pool:
+            pool = BrowserPool(min_size=0, max_size=1, health_check_interval=0)
+            await pool.start()
+
+        try:
+            lease = await pool.acquire(storage_state)
+        except BaseException:
+            if owns_pool:
+                await pool.close()
+            raise
+
+        session = cls(execution_id, pool, lease, owns_pool, sink, screenshots, NetworkController())
+        try:
+            network = session.context.network
+            if har_mode != "off":
+                await network.attach_har(lease.context, har_mode, har_path)
+            await network.attach(lease.context, network_profile)
+        except BaseException:
+            # 包括创建期间被取消的情况，保证租约归还
+            await session.close()
+            raise
+
+        logger.info(f"执行会话已创建: {execution_id}")
+        return session
+
+    async def close(self, timeout: Optional[float] = None):
+        """
+        关闭会话，写出剩余的提取数据并归还浏览器上下文
+
+        Args:
+            timeout: 写出数据和关闭浏览器上下文各自的超时时间（秒），
+                     停止执行时保证浏览器资源在有限时间内释放
+        """
+        if self._closed:
+            return
+        self._closed = True
+
+        try:
+            await asyncio.wait_for(self._flush_outputs(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"写出提取数据和截图超时: {self.execution_id}")
+
+        try:
+            await self.pool.release(self.lease, timeout)
+        finally:
+            if self.owns_pool:
+                await self.pool.close()
+
+        logger.info(f"执行会话已关闭: {self.execution_id}")
+
+    async def _flush_outputs(self):
+        try:
+            await self.context.sink.close()
+        except Exception as e:
+            logger.error(f"关闭数据输出失败: {self.execution_id}, 错误: {e}")
+
+        await self.context.screenshots.flush()
@@ -0,0 +1,393 @@
+"""
+执行器
+API进程通过执行器运行工作流，不关心执行发生在哪里：
+
+- LocalExecutor：在API进程的事件循环中执行（单核，适合开发和小规模部署）
+- ProcessExecutor：分发到N个工作进程，每个进程有自己的事件循环、浏览器池和执行引擎，
+  结果在工作进程中序列化后通过本地队列传回API进程
+
+工作进程的消息格式：
+    收件箱  ("run", execution_id, workflow, options, batch) / ("cancel", execution_id) / ("stop",)
+            ("metrics", request_id)
+    发件箱  ("result", worker_id, execution_id, result) / ("error", worker_id, execution_id, message)
+            ("event", worker_id, execution_id, (event_type, data))
+            ("metrics", worker_id, request_id, snapshot)
+"""
+
+import asyncio
+import itertools
+import logging
+import multiprocessing
+import queue
+import threading
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from models.workflow import BatchInput, WorkflowDefinition, ExecutionResult, ExecutionOptions
+from workflow.browser_pool import BrowserPool
+from workflow.engine import WorkflowEngine
+from workflow.metrics import collect_metrics, merge_snapshots
+
+logger = logging.getLogger(__name__)
+
+EventCallback = Callable[[str, Dict[str, Any]], None]
+
+
+class WorkflowExecutor(ABC):
+    """执行器基类"""
+
+    async def start(self):
+        """启动执行器"""
+
+    async def close(self):
+        """关闭执行器"""
+
+    @abstractmethod
+    async def submit(self,
+                     execution_id: str,
+                     workflow: WorkflowDefinition,
+                     options: ExecutionOptions,
+                     on_event: Optional[EventCallback] = None,
+                     batch: Optional[BatchInput] = None) -> ExecutionResult:
+        """
+        执行工作流并等待结果，执行事件交给 on_event（在调用方的事件循环中调用）；
+        提供 batch 时按输入表批量执行
+        """
+
+    @abstractmethod
+    def stats(self) -> Dict[str, Any]:
+        """执行器状态"""
+
+    @abstractmethod
+    async def metrics(self) -> Dict[str, Any]:
+        """运行指标快照（所有进程汇总）"""
+
+
+class LocalExecutor(WorkflowExecutor):
+    """进程内执行器 - 直接在当前事件循环中调用执行引擎"""
+
+    def __init__(self, browser_pool: BrowserPool, engine: WorkflowEngine, warm_up: bool = False):
+        self.browser_pool = browser_pool
+        self.engine = engine
+        self.warm_up = warm_up  # 启动时预先启动浏览器
+
+    async def start(self):
+        await self.browser_pool.start()
+        if self.warm_up:
+            await self.browser_pool.warm_up()
+
+    async def close(self):
+        await self.browser_pool.close()
+
+    async def submit(self,
+                     execution_id: str,
+                     workflow: WorkflowDefinition,
+                     options: ExecutionOptions,
+                     on_event: Optional[EventCallback] = None,
+                     batch: Optional[BatchInput] = None) -> ExecutionResult:
+        if batch is not None:
+            return await self.engine.execute_batch(workflow, batch, execution_id, options, on_event)
+        return await self.engine.execute(workflow, execution_id, options, on_event)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"mode": "local", "browser_pool": self.browser_pool.stats()}
+
+    async def metrics(self) -> Dict[str, Any]:
+        return collect_metrics(self.engine, self.browser_pool)
+
+
+class _WorkerHandle:
+    """API进程中对一个工作进程的记录"""
+
+    def __init__(self, worker_id: int, process: multiprocessing.Process, inbox):
+        self.worker_id = worker_id
+        self.process = process
+        self.inbox = inbox
+        self.running: Set[str] = set()  # 分配给该进程且尚未返回结果的执行ID
+        self.completed = 0
+
+
+class ProcessExecutor(WorkflowExecutor):
+    """
+    多进程执行器
+
+    新的执行分配给进行中执行最少的工作进程；工作进程异常退出时，
+    分配给它的执行标记为失败并重新启动该进程
+    """
+
+    def __init__(self,
+                 processes: int,
+                 shutdown_timeout: float = 30.0,
+                 warm_up: bool = False,
+                 metrics_timeout: float = 2.0):
+        """
+        Args:
+            processes: 工作进程数量
+            shutdown_timeout: 关闭时等待工作进程完成进行中执行的时间（秒）
+            warm_up: 工作进程启动时预先启动浏览器
+            metrics_timeout: 收集指标时等待每个工作进程回复的时间（秒）
+        """
+        if processes < 1:
+            raise ValueError(f"工作进程数量必须大于0: {processes}")
+
+        self.processes = processes
+        self.shutdown_timeout = shutdown_timeout
+        self.warm_up = warm_up
+        self.metrics_timeout = metrics_timeout
+        self._mp = multiprocessing.get_context("spawn")
+        self._outbox = None
+        self._workers: List[_WorkerHandle] = []
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._metrics_requests: Dict[str, asyncio.Future] = {}
+        self._request_ids = itertools.count(1)
+        self._event_callbacks: Dict[str, EventCallback] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._reader: Optional[threading.Thread] = None
+        self._closing = False
+
+    async def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._outbox = self._mp.Queue()
+        self._workers = [self._spawn(worker_id) for worker_id in range(self.processes)]
+
+        # 结果读取线程：阻塞读取发件箱，把消息交回事件循环处理
+        self._reader = threading.Thread(target=self._read_outbox, name="lingda-worker-results", daemon=True)
+        self._reader.start()
+        logger.info(f"已启动 {self.processes} 个工作进程")
+
+    async def close(self):
+        self._closing = True
+        for worker in self._workers:
+            worker.inbox.put(("stop",))
+        await asyncio.to_thread(self._join_workers)
+
+        for future in self._pending.values():
+            if not future.done():
+                future.set_exception(RuntimeError("执行器已关闭"))
+        if self._reader:
+            await asyncio.to_thread(self._reader.join)
+        logger.info("工作进程已全部退出")
+
+    async def submit(self,
+                     execution_id: str,
+                     workflow: WorkflowDefinition,
+                     options: ExecutionOptions,
+                     on_event: Optional[EventCallback] = None,
+                     batch: Optional[BatchInput] = None) -> ExecutionResult:
+        if self._closing or not self._workers:
+            raise RuntimeError("执行器未启动或已关闭")
+
+        worker = min(self._workers, key=lambda w: len(w.running))
+        future = self._loop.create_future()
+        self._pending[execution_id] = future
+        if on_event:
+            self._event_callbacks[execution_id] = on_event
+        worker.running.add(execution_id)
+        worker.inbox.put((
+            "run",
+            execution_id,
+            workflow.model_dump(mode="json"),
+            options.model_dump(mode="json"),
+            batch.model_dump(mode="json") if batch is not None else None
+        ))
+
+        try:
+            payload = await future
+        except asyncio.CancelledError:
+            # 停止执行：通知工作进程取消，浏览器在工作进程中限时释放
+            worker.inbox.put(("cancel", execution_id))
+            raise
+        finally:
+            self._pending.pop(execution_id, None)
+            self._event_callbacks.pop(execution_id, None)
+            worker.running.discard(execution_id)
+        return ExecutionResult.model_validate(payload)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "mode": "process",
+            "workers": [
+                {
+                    "worker_id": worker.worker_id,
+                    "pid": worker.process.pid,
+                    "alive": worker.process.is_alive(),
+                    "running": len(worker.running),
+                    "completed": worker.completed
+                }
+                for worker in self._workers
+            ]
+        }
+
+    async def metrics(self) -> Dict[str, Any]:
+        """向每个存活的工作进程请求指标快照并汇总；未按时回复的进程不计入"""
+        futures = []
+        for worker in self._workers:
+            if not worker.process.is_alive():
+                continue
+            request_id = f"metrics-{next(self._request_ids)}"
+            future = self._loop.create_future()
+            self._metrics_requests[request_id] = future
+            futures.append((request_id, future))
+            worker.inbox.put(("metrics", request_id))
+
+        try:
+            if futures:
+                await asyncio.wait([future for _, future in futures], timeout=self.metrics_timeout)
+        finally:
+            for request_id, _ in futures:
+                self._metrics_requests.pop(request_id, None)
+        return merge_snapshots(future.result() for _, future in futures if future.done())
+
+    def _spawn(self, worker_id: int) -> _WorkerHandle:
+        inbox = self._mp.Queue()
+        process = self._mp.Process(
+            target=_worker_main,
+            args=(worker_id, inbox, self._outbox, self.warm_up),
+            name=f"lingda-worker-{worker_id}",
+            daemon=True
+        )
+        process.start()
+        logger.info(f"工作进程已启动: {worker_id} (pid={process.pid})")
+        return _WorkerHandle(worker_id, process, inbox)
+
+    def _read_outbox(self):
+        """在线程中读取工作进程的消息"""
+        while True:
+            try:
+                message = self._outbox.get(timeout=0.5)
+            except queue.Empty:
+                if self._closing and not any(w.process.is_alive() for w in self._workers):
+                    return
+                self._loop.call_soon_threadsafe(self._check_workers)
+                continue
+            self._loop.call_soon_threadsafe(self._dispatch, message)
+
+    def _dispatch(self, message: tuple):
+        kind, worker_id, execution_id, payload = message
+        if kind == "event":
+            callback = self._event_callbacks.get(execution_id)
+            if callback:
+                callback(*payload)
+            return
+        if kind == "metrics":
+            future = self._metrics_requests.get(execution_id)
+            if future and not future.done():
+                future.set_result(payload)
+            return
+
+        worker = self._workers[worker_id]
+        worker.running.discard(execution_id)
+        worker.completed += 1
+
+        future = self._pending.get(execution_id)
+        if future is None or future.done():
+            return
+        if kind == "result":
+            future.set_result(payload)
+        else:
+            future.set_exception(RuntimeError(payload))
+
+    def _check_workers(self):
+        """发现异常退出的工作进程：让它的执行失败并重新启动"""
+        if self._closing:
+            return
+        for index, worker in enumerate(self._workers):
+            if worker.process.is_alive():
+                continue
+            logger.error(f"工作进程异常退出: {worker.worker_id}, 退出码: {worker.process.exitcode}")
+            for execution_id in worker.running:
+                future = self._pending.get(execution_id)
+                if future and not future.done():
+                    future.set_exception(RuntimeError(f"工作进程异常退出，退出码: {worker.process.exitcode}"))
+            self._workers[index] = self._spawn(worker.worker_id)
+
+    def _join_workers(self):
+        for worker in self._workers:
+            worker.process.join(self.shutdown_timeout)
+            if worker.process.is_alive():
+                logger.warning(f"工作进程未能按时退出，强制终止: {worker.worker_id}")
+                worker.process.terminate()
+                worker.process.join()
+
+
+def _worker_main(worker_id: int, inbox, outbox, warm_up: bool = False):
+    """工作进程入口"""
+    logging.basicConfig(
+        level=logging.INFO,
+        format=f"[worker-{worker_id}] %(levelname)s:%(name)s:%(message)s"
+    )
+    asyncio.run(_worker_loop(worker_id, inbox, outbox, warm_up))
+
+
+async def _worker_loop(worker_id: int, inbox, outbox, warm_up: bool = False):
+    """工作进程的事件循环：每个执行是一个任务，同一进程内的执行并发运行"""
+    # 在子进程中导入，工作进程按同样的配置创建自己的浏览器池和执行引擎
+    from workflow.runtime import create_browser_pool, create_workflow_engine
+
+    browser_pool = create_browser_pool()
+    engine = create_workflow_engine(browser_pool)
+    await browser_pool.start()
+    if warm_up:
+        # 预热期间到达的执行在收件箱中等待
+        await browser_pool.warm_up()
+
+    running: Dict[str, asyncio.Task] = {}
+
+    async def run(execution_id: str, workflow_data: dict, options_data: dict, batch_data: Optional[dict]):
+        def on_event(event_type: str, data: Dict[str, Any]):
+            outbox.put(("event", worker_id, execution_id, (event_type, data)))
+
+        try:
+            workflow = WorkflowDefinition.model_validate(workflow_data)
+            options = ExecutionOptions.model_validate(options_data)
+            if batch_data is not None:
+                result = await engine.execute_batch(
+                    workflow, BatchInput.model_validate(batch_data), execution_id, options, on_event
+                )
+            else:
+                result = await engine.execute(workflow, execution_id, options, on_event)
+            outbox.put(("result", worker_id, execution_id, result.model_dump(mode="json")))
+        except Exception as e:
+            logger.error(f"工作进程执行失败: {execution_id}, 错误: {e}")
+            outbox.put(("error", worker_id, execution_id, str(e)))
+
+    try:
+        while True:
+            message = await asyncio.to_thread(inbox.get)
+            if message[0] == "stop":
+                break
+            if message[0] == "run":
+                execution_id = message[1]
+                task = asyncio.create_task(run(*message[1:]))
+                running[execution_id] = task
+                task.add_done_callback(lambda _, execution_id=execution_id: running.pop(execution_id, None))
+            elif message[0] == "cancel":
+                task = running.get(message[1])
+                if task:
+                    task.cancel()
+            elif message[0] == "metrics":
+                outbox.put(("metrics", worker_id, message[1], collect_metrics(engine, browser_pool)))
+        # 等待进行中的执行完成后退出
+        if running:
+            await asyncio.gather(*running.values(), return_exceptions=True)
+    finally:
+        await browser_pool.close()
+
+
+def create_executor(processes: int, warm_up: bool = False) -> WorkflowExecutor:
+    """
+    按配置创建执行器
+
+    Args:
+        processes: 工作进程数量，0 表示在API进程内执行
+        warm_up: 启动时预先启动浏览器（每个工作进程各自预热）
+
+    Returns:
+        WorkflowExecutor: 执行器
+    """
+    if processes > 0:
+        return ProcessExecutor(processes, warm_up=warm_up)
+
+    from workflow.runtime import create_browser_pool, create_workflow_engine
+    browser_pool = create_browser_pool()
+    return LocalExecutor(browser_pool, create_workflow_engine(browser_pool), warm_up)